@@ -0,0 +1,55 @@
+"""Add learning_resume table for the "continue learning" pointer.
+
+Revision ID: 002_learning_resume
+Revises: 001_initial_schema
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '002_learning_resume'
+down_revision = '001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # One row per user, keyed by user_id so GET /api/progress/resume is a PK lookup
+    op.create_table(
+        'learning_resume',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('course_id', sa.UUID(), nullable=False),
+        sa.Column('lesson_id', sa.UUID(), nullable=False),
+        sa.Column('next_lesson_id', sa.UUID(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False, server_default='in_progress'),
+        sa.Column('progress_pct', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['next_lesson_id'], ['lessons.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill from each user's most recently updated progress row
+    op.execute(
+        """
+        INSERT INTO learning_resume (user_id, course_id, lesson_id, next_lesson_id, status, progress_pct, updated_at)
+        SELECT DISTINCT ON (p.user_id)
+               p.user_id, l.course_id, p.lesson_id, seq.next_lesson_id, p.status, p.progress_pct, p.updated_at
+        FROM progress p
+        JOIN lessons l ON l.id = p.lesson_id
+        JOIN (
+            SELECT id,
+                   lead(id) OVER (PARTITION BY course_id ORDER BY "order" ASC NULLS LAST, id ASC) AS next_lesson_id
+            FROM lessons
+        ) seq ON seq.id = p.lesson_id
+        ORDER BY p.user_id, p.updated_at DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('learning_resume')
@@ -0,0 +1,26 @@
+"""Add quiz versioning and pass/fail on attempts for server-side grading.
+
+Revision ID: 003_quiz_grading
+Revises: 002_learning_resume
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '003_quiz_grading'
+down_revision = '002_learning_resume'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Version is bumped on question edits and keys the compiled answer-key cache
+    op.add_column('quizzes', sa.Column('version', sa.Integer(), nullable=False, server_default=sa.text('1')))
+    op.add_column('quiz_attempts', sa.Column('passed', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('quiz_attempts', 'passed')
+    op.drop_column('quizzes', 'version')
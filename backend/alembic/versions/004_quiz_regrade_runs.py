@@ -0,0 +1,44 @@
+"""Add quiz_regrade_runs for checkpointed bulk re-grading.
+
+Revision ID: 004_quiz_regrade_runs
+Revises: 003_quiz_grading
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '004_quiz_regrade_runs'
+down_revision = '003_quiz_grading'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'quiz_regrade_runs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('quiz_id', sa.UUID(), nullable=False),
+        sa.Column('quiz_version', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('processed', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('last_attempt_id', sa.UUID(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_quiz_regrade_runs_quiz_id', 'quiz_regrade_runs', ['quiz_id'])
+
+    # Re-grades stream attempts of one quiz in id order (keyset checkpoint)
+    op.create_index('ix_quiz_attempts_quiz_id_id', 'quiz_attempts', ['quiz_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quiz_attempts_quiz_id_id', table_name='quiz_attempts')
+    op.drop_index('ix_quiz_regrade_runs_quiz_id', table_name='quiz_regrade_runs')
+    op.drop_table('quiz_regrade_runs')
@@ -0,0 +1,24 @@
+"""Add optimistic version column to quiz_attempts for autosave.
+
+Revision ID: 005_quiz_attempt_autosave
+Revises: 004_quiz_regrade_runs
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '005_quiz_attempt_autosave'
+down_revision = '004_quiz_regrade_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # answers is already JSONB (001), so autosave merges with answers || :patch
+    op.add_column('quiz_attempts', sa.Column('version', sa.Integer(), nullable=False, server_default=sa.text('1')))
+
+
+def downgrade() -> None:
+    op.drop_column('quiz_attempts', 'version')
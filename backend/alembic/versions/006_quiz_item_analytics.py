@@ -0,0 +1,57 @@
+"""Add incremental per-question item analytics tables.
+
+Revision ID: 006_quiz_item_analytics
+Revises: 005_quiz_attempt_autosave
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '006_quiz_item_analytics'
+down_revision = '005_quiz_attempt_autosave'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'quiz_analytics_state',
+        sa.Column('quiz_id', sa.UUID(), nullable=False),
+        sa.Column('quiz_version', sa.Integer(), nullable=False),
+        sa.Column('attempts_count', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('last_completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_attempt_id', sa.UUID(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('quiz_id')
+    )
+
+    op.create_table(
+        'quiz_item_stats',
+        sa.Column('quiz_id', sa.UUID(), nullable=False),
+        sa.Column('question_id', sa.UUID(), nullable=False),
+        sa.Column('n', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('n_correct', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('sum_rest', sa.Float(), nullable=False, server_default=sa.text('0')),
+        sa.Column('sum_rest_sq', sa.Float(), nullable=False, server_default=sa.text('0')),
+        sa.Column('sum_correct_rest', sa.Float(), nullable=False, server_default=sa.text('0')),
+        sa.Column('distractors', postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column('p_value', sa.Float(), nullable=True),
+        sa.Column('discrimination', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['quiz_questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('quiz_id', 'question_id')
+    )
+
+    # Incremental scans read attempts of one quiz after a (completed_at, id) watermark
+    op.create_index('ix_quiz_attempts_quiz_completed', 'quiz_attempts', ['quiz_id', 'completed_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quiz_attempts_quiz_completed', table_name='quiz_attempts')
+    op.drop_table('quiz_item_stats')
+    op.drop_table('quiz_analytics_state')
@@ -0,0 +1,52 @@
+"""Add per-quiz score sketches for percentile ranks.
+
+Revision ID: 007_quiz_score_sketches
+Revises: 006_quiz_item_analytics
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '007_quiz_score_sketches'
+down_revision = '006_quiz_item_analytics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # counts[s + 1] = number of graded attempts with score s (0-100)
+    op.create_table(
+        'quiz_score_sketches',
+        sa.Column('quiz_id', sa.UUID(), nullable=False),
+        sa.Column('counts', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('quiz_id')
+    )
+
+    # Backfill from existing graded attempts
+    op.execute(
+        """
+        INSERT INTO quiz_score_sketches (quiz_id, counts, total)
+        SELECT a.quiz_id,
+               array_agg(coalesce(c.n, 0) ORDER BY b.score),
+               sum(coalesce(c.n, 0))
+        FROM (SELECT DISTINCT quiz_id FROM quiz_attempts WHERE score IS NOT NULL) a
+        CROSS JOIN generate_series(0, 100) AS b(score)
+        LEFT JOIN (
+            SELECT quiz_id, least(greatest(score, 0), 100) AS score, count(*) AS n
+            FROM quiz_attempts
+            WHERE score IS NOT NULL
+            GROUP BY 1, 2
+        ) c ON c.quiz_id = a.quiz_id AND c.score = b.score
+        GROUP BY a.quiz_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('quiz_score_sketches')
@@ -0,0 +1,42 @@
+"""Add adaptive quiz mode and IRT item parameters.
+
+Revision ID: 008_adaptive_quizzes
+Revises: 007_quiz_score_sketches
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '008_adaptive_quizzes'
+down_revision = '007_quiz_score_sketches'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quizzes', sa.Column('adaptive', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('quizzes', sa.Column('item_params_version', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.add_column('quiz_attempts', sa.Column('ability', sa.Float(), nullable=True))
+
+    op.create_table(
+        'quiz_item_params',
+        sa.Column('quiz_id', sa.UUID(), nullable=False),
+        sa.Column('question_id', sa.UUID(), nullable=False),
+        sa.Column('quiz_version', sa.Integer(), nullable=False),
+        sa.Column('discrimination', sa.Float(), nullable=False, server_default=sa.text('1.0')),
+        sa.Column('difficulty', sa.Float(), nullable=False, server_default=sa.text('0.0')),
+        sa.Column('n', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('fitted_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['quiz_questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('quiz_id', 'question_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('quiz_item_params')
+    op.drop_column('quiz_attempts', 'ability')
+    op.drop_column('quizzes', 'item_params_version')
+    op.drop_column('quizzes', 'adaptive')
@@ -0,0 +1,54 @@
+"""Add spaced-repetition review items and nightly due counts.
+
+Revision ID: 009_review_items
+Revises: 008_adaptive_quizzes
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '009_review_items'
+down_revision = '008_adaptive_quizzes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'review_items',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('question_id', sa.UUID(), nullable=False),
+        sa.Column('quiz_id', sa.UUID(), nullable=False),
+        sa.Column('ease', sa.Float(), nullable=False, server_default=sa.text('2.5')),
+        sa.Column('interval_days', sa.Float(), nullable=False, server_default=sa.text('0')),
+        sa.Column('repetitions', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('lapses', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('due_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_reviewed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['quiz_questions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'question_id', name='uq_review_items_user_question')
+    )
+    op.create_index('ix_review_items_user_due', 'review_items', ['user_id', 'due_at'])
+
+    op.create_table(
+        'review_due_counts',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('due_count', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('due_before', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('review_due_counts')
+    op.drop_index('ix_review_items_user_due', table_name='review_items')
+    op.drop_table('review_items')
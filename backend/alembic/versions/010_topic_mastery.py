@@ -0,0 +1,35 @@
+"""Add per-topic mastery estimates.
+
+Revision ID: 010_topic_mastery
+Revises: 009_review_items
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '010_topic_mastery'
+down_revision = '009_review_items'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'topic_mastery',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('p_mastery', sa.Float(), nullable=False),
+        sa.Column('answers', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('correct', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'topic')
+    )
+    op.create_index('ix_topic_mastery_user_p', 'topic_mastery', ['user_id', 'p_mastery'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_topic_mastery_user_p', table_name='topic_mastery')
+    op.drop_table('topic_mastery')
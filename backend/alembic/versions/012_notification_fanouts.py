@@ -0,0 +1,54 @@
+"""Add checkpointed course notification fan-out runs.
+
+Revision ID: 012_notification_fanouts
+Revises: 011_notification_counters
+Create Date: 2026-10-19
+
+The fan-out task COPYs notifications with timezone-aware UTC timestamps, so
+notifications.created_at becomes timestamptz here (existing values are UTC).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '012_notification_fanouts'
+down_revision = '011_notification_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_fanouts',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('course_id', sa.UUID(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('sent', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('skipped', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('last_user_id', sa.UUID(), nullable=True),
+        sa.Column('rate', sa.Float(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_fanouts_course_id', 'notification_fanouts', ['course_id'])
+    op.alter_column(
+        'notifications', 'created_at',
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'notifications', 'created_at',
+        type_=sa.DateTime(),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+    )
+    op.drop_index('ix_notification_fanouts_course_id', table_name='notification_fanouts')
+    op.drop_table('notification_fanouts')
@@ -0,0 +1,100 @@
+"""Range-partition notifications by created_at month.
+
+Revision ID: 013_notification_partitions
+Revises: 012_notification_fanouts
+Create Date: 2026-10-19
+
+The table is rebuilt as a partitioned table (one partition per month, named
+notifications_pYYYYMM) so retention drops whole partitions instead of
+running DELETE. Partitions are created from the oldest existing row up to
+PARTITIONS_AHEAD months past the current month; the nightly maintenance task
+keeps creating future months (services/notification_retention.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '013_notification_partitions'
+down_revision = '012_notification_fanouts'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE notifications RENAME TO notifications_unpartitioned")
+    op.execute("ALTER INDEX ix_notifications_user_id RENAME TO ix_notifications_unpartitioned_user_id")
+    op.execute("ALTER TABLE notifications_unpartitioned RENAME CONSTRAINT notifications_pkey TO notifications_unpartitioned_pkey")
+
+    # The partition key must be part of the primary key
+    op.execute(
+        """
+        CREATE TABLE notifications (
+            id uuid NOT NULL,
+            user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            type varchar(50) NOT NULL,
+            payload jsonb NOT NULL DEFAULT '{}'::jsonb,
+            is_read boolean NOT NULL DEFAULT false,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    # Newest-first keyset pagination per user; created on every partition
+    op.execute("CREATE INDEX ix_notifications_user_created ON notifications (user_id, created_at DESC, id DESC)")
+
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month date := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM notifications_unpartitioned), now()))::date;
+            last_month date := (date_trunc('month', now()) + interval '{PARTITIONS_AHEAD} months')::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF notifications FOR VALUES FROM (%L) TO (%L)',
+                    'notifications_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO notifications (id, user_id, type, payload, is_read, created_at)
+        SELECT id, user_id, type, payload, is_read, created_at
+        FROM notifications_unpartitioned
+        """
+    )
+    op.execute("DROP TABLE notifications_unpartitioned")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE notifications RENAME TO notifications_partitioned")
+    op.create_table(
+        'notifications',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column('is_read', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notifications_user_id', 'notifications', ['user_id'])
+    op.execute(
+        """
+        INSERT INTO notifications (id, user_id, type, payload, is_read, created_at)
+        SELECT id, user_id, type, payload, is_read, created_at
+        FROM notifications_partitioned
+        """
+    )
+    op.execute("DROP TABLE notifications_partitioned")
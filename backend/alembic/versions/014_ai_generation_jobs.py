@@ -0,0 +1,76 @@
+"""Add AI tutor reply generation jobs.
+
+Revision ID: 014_ai_generation_jobs
+Revises: 013_notification_partitions
+Create Date: 2026-10-19
+
+001 created the tutor tables as conversations/messages, while the models
+(and everything since) use ai_conversations/ai_messages. They are renamed
+here first, their timestamps become timezone-aware like the models, and
+ai_messages gains token_count (stored per message for context budgeting).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '014_ai_generation_jobs'
+down_revision = '013_notification_partitions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Align the 001 tutor tables with the models
+    op.rename_table('conversations', 'ai_conversations')
+    op.execute("ALTER INDEX ix_conversations_user_id RENAME TO ix_ai_conversations_user_id")
+    op.alter_column('ai_conversations', 'metadata', new_column_name='conversation_metadata')
+    op.rename_table('messages', 'ai_messages')
+    op.execute("ALTER INDEX ix_messages_conversation_id RENAME TO ix_ai_messages_conversation_id")
+    for table, column in (
+        ('ai_conversations', 'last_message_at'),
+        ('ai_conversations', 'created_at'),
+        ('ai_messages', 'created_at'),
+    ):
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE timestamptz USING {column} AT TIME ZONE 'UTC'")
+    op.execute("ALTER TABLE ai_conversations ALTER COLUMN last_message_at SET DEFAULT now()")
+    op.add_column('ai_messages', sa.Column('token_count', sa.Integer(), nullable=True))
+
+    op.create_table(
+        'ai_generation_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('conversation_id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('message_id', sa.UUID(), nullable=False),
+        sa.Column('result_message_id', sa.UUID(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['conversation_id'], ['ai_conversations.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['message_id'], ['ai_messages.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['result_message_id'], ['ai_messages.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_generation_jobs_user_id', 'ai_generation_jobs', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_generation_jobs_user_id', table_name='ai_generation_jobs')
+    op.drop_table('ai_generation_jobs')
+
+    op.drop_column('ai_messages', 'token_count')
+    op.execute("ALTER TABLE ai_conversations ALTER COLUMN last_message_at DROP DEFAULT")
+    for table, column in (
+        ('ai_conversations', 'last_message_at'),
+        ('ai_conversations', 'created_at'),
+        ('ai_messages', 'created_at'),
+    ):
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE timestamp USING {column} AT TIME ZONE 'UTC'")
+    op.execute("ALTER INDEX ix_ai_messages_conversation_id RENAME TO ix_messages_conversation_id")
+    op.rename_table('ai_messages', 'messages')
+    op.alter_column('ai_conversations', 'conversation_metadata', new_column_name='metadata')
+    op.execute("ALTER INDEX ix_ai_conversations_user_id RENAME TO ix_conversations_user_id")
+    op.rename_table('ai_conversations', 'conversations')
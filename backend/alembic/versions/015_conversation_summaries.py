@@ -0,0 +1,63 @@
+"""Maintain message count and last-message preview on AI conversations.
+
+Revision ID: 015_conversation_summaries
+Revises: 014_ai_generation_jobs
+Create Date: 2026-10-19
+
+message_count, last_message_at and last_message_preview are backfilled from
+ai_messages here and afterwards kept up to date by the statement that
+inserts each message (services/ai_messages.py). The sidebar lists
+conversations by (last_message_at, id) through ix_ai_conversations_user_recent.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '015_conversation_summaries'
+down_revision = '014_ai_generation_jobs'
+branch_labels = None
+depends_on = None
+
+PREVIEW_CHARS = 120
+
+
+def upgrade() -> None:
+    op.add_column('ai_conversations', sa.Column('message_count', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.add_column('ai_conversations', sa.Column('last_message_preview', sa.String(), nullable=True))
+
+    op.execute(
+        f"""
+        UPDATE ai_conversations c
+        SET message_count = s.n,
+            last_message_at = s.created_at,
+            last_message_preview = left(regexp_replace(s.text, '\\s+', ' ', 'g'), {PREVIEW_CHARS})
+        FROM (
+            SELECT DISTINCT ON (conversation_id)
+                conversation_id,
+                created_at,
+                count(*) OVER (PARTITION BY conversation_id) AS n,
+                CASE jsonb_typeof(content::jsonb)
+                    WHEN 'string' THEN content::jsonb #>> '{{}}'
+                    WHEN 'object' THEN coalesce(content::jsonb ->> 'text', content::jsonb ->> 'content', '')
+                    ELSE content::text
+                END AS text
+            FROM ai_messages
+            ORDER BY conversation_id, created_at DESC, id DESC
+        ) s
+        WHERE c.id = s.conversation_id
+        """
+    )
+    op.execute("UPDATE ai_conversations SET last_message_at = now() WHERE last_message_at IS NULL")
+    op.alter_column('ai_conversations', 'last_message_at', nullable=False)
+    op.create_index(
+        'ix_ai_conversations_user_recent',
+        'ai_conversations',
+        ['user_id', sa.text('last_message_at DESC'), sa.text('id DESC')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_conversations_user_recent', table_name='ai_conversations')
+    op.alter_column('ai_conversations', 'last_message_at', nullable=True)
+    op.drop_column('ai_conversations', 'last_message_preview')
+    op.drop_column('ai_conversations', 'message_count')
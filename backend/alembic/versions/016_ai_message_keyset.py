@@ -0,0 +1,31 @@
+"""Index AI messages for keyset pagination within a conversation.
+
+Revision ID: 016_ai_message_keyset
+Revises: 015_conversation_summaries
+Create Date: 2026-10-19
+
+Message listing and prompt-context scans page on (created_at, id) forwards
+and backwards; the composite index serves both directions and replaces the
+single-column conversation_id index.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = '016_ai_message_keyset'
+down_revision = '015_conversation_summaries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_ai_messages_conversation_created',
+        'ai_messages',
+        ['conversation_id', 'created_at', 'id']
+    )
+    op.drop_index('ix_ai_messages_conversation_id', table_name='ai_messages')
+
+
+def downgrade() -> None:
+    op.create_index('ix_ai_messages_conversation_id', 'ai_messages', ['conversation_id'])
+    op.drop_index('ix_ai_messages_conversation_created', table_name='ai_messages')
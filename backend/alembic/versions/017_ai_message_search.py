@@ -0,0 +1,73 @@
+"""Full-text search vectors for AI messages.
+
+Revision ID: 017_ai_message_search
+Revises: 016_ai_message_keyset
+Create Date: 2026-10-19
+
+ai_messages.search_vector holds to_tsvector('english', <message text>). It is
+backfilled here and then written by the statement that inserts each message
+(services/ai_messages.py); ix_ai_messages_search (GIN) serves
+GET /api/ai/search.
+
+The backfill runs in id-ordered batches of BACKFILL_BATCH rows, each
+committed on its own, and the index is built CONCURRENTLY, so the table
+stays writable and no single transaction rewrites the whole table.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '017_ai_message_search'
+down_revision = '016_ai_message_keyset'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 10000
+
+SEARCH_VECTOR = """to_tsvector('english', CASE jsonb_typeof(content::jsonb)
+    WHEN 'string' THEN content::jsonb #>> '{}'
+    WHEN 'object' THEN coalesce(content::jsonb ->> 'text', content::jsonb ->> 'content', '')
+    ELSE content::text
+END)"""
+
+
+def _backfill() -> None:
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot page through results; emit one statement
+        op.execute(f"UPDATE ai_messages SET search_vector = {SEARCH_VECTOR}")
+        return
+    bind = op.get_bind()
+    batch = sa.text(
+        f"""
+        WITH batch AS (
+            SELECT id FROM ai_messages WHERE id > :after ORDER BY id LIMIT :size
+        ), filled AS (
+            UPDATE ai_messages m SET search_vector = {SEARCH_VECTOR}
+            FROM batch WHERE m.id = batch.id
+        )
+        SELECT id FROM batch ORDER BY id DESC LIMIT 1
+        """
+    )
+    after = '00000000-0000-0000-0000-000000000000'
+    while True:
+        last = bind.execute(batch, {"after": after, "size": BACKFILL_BATCH}).scalar()
+        if last is None:
+            break
+        after = last
+
+
+def upgrade() -> None:
+    op.add_column('ai_messages', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    with op.get_context().autocommit_block():
+        _backfill()
+        op.create_index(
+            'ix_ai_messages_search', 'ai_messages', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_ai_messages_search', table_name='ai_messages', postgresql_concurrently=True)
+    op.drop_column('ai_messages', 'search_vector')
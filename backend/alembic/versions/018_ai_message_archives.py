@@ -0,0 +1,43 @@
+"""Cold storage for messages of idle AI conversations.
+
+Revision ID: 018_ai_message_archives
+Revises: 017_ai_message_search
+Create Date: 2026-10-19
+
+The nightly archival task moves all messages of a conversation idle for
+AI_ARCHIVE_IDLE_DAYS into one zstd-compressed row of ai_message_archives and
+sets ai_conversations.archived_at; opening the conversation moves them back
+(services/ai_archive.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '018_ai_message_archives'
+down_revision = '017_ai_message_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_conversations', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        'ai_message_archives',
+        sa.Column('conversation_id', sa.UUID(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('codec', sa.String(), nullable=False, server_default='zstd'),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('raw_bytes', sa.Integer(), nullable=False),
+        sa.Column('first_message_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['conversation_id'], ['ai_conversations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('conversation_id')
+    )
+    # The blobs are already compressed; skip TOAST's pglz pass
+    op.execute("ALTER TABLE ai_message_archives ALTER COLUMN data SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_table('ai_message_archives')
+    op.drop_column('ai_conversations', 'archived_at')
@@ -0,0 +1,54 @@
+"""Stripe per-quiz score sketches across several rows.
+
+Revision ID: 019_score_sketch_stripes
+Revises: 018_ai_message_archives
+Create Date: 2026-10-19
+
+Every submit used to increment the single sketch row of its quiz, so
+submits of a popular quiz serialized on that row lock. Sketches are now
+keyed by (quiz_id, stripe); a submit increments a random stripe and reads
+sum the stripes. Existing sketches become stripe 0.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '019_score_sketch_stripes'
+down_revision = '018_ai_message_archives'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'quiz_score_sketches',
+        sa.Column('stripe', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    )
+    op.drop_constraint('quiz_score_sketches_pkey', 'quiz_score_sketches', type_='primary')
+    op.create_primary_key('quiz_score_sketches_pkey', 'quiz_score_sketches', ['quiz_id', 'stripe'])
+
+
+def downgrade() -> None:
+    # Fold every stripe into stripe 0 before dropping the column
+    op.execute(
+        """
+        UPDATE quiz_score_sketches s
+        SET counts = f.counts, total = f.total
+        FROM (
+            SELECT quiz_id,
+                   array_agg(n ORDER BY i) AS counts,
+                   sum(n) AS total
+            FROM (
+                SELECT quiz_id, i, sum(counts[i]) AS n
+                FROM quiz_score_sketches, generate_series(1, 101) AS i
+                GROUP BY quiz_id, i
+            ) cells
+            GROUP BY quiz_id
+        ) f
+        WHERE s.quiz_id = f.quiz_id AND s.stripe = 0
+        """
+    )
+    op.execute("DELETE FROM quiz_score_sketches WHERE stripe <> 0")
+    op.drop_constraint('quiz_score_sketches_pkey', 'quiz_score_sketches', type_='primary')
+    op.create_primary_key('quiz_score_sketches_pkey', 'quiz_score_sketches', ['quiz_id'])
+    op.drop_column('quiz_score_sketches', 'stripe')
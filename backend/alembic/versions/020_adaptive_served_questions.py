@@ -0,0 +1,27 @@
+"""Record the questions served to adaptive attempts.
+
+Revision ID: 020_adaptive_served_questions
+Revises: 019_score_sketch_stripes
+Create Date: 2026-10-19
+
+GET .../attempts/{id}/next appends the question it returns to
+quiz_attempts.served, so an adaptive attempt is scored with the questions it
+was shown but left unanswered counting as incorrect.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '020_adaptive_served_questions'
+down_revision = '019_score_sketch_stripes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_attempts', sa.Column('served', postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('quiz_attempts', 'served')
@@ -0,0 +1,88 @@
+"""Scope AI message search by user in the index.
+
+Revision ID: 021_ai_message_user_search
+Revises: 020_adaptive_served_questions
+Create Date: 2026-10-19
+
+ix_ai_messages_search indexed every user's messages together, so a common
+term matched rows of all users and the conversation join filtered them
+afterwards. ai_messages.user_id (the conversation owner, copied on insert)
+and ix_ai_messages_user_search, a btree_gin index on (user_id,
+search_vector), let GET /api/ai/search read only the caller's entries.
+
+Like 017, the backfill runs in id-ordered batches of BACKFILL_BATCH rows,
+each committed on its own, and indexes are built and dropped CONCURRENTLY.
+NOT NULL is set through a validated CHECK constraint so that ALTER COLUMN
+does not scan the table under an exclusive lock.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '021_ai_message_user_search'
+down_revision = '020_adaptive_served_questions'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 10000
+
+FILL_USER = """UPDATE ai_messages m SET user_id = c.user_id
+    FROM ai_conversations c WHERE c.id = m.conversation_id"""
+
+
+def _backfill() -> None:
+    if op.get_context().as_sql:
+        # Offline (--sql) mode cannot page through results; emit one statement
+        op.execute(FILL_USER)
+        return
+    bind = op.get_bind()
+    batch = sa.text(
+        f"""
+        WITH batch AS (
+            SELECT id FROM ai_messages WHERE id > :after ORDER BY id LIMIT :size
+        ), filled AS (
+            {FILL_USER} AND m.id IN (SELECT id FROM batch)
+        )
+        SELECT id FROM batch ORDER BY id DESC LIMIT 1
+        """
+    )
+    after = '00000000-0000-0000-0000-000000000000'
+    while True:
+        last = bind.execute(batch, {"after": after, "size": BACKFILL_BATCH}).scalar()
+        if last is None:
+            break
+        after = last
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    op.add_column('ai_messages', sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        'fk_ai_messages_user_id', 'ai_messages', 'users', ['user_id'], ['id'], ondelete='CASCADE',
+        postgresql_not_valid=True,
+    )
+    op.execute('ALTER TABLE ai_messages ADD CONSTRAINT ck_ai_messages_user_id CHECK (user_id IS NOT NULL) NOT VALID')
+    with op.get_context().autocommit_block():
+        _backfill()
+        # VALIDATE takes a lock that still allows reads and writes
+        op.execute('ALTER TABLE ai_messages VALIDATE CONSTRAINT fk_ai_messages_user_id')
+        op.execute('ALTER TABLE ai_messages VALIDATE CONSTRAINT ck_ai_messages_user_id')
+        op.alter_column('ai_messages', 'user_id', nullable=False)
+        op.drop_constraint('ck_ai_messages_user_id', 'ai_messages', type_='check')
+        op.create_index(
+            'ix_ai_messages_user_search', 'ai_messages', ['user_id', 'search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+        op.drop_index('ix_ai_messages_search', table_name='ai_messages', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_ai_messages_search', 'ai_messages', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+        op.drop_index('ix_ai_messages_user_search', table_name='ai_messages', postgresql_concurrently=True)
+    op.drop_constraint('fk_ai_messages_user_id', 'ai_messages', type_='foreignkey')
+    op.drop_column('ai_messages', 'user_id')
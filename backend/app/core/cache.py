@@ -0,0 +1,105 @@
+"""In-process caches shared by the service layer."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class VersionedLRUCache:
+    """Bounded LRU cache whose entries are only valid for one version of their source.
+
+    Each entry is stored together with the version it was built from (for
+    example ``Quiz.version``). A lookup with a different version is a miss and
+    the stale entry is replaced on the next build. Concurrent misses for the
+    same key are coalesced so only one coroutine builds the value.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+        # key -> (lock, coroutines holding or waiting for it)
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, version: Any, value: Any) -> None:
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_build(
+        self,
+        key: Hashable,
+        version: Any,
+        build: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the cached value for ``(key, version)``, building it at most once."""
+        value = self.get(key, version)
+        if value is not None:
+            return value
+
+        lock, users = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                # Another coroutine may have built it while we waited
+                value = self.get(key, version)
+                if value is None:
+                    value = await build()
+                    self.set(key, version, value)
+        finally:
+            # Drop the lock only once nobody holds or waits for it, so later
+            # arrivals cannot create a second lock for the same key
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+        return value
+
+
+class TTLLRUCache:
+    """Bounded LRU cache whose entries also expire ``ttl`` seconds after they are set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
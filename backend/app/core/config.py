@@ -13,6 +13,47 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     CORS_ORIGINS: List[str] = ["http://localhost:3000"]
+    # "redis" for multi-worker deployments, "memory" for tests / single node
+    LEADERBOARD_BACKEND: str = "memory"
+    # Notification push: "redis" pub/sub across workers, "memory" for a single process
+    NOTIFICATION_BROKER: str = "memory"
+    NOTIFICATION_STREAM_MAX_CONNECTIONS: int = 1000
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: int = 15
+    # AI tutor: "fake" is a local provider for development and tests
+    AI_PROVIDER: str = "fake"
+    AI_MAX_TOKENS: int = 512
+    # Prompt context per turn (summary included) and the rolling summary's share
+    AI_CONTEXT_TOKENS: int = 2048
+    AI_SUMMARY_TOKENS: int = 256
+    # Lesson retrieval (index built by the sync_lesson_index Celery task)
+    AI_INDEX_DIR: str = str(Path(__file__).resolve().parents[2] / "data" / "lesson_index")
+    AI_EMBEDDING_DIM: int = 1024
+    AI_RETRIEVAL_K: int = 4
+    AI_RETRIEVAL_NPROBE: int = 8
+    AI_RETRIEVAL_MIN_SCORE: float = 0.05
+    AI_RETRIEVAL_TOKENS: int = 384
+    AI_FAKE_FIRST_TOKEN_SECONDS: float = 0.3
+    AI_FAKE_TOKEN_SECONDS: float = 0.02
+    AI_FAKE_ERROR_RATE: float = 0.0
+    # Provider gateway: concurrency, wait queue, rate limit, retries, circuit breaker
+    AI_MAX_CONCURRENCY: int = 32
+    AI_MAX_CONCURRENCY_PER_USER: int = 2
+    AI_QUEUE_SIZE: int = 200
+    AI_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    AI_RATE_PER_SECOND: float = 20.0
+    AI_RATE_BURST: int = 40
+    AI_RETRIES: int = 2
+    AI_RETRY_BASE_SECONDS: float = 0.2
+    AI_BREAKER_FAILURES: int = 5
+    AI_BREAKER_RESET_SECONDS: float = 30.0
+    # Response cache: in-process LRU, plus a shared Redis tier when "redis"
+    AI_CACHE_BACKEND: str = "memory"
+    AI_CACHE_MAXSIZE: int = 5000
+    AI_CACHE_TTL_SECONDS: int = 86400
+    # Cold storage: messages of conversations idle this long move to zstd archives
+    AI_ARCHIVE_IDLE_DAYS: int = 90
+    AI_ARCHIVE_BATCH: int = 200
+    AI_ARCHIVE_ZSTD_LEVEL: int = 10
 
     class Config:
         pass
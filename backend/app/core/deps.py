@@ -1,13 +1,15 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from ..db.session import get_db
+from ..db.session import get_db, AsyncSessionLocal
 from ..models import User
 from . import security
 from jose import JWTError
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
@@ -31,3 +33,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     if user is None:
         raise credentials_exception
     return user
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None, description="Access token (EventSource cannot send headers)"),
+):
+    """Authenticate a long-lived stream from the Authorization header or ``?token=``.
+
+    Uses its own short session so the stream does not hold a database
+    connection for as long as the client stays connected.
+    """
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(header_token or token or "", db)
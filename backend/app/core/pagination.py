@@ -0,0 +1,32 @@
+"""Opaque keyset cursors for ``(timestamp, id)`` ordered listings.
+
+A cursor encodes the sort key of the last row a client has seen as
+URL-safe base64 JSON, so clients pass it back unchanged and never parse
+timestamps themselves. ``decode_cursor`` raises ``ValueError`` for anything
+it did not produce; routers turn that into a 400.
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(at: datetime, row_id) -> str:
+    raw = json.dumps({"t": at.isoformat(), "id": str(row_id)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """``(timestamp, id)`` of a cursor from ``encode_cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        at = datetime.fromisoformat(data["t"])
+        row_id = uuid.UUID(data["id"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if at.tzinfo is None:
+        raise ValueError("Invalid cursor")
+    return at, row_id
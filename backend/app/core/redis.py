@@ -0,0 +1,24 @@
+"""Shared async Redis client."""
+import asyncio
+from typing import Optional
+
+from redis import asyncio as redis_asyncio
+
+from .config import settings
+
+_client: Optional[redis_asyncio.Redis] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_redis() -> redis_asyncio.Redis:
+    """Return the Redis client for the running event loop (created on first use).
+
+    Connections are bound to the loop that opened them; Celery tasks run each
+    job in a fresh loop, so a new client is created when the loop changes.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = redis_asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        _client_loop = loop
+    return _client
@@ -0,0 +1,34 @@
+"""Queueing Celery tasks from the API by name.
+
+Routers must not import ``backend/celery_app.py``: it imports every task
+module and only resolves with the repository root on ``sys.path``. ``enqueue``
+sends by task name through a producer-only Celery app configured from the
+same environment variables as the worker. With CELERY_TASK_ALWAYS_EAGER the
+worker module is imported on first use and the task runs inline.
+"""
+import os
+from typing import Optional
+
+from celery import Celery
+
+# Read by backend/celery_app.py as well, so API and worker share one broker
+BROKER_URL = os.getenv('CELERY_BROKER_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', BROKER_URL)
+ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', '').lower() in ('1', 'true', 'yes')
+
+_producer: Optional[Celery] = None
+
+
+def get_producer() -> Celery:
+    global _producer
+    if _producer is None:
+        _producer = Celery('smartlearn', broker=BROKER_URL, backend=RESULT_BACKEND)
+    return _producer
+
+
+def enqueue(name: str, *args):
+    """Queue task ``name`` (e.g. ``"smartlearn.regrade_quiz"``) with positional ``args``."""
+    if ALWAYS_EAGER:
+        from backend.celery_app import celery_app
+        return celery_app.tasks[name].apply_async(args)
+    return get_producer().send_task(name, args=args)
@@ -1,6 +1,7 @@
 import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from ..core.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
@@ -8,6 +9,11 @@ DATABASE_URL = settings.DATABASE_URL
 engine = create_async_engine(DATABASE_URL, future=True, echo=False)
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+# Celery tasks run each job in a fresh event loop, so pooled connections
+# (bound to the loop that opened them) cannot be reused between jobs.
+worker_engine = create_async_engine(DATABASE_URL, future=True, echo=False, poolclass=NullPool)
+WorkerSessionLocal = sessionmaker(bind=worker_engine, class_=AsyncSession, expire_on_commit=False)
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from .routers import ai_tutor, auth, users, courses, lessons, quizzes, progress, notifications, settings, onboarding, dashboard, achievements
+from .routers import ai_tutor, auth, users, courses, lessons, quizzes, progress, notifications, settings, onboarding, dashboard, achievements, reviews
 from .core.config import settings as app_settings
 
 app = FastAPI(title="SmartLearn API", docs_url="/docs")
@@ -26,6 +26,7 @@ app.include_router(settings.router, prefix="/api/settings", tags=["settings"])
 app.include_router(onboarding.router, prefix="/api/onboarding", tags=["onboarding"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 app.include_router(achievements.router, prefix="/api/achievements", tags=["achievements"])
+app.include_router(reviews.router, prefix="/api/reviews", tags=["reviews"])
 
 # Mount static files from the public directory
 app.mount("/public", StaticFiles(directory="../public", html=True), name="static")
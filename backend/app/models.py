@@ -1,5 +1,6 @@
 import enum
 import uuid
+from datetime import datetime, timezone
 from sqlalchemy import (
     Column,
     String,
@@ -9,12 +10,15 @@ from sqlalchemy import (
     Enum,
     JSON,
     Integer,
+    Float,
     Text,
     Index,
+    LargeBinary,
+    UniqueConstraint,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from .db.base import Base
 
 
@@ -102,6 +106,13 @@ class Quiz(Base):
     title = Column(String, nullable=False)
     passing_score = Column(Integer, nullable=True)
     quiz_metadata = Column(JSON, default={})
+    # bumped whenever questions/answers change; invalidates compiled answer keys
+    version = Column(Integer, nullable=False, default=1)
+    # adaptive quizzes pick each next question by item information at the
+    # student's current ability estimate (see services/adaptive.py)
+    adaptive = Column(Boolean, nullable=False, default=False)
+    # bumped by each item-parameter fit; invalidates in-memory item banks
+    item_params_version = Column(Integer, nullable=False, default=0)
 
     questions = relationship("QuizQuestion", back_populates="quiz")
 
@@ -123,7 +134,100 @@ class QuizAttempt(Base):
     score = Column(Integer, nullable=True)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
-    answers = Column(JSON, default={})
+    # JSONB so autosave can merge partial answers in place with ||
+    answers = Column(JSONB, default={})
+    passed = Column(Boolean, nullable=True)
+    # optimistic concurrency token for autosave; bumped on every merge
+    version = Column(Integer, nullable=False, default=1)
+    # IRT ability estimate (adaptive quizzes only)
+    ability = Column(Float, nullable=True)
+    # question ids served by GET .../next, in order (adaptive quizzes only)
+    served = Column(JSONB, nullable=True)
+
+    __table_args__ = (
+        Index("ix_quiz_attempts_quiz_id_id", "quiz_id", "id"),
+        Index("ix_quiz_attempts_quiz_completed", "quiz_id", "completed_at", "id"),
+    )
+
+
+class QuizScoreSketch(Base):
+    """Per-quiz score distribution used for percentile ranks.
+
+    Scores are integer percentages, so the sketch is an exact 101-bucket
+    histogram: bounded size, mergeable by addition, O(1) to update. Each quiz
+    has several stripes that are summed on read, so concurrent submits do
+    not all queue on one row lock.
+    """
+    __tablename__ = "quiz_score_sketches"
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    stripe = Column(Integer, primary_key=True, default=0)
+    counts = Column(ARRAY(Integer), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuizRegradeRun(Base):
+    """Checkpointed bulk re-grade of a quiz's attempts after an answer-key change."""
+    __tablename__ = "quiz_regrade_runs"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    quiz_version = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    # keyset checkpoint: attempts are processed in id order, so a resumed run
+    # continues strictly after the last committed chunk
+    last_attempt_id = Column(UUID(as_uuid=True), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class QuizAnalyticsState(Base):
+    """Watermark for incremental item analytics of one quiz version."""
+    __tablename__ = "quiz_analytics_state"
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    quiz_version = Column(Integer, nullable=False)
+    attempts_count = Column(Integer, nullable=False, default=0)
+    # (completed_at, id) of the last attempt folded into the stats
+    last_completed_at = Column(DateTime(timezone=True), nullable=True)
+    last_attempt_id = Column(UUID(as_uuid=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuizItemStat(Base):
+    """Per-question analytics, stored as mergeable sufficient statistics.
+
+    ``rest`` is the attempt's score on all *other* questions (points), so the
+    point-biserial discrimination is not inflated by the item itself.
+    """
+    __tablename__ = "quiz_item_stats"
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("quiz_questions.id", ondelete="CASCADE"), primary_key=True)
+    n = Column(Integer, nullable=False, default=0)
+    n_correct = Column(Integer, nullable=False, default=0)
+    sum_rest = Column(Float, nullable=False, default=0.0)
+    sum_rest_sq = Column(Float, nullable=False, default=0.0)
+    sum_correct_rest = Column(Float, nullable=False, default=0.0)
+    # option index (as string) -> times chosen, plus "none" for unanswered
+    distractors = Column(JSON, default={})
+    p_value = Column(Float, nullable=True)
+    discrimination = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuizItemParam(Base):
+    """2PL item-response-theory parameters of one question, fitted offline."""
+    __tablename__ = "quiz_item_params"
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("quiz_questions.id", ondelete="CASCADE"), primary_key=True)
+    # quiz version the responses were graded against
+    quiz_version = Column(Integer, nullable=False)
+    discrimination = Column(Float, nullable=False, default=1.0)
+    difficulty = Column(Float, nullable=False, default=0.0)
+    n = Column(Integer, nullable=False, default=0)
+    fitted_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Progress(Base):
@@ -140,14 +244,118 @@ class Progress(Base):
     )
 
 
+class LearningResume(Base):
+    """Per-user "continue learning" pointer, rewritten on every progress write."""
+    __tablename__ = "learning_resume"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
+    next_lesson_id = Column(UUID(as_uuid=True), ForeignKey("lessons.id", ondelete="SET NULL"), nullable=True)
+    status = Column(Enum(ProgressStatus), default=ProgressStatus.in_progress)
+    progress_pct = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ReviewItem(Base):
+    """Spaced-repetition schedule (SM-2) of one missed quiz question for one user."""
+    __tablename__ = "review_items"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("quiz_questions.id", ondelete="CASCADE"), nullable=False)
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
+    ease = Column(Float, nullable=False, default=2.5)
+    interval_days = Column(Float, nullable=False, default=0.0)
+    repetitions = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    last_reviewed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_id", name="uq_review_items_user_question"),
+        # GET /api/reviews/due is a range scan on this index
+        Index("ix_review_items_user_due", "user_id", "due_at"),
+    )
+
+
+class ReviewDueCount(Base):
+    """Nightly snapshot of how many review items each user has due by ``due_before``."""
+    __tablename__ = "review_due_counts"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    due_count = Column(Integer, nullable=False, default=0)
+    due_before = Column(DateTime(timezone=True), nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class TopicMastery(Base):
+    """Bayesian Knowledge Tracing estimate of one user's mastery of one topic.
+
+    Topics come from ``lesson_metadata["topic"]`` (or a question's own
+    ``"topic"``); the row is updated in place for every graded answer.
+    """
+    __tablename__ = "topic_mastery"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    topic = Column(String, primary_key=True)
+    p_mastery = Column(Float, nullable=False)
+    answers = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # weakest-topic lookups for recommendations
+        Index("ix_topic_mastery_user_p", "user_id", "p_mastery"),
+    )
+
+
 class Notification(Base):
+    """User notification, stored in monthly range partitions of ``created_at``.
+
+    The partition key is part of the primary key; old months are removed by
+    dropping their partition (see services/notification_retention.py).
+    """
     __tablename__ = "notifications"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     type = Column(String, nullable=False)
-    payload = Column(JSON, default={})
+    payload = Column(JSONB, default={})
     is_read = Column(Boolean, default=False)
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True,
+        default=lambda: datetime.now(timezone.utc), server_default=func.now()
+    )
+
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class NotificationCounter(Base):
+    """Per-user unread notification count, kept in step with every insert and mark-read."""
+    __tablename__ = "notification_counters"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class NotificationFanout(Base):
+    """Checkpointed job that sends one notification to every learner of a course."""
+    __tablename__ = "notification_fanouts"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, default={})
+    status = Column(String, nullable=False, default="pending")
+    sent = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    # recipients are processed in user_id order; each batch commits with this
+    # checkpoint so a retried job never notifies the same user twice
+    last_user_id = Column(UUID(as_uuid=True), nullable=True)
+    rate = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
 
 
 class Conversation(Base):
@@ -156,7 +364,16 @@ class Conversation(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=True)
     conversation_metadata = Column(JSON, default={})
-    last_message_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Maintained by the statement inserting each message (services/ai_messages.py)
+    last_message_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_preview = Column(String, nullable=True)
+    # Set while the messages live in ai_message_archives (services/ai_archive.py)
+    archived_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_ai_conversations_user_recent", "user_id", last_message_at.desc(), id.desc()),
+    )
 
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -165,14 +382,56 @@ class Conversation(Base):
 class Message(Base):
     __tablename__ = "ai_messages"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = Column(UUID(as_uuid=True), ForeignKey("ai_conversations.id", ondelete="CASCADE"), nullable=False, index=True)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("ai_conversations.id", ondelete="CASCADE"), nullable=False)
+    # The conversation's owner, copied on insert so search is scoped in the index
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     sender = Column(Enum(MessageRole), nullable=False)
     content = Column(JSON, nullable=False)
     token_count = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # to_tsvector of the message text, written with the row (services/ai_search.py)
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
 
     conversation = relationship("Conversation", back_populates="messages")
 
+    __table_args__ = (
+        # keyset pages in both directions: (created_at, id) within a conversation
+        Index("ix_ai_messages_conversation_created", "conversation_id", "created_at", "id"),
+        # btree_gin: one user's full-text matches (services/ai_search.py)
+        Index("ix_ai_messages_user_search", "user_id", "search_vector", postgresql_using="gin"),
+    )
+
+
+class MessageArchive(Base):
+    """Messages of an idle conversation, moved out of ``ai_messages`` as one zstd blob."""
+    __tablename__ = "ai_message_archives"
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("ai_conversations.id", ondelete="CASCADE"), primary_key=True)
+    message_count = Column(Integer, nullable=False)
+    # JSON lines of the archived rows, zstd-compressed
+    codec = Column(String, nullable=False, default="zstd")
+    data = Column(LargeBinary, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+    first_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class AIGenerationJob(Base):
+    """AI tutor reply generated by a Celery worker instead of the HTTP request."""
+    __tablename__ = "ai_generation_jobs"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("ai_conversations.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # the user message being answered, and the assistant reply once stored
+    message_id = Column(UUID(as_uuid=True), ForeignKey("ai_messages.id", ondelete="CASCADE"), nullable=False)
+    result_message_id = Column(UUID(as_uuid=True), ForeignKey("ai_messages.id", ondelete="SET NULL"), nullable=True)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
 
 class Attachment(Base):
     __tablename__ = "attachments"
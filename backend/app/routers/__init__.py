@@ -1,3 +1,3 @@
-from . import ai_tutor, auth, users, courses, lessons, quizzes, progress, notifications, settings, onboarding, dashboard
+from . import ai_tutor, auth, users, courses, lessons, quizzes, progress, notifications, settings, onboarding, dashboard, reviews
 
-__all__ = ["ai_tutor", "auth", "users", "courses", "lessons", "quizzes", "progress", "notifications", "settings", "onboarding", "dashboard"]
+__all__ = ["ai_tutor", "auth", "users", "courses", "lessons", "quizzes", "progress", "notifications", "settings", "onboarding", "dashboard", "reviews"]
@@ -9,31 +9,47 @@ Features:
 - Create and manage tutor conversations
 - Send and receive messages in conversations
 - Track conversation history and metadata
-- Support for AI response generation (via Celery tasks)
+- Streamed AI responses over server-sent events (?stream=true)
+- Background AI responses generated by Celery with job polling (?async=true)
 
 Endpoints:
 - POST /api/ai-tutor/conversations - Create new conversation
-- GET /api/ai-tutor/conversations - List user's conversations
+- GET /api/ai-tutor/conversations - List user's conversations (keyset-paginated, with previews)
 - GET /api/ai-tutor/conversations/{conv_id} - Get conversation details
-- GET /api/ai-tutor/conversations/{conv_id}/messages - List messages in conversation
+- GET /api/ai-tutor/conversations/{conv_id}/messages - List messages in conversation (cursor pages, newest first page)
 - POST /api/ai-tutor/conversations/{conv_id}/messages - Post message to conversation
+  (with ?stream=true the assistant reply is streamed back as SSE; with
+  ?async=true it is generated by a Celery worker and a job is returned)
+- GET /api/ai/jobs/{job_id} - Status (and reply) of a background generation job
+- GET /api/ai/search - Full-text search of the user's tutor messages
+- GET /api/ai/metrics - AI provider gateway and response cache metrics (admin)
 
 Dependencies:
 - FastAPI for routing
 - SQLAlchemy for async database operations
 - Authentication for user-specific conversations
-- Celery for async AI response generation (TODO)
+- Celery for background AI response generation
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 from uuid import UUID
 from .. import schemas, models
 from ..db.session import get_db
 from ..core.deps import get_current_user
+from ..core.pagination import decode_cursor, encode_cursor
+from ..core.tasks import enqueue
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import datetime
+from sqlalchemy import select, tuple_
+from sqlalchemy.sql import func
+from ..services import ai_archive, ai_cache, ai_client, ai_context, ai_jobs, ai_messages, ai_search, tutor
+from ..services.ai_gateway import GatewayError, get_gateway
+from .courses import is_admin
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -96,46 +112,68 @@ async def create_conversation(
     return conv
 
 
-@router.get("/conversations", response_model=List[schemas.ConversationRead])
+@router.get("/conversations", response_model=schemas.ConversationPage)
 async def list_conversations(
+    limit: int = Query(20, ge=1, le=100, description="Conversations per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     db: AsyncSession = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
     """
-    List all conversations for the current user.
+    List the current user's conversations, most recently active first.
     
     Features:
-    - Retrieve all tutor conversations
-    - Ordered by most recent message
-    - Includes conversation metadata and timestamps
-    - Show last_message_at for quick scanning
+    - Keyset pagination on (last_message_at, id) with an opaque cursor
+    - Each conversation carries its message_count and a preview of the
+      newest message, so the sidebar needs no per-conversation queries
+    - Served by one index range scan of ix_ai_conversations_user_recent
+    
+    Query Parameters:
+    - limit: (optional) Conversations per page (default 20, max 100)
+    - cursor: (optional) next_cursor from the previous page
     
     Returns:
-    - List[ConversationRead]: All conversations, ordered by last_message_at DESC
-      Each includes:
-      * id - Conversation UUID
-      * title - Conversation topic
-      * metadata - Context about conversation
-      * created_at - When conversation started
-      * last_message_at - Timestamp of most recent message
+    - ConversationPage:
+      * items - ConversationRead list ordered by last_message_at DESC, id DESC:
+        id, title, last_message_at, message_count, last_message_preview
+      * next_cursor - Cursor for the next page, null on the last page
+    
+    Raises:
+    - HTTPException (400): If cursor is malformed
     
     Authentication: Required (current_user)
     HTTP Status: 200 OK
     
     Notes:
-    - Returns empty list if user has no conversations
-    - Ordered by most recent first (last_message_at DESC)
+    - Returns empty items if user has no conversations
     - Shows only current user's conversations
-    - Used for conversation history sidebar in frontend
+    - A conversation that receives a message while paging moves to the top;
+      it is not repeated on later pages
     """
-    # Query all conversations for current user
-    q = select(models.Conversation).where(
-        models.Conversation.user_id == user.id
-    ).order_by(models.Conversation.last_message_at.desc())
-    
-    # Execute and return all conversations
+    q = select(models.Conversation).where(models.Conversation.user_id == user.id)
+    if cursor:
+        try:
+            at, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        q = q.where(tuple_(models.Conversation.last_message_at, models.Conversation.id) < (at, last_id))
+    
+    # Fetch one extra row to know whether another page follows
+    q = q.order_by(
+        models.Conversation.last_message_at.desc(),
+        models.Conversation.id.desc()
+    ).limit(limit + 1)
     res = await db.execute(q)
-    return res.scalars().all()
+    conversations = res.scalars().all()
+    
+    items = conversations[:limit]
+    next_cursor = None
+    if len(conversations) > limit:
+        next_cursor = encode_cursor(items[-1].last_message_at, items[-1].id)
+    return schemas.ConversationPage(items=items, next_cursor=next_cursor)
 
 
 @router.get("/conversations/{conv_id}", response_model=schemas.ConversationRead)
@@ -188,59 +226,73 @@ async def get_conversation(
     return conv
 
 
-@router.get("/conversations/{conv_id}/messages", response_model=List[schemas.MessageRead])
+@router.get("/conversations/{conv_id}/messages", response_model=schemas.MessagePage)
 async def list_messages(
     conv_id: UUID,
-    limit: int = 50,
-    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+    before: Optional[str] = Query(None, description="before_cursor of a page; return older messages"),
+    after: Optional[str] = Query(None, description="after_cursor of a page; return newer messages"),
     db: AsyncSession = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
     """
-    Retrieve messages from a conversation with optional pagination.
+    Retrieve messages from a conversation, one keyset page at a time.
     
     Features:
-    - Get conversation message history
-    - Pagination support via limit and after parameters
-    - Filter by timestamp (get messages after specific time)
-    - Ordered chronologically (oldest first)
+    - Opens on the newest messages (reverse scan), as chat UIs show them
+    - Opaque cursors over (created_at, id) page backwards (older) and
+      forwards (newer) without skipping or repeating messages that share
+      a timestamp
+    - Each page is one range scan of ix_ai_messages_conversation_created,
+      whatever the length of the conversation
+    - Conversations archived after AI_ARCHIVE_IDLE_DAYS of inactivity are
+      restored from compressed cold storage on first access
     - Verify user owns conversation
     
     Path Parameters:
     - conv_id: (required) UUID of conversation
     
     Query Parameters:
-    - limit: (optional) Max messages to return (default 50)
-    - after: (optional) ISO 8601 timestamp; return only messages after this time
-      Format: "2024-01-15T10:30:00" or "2024-01-15T10:30:00.123456"
+    - limit: (optional) Messages per page (default 50, max 200)
+    - before: (optional) before_cursor from a page; return the messages
+      just older than that page
+    - after: (optional) after_cursor from a page; return the messages
+      just newer than that page (use to poll for new messages)
     
     Returns:
-    - List[MessageRead]: Messages ordered by created_at ASC (oldest first)
-      Each message includes:
-      * id - Message UUID
-      * conversation_id - Parent conversation
-      * sender - "user" or "ai" (who sent message)
-      * content - Message text
-      * created_at - Message timestamp
-      * attachments - Optional file/media links
+    - MessagePage:
+      * items - MessageRead list ordered by created_at ASC (oldest first)
+      * before_cursor - Cursor for older messages, null at the start
+      * after_cursor - Cursor for newer messages (null only for an empty
+        conversation)
+      * has_newer - Whether newer messages exist beyond this page
     
     Raises:
+    - HTTPException (400): If a cursor is malformed or both are given
     - HTTPException (404): If conversation doesn't exist or user doesn't own it
     
     Authentication: Required (current_user)
     HTTP Status: 200 OK on success, 404 Not Found
     
     Pagination Example:
-    - First call: GET /api/ai-tutor/conversations/{conv_id}/messages?limit=20
-    - Get last message's created_at timestamp
-    - Next call: GET /api/.../messages?limit=20&after=2024-01-15T10:45:00
-    
-    Notes:
-    - Limit defaults to 50 for reasonable payload size
-    - After parameter enables infinite scroll/pagination
-    - Ordered chronologically (oldest messages first)
-    - Useful for loading conversation history in chat UI
+    - Open: GET /api/ai/conversations/{conv_id}/messages?limit=30
+    - Scroll up: GET .../messages?limit=30&before={before_cursor}
+    - New messages: GET .../messages?after={after_cursor}
     """
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before or after, not both"
+        )
+    try:
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
     # First verify user owns this conversation
     q_conv = select(models.Conversation).where(models.Conversation.id == conv_id)
     res = await db.execute(q_conv)
@@ -252,35 +304,33 @@ async def list_messages(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Conversation with ID '{conv_id}' not found or access denied"
         )
-
-    # Build base query for messages
-    q = select(models.Message).where(
-        models.Message.conversation_id == conv_id
-    ).order_by(models.Message.created_at.asc()).limit(limit)
     
-    # If after timestamp provided, filter to messages after that time
-    if after:
-        try:
-            # Parse ISO 8601 timestamp
-            after_dt = datetime.fromisoformat(after)
-            # Query messages created after the specified time
-            q = select(models.Message).where(
-                models.Message.conversation_id == conv_id,
-                models.Message.created_at > after_dt
-            ).order_by(models.Message.created_at.asc()).limit(limit)
-        except ValueError:
-            # Ignore invalid timestamp format; return all messages
-            pass
+    # Idle conversations keep their messages in compressed cold storage;
+    # opening one moves them back before reading
+    if conv.archived_at is not None:
+        await ai_archive.rehydrate(db, conv)
+        await db.commit()
     
-    # Execute and return messages
-    res = await db.execute(q)
-    return res.scalars().all()
+    messages, has_older, has_newer = await ai_messages.page_messages(
+        db, conv_id, limit, before=before_key, after=after_key
+    )
+    
+    # An empty page keeps the caller's position so polling can continue
+    first, last = (messages[0], messages[-1]) if messages else (None, None)
+    return schemas.MessagePage(
+        items=messages,
+        before_cursor=encode_cursor(first.created_at, first.id) if first and has_older else None,
+        after_cursor=encode_cursor(last.created_at, last.id) if last else after,
+        has_newer=has_newer
+    )
 
 
 @router.post("/conversations/{conv_id}/messages", response_model=schemas.MessageRead, status_code=status.HTTP_201_CREATED)
 async def post_message(
     conv_id: UUID,
     payload: schemas.MessageCreate,
+    stream: bool = Query(False, description="Stream the assistant reply as server-sent events"),
+    background: bool = Query(False, alias="async", description="Generate the assistant reply in a Celery job"),
     db: AsyncSession = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
@@ -290,7 +340,8 @@ async def post_message(
     Features:
     - Add user message to conversation
     - Trigger AI response generation (via Celery task)
-    - Update conversation's last_message_at timestamp
+    - Update conversation's last_message_at, message_count and preview
+      in the same statement as the insert
     - Track sender (user vs AI)
     - Support message attachments/metadata
     
@@ -302,6 +353,12 @@ async def post_message(
     - content: (required) Message text
     - attachments: (optional) JSON array of file/resource references
     
+    Query Parameters:
+    - stream: (optional) If true, respond with a text/event-stream that carries
+      the assistant reply token by token (see Streaming below)
+    - async: (optional) If true, queue the reply for a Celery worker and
+      respond 202 Accepted with the job (see Background generation below)
+    
     Returns:
     - MessageRead: Created message object with:
       * id - Unique message UUID
@@ -312,29 +369,62 @@ async def post_message(
       * attachments - Optional file references
     
     Raises:
+    - HTTPException (400): If both stream and async are requested
     - HTTPException (404): If conversation doesn't exist or user doesn't own it
     - HTTPException (422): If validation fails
+    - HTTPException (503): With ?stream=true, when the AI gateway's wait queue
+      is full or the provider circuit is open (nothing is stored; see Retry-After);
+      with ?async=true, when the job could not be queued (the user message is
+      stored and the body is the failed job)
     
     Authentication: Required (current_user)
-    HTTP Status: 201 Created on success, 404 Not Found
-    
-    AI Response Generation:
-    - After message created, should enqueue Celery task for AI response
-    - AI task: analyze message, generate response, save as new message
-    - TODO: Integrate with Celery + AI client service
+    HTTP Status: 201 Created on success (202 Accepted with ?async=true), 404 Not Found
+    
+    Streaming (?stream=true):
+    - The user message is committed first, then the reply is generated and
+      forwarded as each token arrives, so the user waits for the first token
+      rather than the whole answer
+    - Prompt context is the conversation's rolling summary plus the newest
+      messages that fit AI_CONTEXT_TOKENS (by stored token_count), read with
+      a reverse keyset scan that stops at the budget; messages sliding out
+      of the window are folded into conversation_metadata["summary"]
+    - Events:
+      * message - MessageRead of the user's message
+      * token - {"delta": "<text>"} for each generated token
+      * done - MessageRead of the stored assistant message (with token_count)
+      * error - {"detail": "..."} if generation failed
+    - The assistant message is stored once generation completes; a client
+      that disconnects early gets no stored reply
+    - A question already answered in the same context (normalized prompt,
+      conversation_metadata lesson/course/topic, same earlier turns) is
+      replayed from the response cache without calling the provider;
+      identical questions in flight share one provider call
+    
+    Background generation (?async=true):
+    - The user message and an AIGenerationJob (status "pending") are
+      committed, the smartlearn.generate_ai_reply task is queued, and the
+      response is AIGenerationJobRead with a Location header for polling
+    - The worker builds the prompt context ending at the user's message (later
+      messages are left out) and uses the same cache and
+      gateway as streaming; it retries gateway/provider failures with backoff
+    - On completion (or final failure) the user gets an "ai_reply"
+      notification ({job_id, conversation_id, status, message_id}) on the
+      notifications stream; GET /api/ai/jobs/{job_id} returns the reply
+    - If the task cannot be queued the job is returned as "failed" with 503
+    - With CELERY_TASK_ALWAYS_EAGER=1 the task runs inline before responding
     
     Notes:
     - Message saved immediately even before AI response
-    - AI response generation is async (TODO via Celery)
     - Useful for chat interface where user types and sends message
-    - Update conversation.last_message_at on each message
+    - Every message (user or assistant) updates the conversation's
+      last_message_at, message_count and last_message_preview
     
     Frontend Usage:
     1. User types message in chat UI
     2. POST message to this endpoint
     3. Show user message in chat immediately
-    4. Poll/WebSocket for AI response (when ready)
-    5. Display AI response in chat
+    4. With ?stream=true, append "token" deltas as they arrive
+    5. Replace the draft with the "done" message
     
     Example Request:
     ```json
@@ -357,19 +447,40 @@ async def post_message(
             detail=f"Conversation with ID '{conv_id}' not found or access denied"
         )
     
-    # Create new message in conversation
-    msg = models.Message(
-        conversation_id=conv_id,
-        sender=payload.sender,
-        content=payload.content
-    )
+    if stream and background:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either stream or async, not both"
+        )
     
-    # Add to session
-    db.add(msg)
-    await db.flush()
+    # Refuse before storing anything if the AI gateway cannot take the request
+    if stream:
+        try:
+            get_gateway().check()
+        except GatewayError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+                headers={"Retry-After": str(exc.retry_after)}
+            )
+    
+    # Restore archived messages first so they are part of the context
+    if conv.archived_at is not None:
+        await ai_archive.rehydrate(db, conv)
+    
+    # Insert the message; the same statement bumps the conversation's
+    # message_count, last_message_at and last_message_preview
+    msg = await ai_messages.add_message(
+        db,
+        conv_id,
+        payload.sender,
+        payload.content,
+        ai_client.count_tokens(ai_client.message_text(payload.content))
+    )
     
-    # TODO: Enqueue Celery task here for AI response generation
-    # Example: celery_app.send_task('tasks.generate_ai_response', args=[str(conv_id), str(msg.id)])
+    # Build the prompt context now (the stream runs after this session closes);
+    # its rolling-summary update commits together with the message
+    context = await ai_context.build_context(db, conv) if stream else None
     
     # Commit message to database
     await db.commit()
@@ -377,4 +488,189 @@ async def post_message(
     # Refresh to get timestamps
     await db.refresh(msg)
     
-    return msg
+    if background:
+        return await _enqueue_reply(db, user, msg)
+    
+    if not stream:
+        return msg
+    
+    cache_key = ai_cache.response_key(context, conv.conversation_metadata)
+    return StreamingResponse(
+        tutor.stream_reply(user.id, msg, context, cache_key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _enqueue_reply(db: AsyncSession, user: models.User, msg: models.Message) -> JSONResponse:
+    """Create and queue a generation job answering ``msg``; 202 with the job.
+
+    If the job cannot be queued it is marked failed and returned with 503.
+    """
+    job = models.AIGenerationJob(
+        conversation_id=msg.conversation_id,
+        user_id=user.id,
+        message_id=msg.id,
+        status=ai_jobs.PENDING,
+        attempts=0
+    )
+    db.add(job)
+    await db.commit()
+    
+    # The job row is committed first so the worker always finds it
+    status_code = status.HTTP_202_ACCEPTED
+    try:
+        enqueue("smartlearn.generate_ai_reply", str(job.id))
+    except Exception:
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        logger.exception("Could not enqueue AI generation job %s", job.id)
+        job.status = ai_jobs.FAILED
+        job.error = "Could not queue the AI response"
+        job.finished_at = func.now()
+        await db.commit()
+    
+    # Eager tasks have already run in another session; read the current state
+    await db.refresh(job)
+    return JSONResponse(
+        status_code=status_code,
+        content=jsonable_encoder(schemas.AIGenerationJobRead.model_validate(job, from_attributes=True)),
+        headers={"Location": f"/api/ai/jobs/{job.id}"}
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.AIGenerationJobRead)
+async def get_generation_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user)
+):
+    """
+    Poll a background AI reply generation job.
+    
+    Features:
+    - Report job status: pending, running, completed or failed
+    - Include the stored assistant message once completed
+    - Report attempts made and the last error
+    
+    Path Parameters:
+    - job_id: (required) UUID returned by POST .../messages?async=true
+    
+    Returns:
+    - AIGenerationJobRead: Job with:
+      * status - pending, running, completed or failed
+      * message_id - The user message being answered
+      * result_message_id / result - The assistant reply (when completed)
+      * attempts, error, created_at, started_at, finished_at
+    
+    Raises:
+    - HTTPException (404): If job doesn't exist or belongs to another user
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success, 404 Not Found
+    
+    Notes:
+    - Prefer the "ai_reply" notification over tight polling; poll every few
+      seconds as a fallback
+    """
+    job = await db.get(models.AIGenerationJob, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID '{job_id}' not found or access denied"
+        )
+    
+    result = await db.get(models.Message, job.result_message_id) if job.result_message_id else None
+    job_read = schemas.AIGenerationJobRead.model_validate(job, from_attributes=True)
+    job_read.result = schemas.MessageRead.model_validate(result, from_attributes=True) if result else None
+    return job_read
+
+
+@router.get("/search", response_model=schemas.MessageSearchPage)
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    limit: int = Query(20, ge=1, le=50, description="Hits per page"),
+    offset: int = Query(0, ge=0, le=1000, description="next_offset of the previous page"),
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(get_current_user)
+):
+    """
+    Search the current user's tutor conversation history.
+    
+    Features:
+    - Full-text match on message text (English stemming, so "fraction"
+      finds "fractions"), using a GIN index on (user_id, search_vector)
+    - Web-search syntax: "quoted phrases", or, -excluded
+    - Ranked by ts_rank_cd, newest first among equal ranks
+    - Snippets with the matching terms highlighted
+    - Only the caller's own conversations are searched
+    
+    Query Parameters:
+    - q: (required) Search text (1-200 characters)
+    - limit: (optional) Hits per page (default 20, max 50)
+    - offset: (optional) next_offset from the previous page (max 1000)
+    
+    Returns:
+    - MessageSearchPage:
+      * items - MessageSearchHit list: message_id, conversation_id,
+        conversation_title, sender, created_at, rank, snippet
+      * next_offset - Offset of the next page, null on the last page
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK
+    
+    Notes:
+    - A query of only stop words ("the", "how") matches nothing
+    - Messages of archived (long idle) conversations are not searched
+      until the conversation is opened again
+    - Snippets mark terms with <mark>...</mark>; escape the rest when
+      rendering as HTML
+    """
+    hits, more = await ai_search.search(db, user.id, q, limit, offset)
+    return schemas.MessageSearchPage(
+        items=[
+            schemas.MessageSearchHit(
+                message_id=hit.id,
+                conversation_id=hit.conversation_id,
+                conversation_title=hit.conversation_title,
+                sender=getattr(hit.sender, "value", hit.sender),
+                created_at=hit.created_at,
+                rank=hit.rank,
+                snippet=hit.snippet
+            )
+            for hit in hits
+        ],
+        next_offset=offset + limit if more else None
+    )
+
+
+@router.get("/metrics")
+async def gateway_metrics(
+    user: models.User = Depends(get_current_user)
+):
+    """
+    Report the AI provider gateway's load and health for this worker.
+    
+    Features:
+    - queue_depth / max_queue_depth - requests waiting for a slot now / at peak
+    - in_flight - provider calls running (bounded by max_concurrency)
+    - wait_seconds - p50/p95/p99/max time spent queued
+    - first_token_seconds - p50/p95/p99/max provider time-to-first-token
+    - admitted, completed, failed, retries and rejected (by reason)
+    - circuit - closed, open or half_open
+    - cache - response cache hits by tier, coalesced requests, misses and hit_rate
+    
+    Raises:
+    - HTTPException (403): If user is not an admin
+    
+    Authentication: Required (admin)
+    HTTP Status: 200 OK
+    
+    Notes:
+    - Counters are per worker process and reset on restart
+    """
+    if not is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view AI gateway metrics"
+        )
+    return {**get_gateway().metrics(), "cache": ai_cache.get_cache().metrics()}
@@ -11,6 +11,8 @@ Endpoints:
 - POST /api/courses - Create new course (admin only)
 - PUT /api/courses/{course_id} - Update course (admin only)
 - DELETE /api/courses/{course_id} - Delete course (admin only)
+- GET /api/courses/{course_id}/leaderboard - Course leaderboard (sum of best quiz scores)
+- GET /api/courses/{course_id}/fanout - Status of the latest learner announcement (admin only)
 
 Dependencies:
 - FastAPI for routing
@@ -18,15 +20,19 @@ Dependencies:
 - Admin role check for write operations
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..db.session import get_db
 from .. import schemas, models
 from ..core.deps import get_current_user
+from ..core.tasks import enqueue
+from ..services import leaderboard, notification_fanout, resume_service
 from typing import List
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.get("/", response_model=List[schemas.CourseRead])
@@ -311,6 +317,8 @@ async def update_course(
     - created_by and created_at are never changed
     - Use to publish/unpublish courses
     - Can update metadata for flexible additional data
+    - Updating a published course notifies its learners in the background
+      (Celery fan-out job; the request does not wait for delivery)
     """
     # Check admin authorization
     if not is_admin(current_user):
@@ -335,9 +343,22 @@ async def update_course(
     for k, v in payload.dict(exclude_unset=True).items():
         setattr(course, k, v)
     
+    # Queue the learner announcement in the same transaction as the update
+    fanout = await notification_fanout.create_run(db, course) if course.is_published else None
+    
     # Commit changes
     await db.commit()
     
+    # Hand delivery to Celery; a broker outage must not fail the update
+    if fanout is not None:
+        try:
+            enqueue("smartlearn.fan_out_notifications", str(fanout.id))
+        except Exception:
+            logger.exception("Could not enqueue notification fan-out %s", fanout.id)
+    
+    # Lesson ordering may have changed with the course; rebuild lazily
+    resume_service.invalidate_course(course.id)
+    
     # Refresh to get updated state
     await db.refresh(course)
     
@@ -405,3 +426,86 @@ async def delete_course(
     
     # Commit deletion
     await db.commit()
+    
+    # Drop the cached lesson ordering for the deleted course
+    resume_service.invalidate_course(course_id)
+
+
+@router.get("/{course_id}/leaderboard", response_model=schemas.LeaderboardRead)
+async def get_course_leaderboard(
+    course_id: str,
+    limit: int = Query(10, ge=1, le=100, description="Number of top entries to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the leaderboard for a course.
+    
+    A user's course score is the sum of their best scores on the course's quizzes.
+    
+    Features:
+    - Served from a sorted set updated incrementally on every graded attempt
+    - Top N and the caller's rank are O(log n) lookups
+    
+    Query Parameters:
+    - limit: Number of top entries (1-100, default 10)
+    
+    Returns:
+    - LeaderboardRead with top entries and the caller's own entry (``me``)
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK, 404 Not Found if the course does not exist
+    """
+    course = await db.get(models.Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with ID '{course_id}' not found"
+        )
+
+    board = await leaderboard.ensure_course_board(db, course.id)
+    return await leaderboard.snapshot(db, board, current_user.id, limit)
+
+
+@router.get("/{course_id}/fanout", response_model=schemas.NotificationFanoutRead)
+async def get_fanout_status(
+    course_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the latest notification fan-out run for a course (admin only).
+    
+    Features:
+    - Progress of the background job that notifies the course's learners
+    - Counts of sent and skipped (opted-out) recipients
+    - Throughput (recipients per second) once completed
+    
+    Returns:
+    - NotificationFanoutRead: status ('pending', 'running', 'completed', 'failed'),
+      sent, skipped, rate, error and timestamps
+    
+    Raises:
+    - HTTPException (403): If user is not admin
+    - HTTPException (404): If the course has no fan-out runs
+    
+    Authentication: Required with admin role
+    HTTP Status: 200 OK
+    """
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required"
+        )
+
+    q = select(models.NotificationFanout).where(
+        models.NotificationFanout.course_id == course_id
+    ).order_by(models.NotificationFanout.created_at.desc()).limit(1)
+    res = await db.execute(q)
+    run = res.scalar_one_or_none()
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No notification fan-out for this course"
+        )
+    return run
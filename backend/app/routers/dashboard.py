@@ -15,6 +15,7 @@ Endpoints:
 - GET /api/dashboard/streak - User's learning streak and weekly progress
 - GET /api/dashboard/recommendation - Personalized AI recommendation
 - GET /api/dashboard/overview - Aggregated learning statistics
+- GET /api/dashboard/mastery - Per-topic mastery estimates
 
 Dependencies:
 - FastAPI for routing and HTTP handling
@@ -27,8 +28,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from datetime import datetime, timedelta
 from ..db.session import get_db
-from .. import models
+from .. import models, schemas
 from ..core.deps import get_current_user
+from ..services import mastery
 from pydantic import BaseModel
 from typing import Optional
 
@@ -213,6 +215,8 @@ async def get_ai_recommendation(
       * course_id: Suggested course (if applicable)
     
     Recommendation Logic:
+    - Weakest topic by mastery estimate (below 95%): practice that topic
+    - Otherwise, by progress on the user's best lesson:
     - Progress >= 70%: Suggest advanced topics to challenge mastery
     - Progress 40-70%: Encourage continuation to deepen understanding
     - Progress < 40%: Suggest beginner-friendly lessons for foundation
@@ -226,6 +230,15 @@ async def get_ai_recommendation(
     - Recommendations update dynamically as user progresses
     - Useful for motivational messaging and guided learning paths
     """
+    # Weakest not-yet-mastered topic (and a lesson on it) in one query
+    weakest = await mastery.weakest_topic(db, current_user.id)
+    if weakest is not None:
+        return RecommendationResponse(
+            text=mastery.recommendation_text(weakest.topic, weakest.p_mastery),
+            lesson_id=str(weakest.lesson_id) if weakest.lesson_id else None,
+            course_id=str(weakest.course_id) if weakest.course_id else None
+        )
+
     # Get user's progress ordered by highest progress_pct first
     q = select(models.Progress).where(
         models.Progress.user_id == current_user.id
@@ -367,3 +380,33 @@ async def get_dashboard_overview(
         current_streak=current_streak,
         study_hours=total_study_hours
     )
+
+
+@router.get("/mastery", response_model=list[schemas.TopicMasteryRead])
+async def get_topic_mastery(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the user's mastery estimate for every topic they have practiced.
+    
+    Features:
+    - Bayesian Knowledge Tracing probability per topic (lesson_metadata topic)
+    - Maintained incrementally on every graded quiz answer
+    - Single indexed query; no replay of attempt history
+    
+    Returns:
+    - List[TopicMasteryRead], weakest topic first:
+      * topic - Topic name
+      * p_mastery - Probability the topic is mastered (0-1)
+      * answers / correct - Graded answers observed for the topic
+      * mastered - p_mastery >= 0.95
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK (empty list if no quizzes were graded)
+    """
+    rows = await mastery.list_mastery(db, current_user.id)
+    items = [schemas.TopicMasteryRead.model_validate(row, from_attributes=True) for row in rows]
+    for item in items:
+        item.mastered = item.p_mastery >= mastery.MASTERED
+    return items
@@ -11,7 +11,10 @@ Notifications keep users informed about:
 
 Endpoints:
 - GET /api/notifications - List user's notifications with optional type and read status filtering
+- GET /api/notifications/stream - Server-sent events stream of new notifications
 - PATCH /api/notifications/{notification_id}/read - Mark notification as read
+- POST /api/notifications/read - Mark a set of notifications (or all before a time) as read
+- GET /api/notifications/unread_count - Unread badge count
 - GET /api/notifications/achievements - List user's unlocked achievements
 
 Dependencies:
@@ -20,18 +23,43 @@ Dependencies:
 - Authentication for user-specific operations
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from ..db.session import get_db
+from sqlalchemy import select, and_, tuple_
+from ..db.session import get_db, AsyncSessionLocal
 from .. import schemas, models
-from ..core.deps import get_current_user
+from ..core.config import settings as app_settings
+from ..core.deps import get_current_user, get_stream_user
+from ..services import mastery, notification_service
+from ..services.notification_bus import StreamLimitReached, get_broker
 from typing import List, Optional
 from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from contextlib import AsyncExitStack
+import asyncio
 
 router = APIRouter()
 
 
+class _SubscribedStreamingResponse(StreamingResponse):
+    """Streaming response that holds a broker subscription for its whole lifetime.
+
+    The subscription is entered by the endpoint, so the connection limit is
+    checked before any response is built, and released here even when the
+    client disconnects before the body is iterated.
+    """
+
+    def __init__(self, content, subscription: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self._subscription = subscription
+
+    async def __call__(self, scope, receive, send) -> None:
+        async with self._subscription:
+            await super().__call__(scope, receive, send)
+
+
 class RecommendationResponse(BaseModel):
     """
     Response model for AI-powered learning recommendation.
@@ -55,6 +83,9 @@ class RecommendationResponse(BaseModel):
 async def list_notifications(
     filter_type: Optional[str] = Query(None, alias="type", description="Filter by type: 'unread', 'ai_insights', 'course_updates', 'achievements', 'reminders'"),
     unread_only: Optional[bool] = Query(False, description="If true, only show unread notifications"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of notifications to return"),
+    before: Optional[datetime] = Query(None, description="Only notifications older than this created_at (keyset cursor)"),
+    before_id: Optional[UUID] = Query(None, description="Tie-breaker for 'before': id of the last notification seen"),
     db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
@@ -75,6 +106,9 @@ async def list_notifications(
       * 'achievements' - Achievement and milestone unlocks
       * 'reminders' - Reminders and pending activity alerts
     - unread_only: (optional) Boolean flag to show only unread notifications (overrides 'all' filter)
+    - limit: (optional) Page size (1-200, default 50)
+    - before / before_id: (optional) Keyset cursor; pass the created_at and id of the
+      last notification of the previous page to get the next (older) page
     
     Returns:
     - List[NotificationRead]: Array of notification objects matching filters, ordered by most recent first
@@ -94,7 +128,12 @@ async def list_notifications(
     Notes:
     - Returns empty list if no notifications match the filters
     - unread_only parameter takes precedence over filter_type='all'
-    - Notifications ordered by created_at DESC (most recent first)
+    - Notifications ordered by created_at DESC, id DESC (most recent first)
+    - Pages are index range scans on (user_id, created_at, id); a cursor in an
+      old month only touches that month's partitions
+    - Notifications older than the retention period are dropped; bursts of
+      unread same-type notifications may be collapsed into a digest whose
+      metadata holds {"digest": true, "count": n, "items": [...]}
     - Type field is stored in model.type, not metadata (unlike quizzes/lessons)
     """
     # Build filter list starting with user ownership check
@@ -110,14 +149,114 @@ async def list_notifications(
         # Filter by notification type (ai_insights, course_updates, achievements, reminders)
         filters.append(models.Notification.type == filter_type)
     
+    # Keyset pagination: strictly older than the cursor row
+    if before is not None:
+        if before_id is not None:
+            filters.append(tuple_(models.Notification.created_at, models.Notification.id) < tuple_(before, before_id))
+        else:
+            filters.append(models.Notification.created_at < before)
+
     # Build query with all filters
-    q = select(models.Notification).where(and_(*filters)).order_by(models.Notification.created_at.desc())
+    q = select(models.Notification).where(and_(*filters)).order_by(
+        models.Notification.created_at.desc(), models.Notification.id.desc()
+    ).limit(limit)
     
     # Execute and return results
     res = await db.execute(q)
     return res.scalars().all()
 
 
+# SSE comment line: keeps proxies from closing idle streams, ignored by clients
+HEARTBEAT = b": ping\n\n"
+# Max notifications replayed to a client reconnecting with Last-Event-ID
+REPLAY_LIMIT = 100
+
+
+async def _missed_since(user_id, last_event_id: Optional[str]) -> List[str]:
+    """SSE frames for notifications created after ``last_event_id`` (short-lived session)."""
+    try:
+        last_id = UUID(last_event_id)
+    except (TypeError, ValueError):
+        return []
+    async with AsyncSessionLocal() as db:
+        since = select(models.Notification.created_at).where(
+            models.Notification.id == last_id,
+            models.Notification.user_id == user_id
+        ).scalar_subquery()
+        q = select(models.Notification).where(
+            models.Notification.user_id == user_id,
+            models.Notification.created_at > since
+        ).order_by(models.Notification.created_at.asc()).limit(REPLAY_LIMIT)
+        res = await db.execute(q)
+        return [notification_service.sse_frame(n) for n in res.scalars().all()]
+
+
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: models.User = Depends(get_stream_user)
+):
+    """
+    Push new notifications to the client as server-sent events.
+    
+    Features:
+    - One long-lived connection replaces polling GET /api/notifications
+    - Notifications are pushed as soon as they are committed, from any worker
+      (Redis pub/sub) or from this process (in-memory broker)
+    - Heartbeat comment every NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+    - Reconnecting clients send Last-Event-ID and receive what they missed
+    - No database connection is held while the stream is open
+    
+    Authentication:
+    - Bearer token in the Authorization header, or ?token= for EventSource
+    
+    Event format:
+    ```
+    id: <notification id>
+    event: notification
+    data: {NotificationRead JSON}
+    ```
+    
+    HTTP Status: 200 OK (text/event-stream), 401 Unauthorized,
+    503 Service Unavailable when this worker is at its connection limit
+    """
+    broker = get_broker()
+    user_id = current_user.id
+    heartbeat = app_settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+
+    # Take the connection slot now, so a full worker answers 503 instead of
+    # an empty 200 stream
+    subscription = AsyncExitStack()
+    try:
+        queue = await subscription.enter_async_context(broker.subscribe(user_id))
+    except StreamLimitReached:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open notification streams",
+            headers={"Retry-After": "30"}
+        )
+
+    async def events():
+        yield b"retry: 5000\n\n"
+        if last_event_id:
+            for frame in await _missed_since(user_id, last_event_id):
+                yield frame
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            yield frame
+
+    return _SubscribedStreamingResponse(
+        events(),
+        subscription,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.patch("/{notification_id}/read", response_model=schemas.NotificationRead)
 async def mark_read(
     notification_id: str,
@@ -169,16 +308,81 @@ async def mark_read(
             detail=f"Notification with ID '{notification_id}' not found or does not belong to you"
         )
     
-    # Update is_read status to True
-    n.is_read = True
+    # Mark read and decrement the unread counter in one statement
+    if not n.is_read:
+        await notification_service.mark_read(db, current_user.id, ids=[n.id])
+        await db.commit()
+        
+        # Refresh to get updated record with any database-side changes
+        await db.refresh(n)
     
-    # Commit transaction to persist change
+    return n
+
+
+@router.post("/read", response_model=schemas.NotificationMarkReadResult)
+async def mark_many_read(
+    payload: schemas.NotificationMarkRead,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Mark several notifications as read at once.
+    
+    Features:
+    - Marks the given ids and/or everything created at or before a timestamp
+    - One UPDATE ... RETURNING statement that also adjusts the unread counter
+    - Already-read and other users' notifications are ignored
+    
+    Request Body:
+    - ids: (optional) Notification UUIDs to mark
+    - before: (optional) Mark every notification created at or before this time
+    
+    Returns:
+    - NotificationMarkReadResult with:
+      * marked - Number of notifications that changed to read
+      * unread - Remaining unread count
+    
+    Raises:
+    - HTTPException (422): If neither ids nor before is given
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK
+    """
+    if payload.ids is None and payload.before is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Provide ids and/or before"
+        )
+
+    marked, unread = await notification_service.mark_read(
+        db, current_user.id, ids=payload.ids, before=payload.before
+    )
     await db.commit()
+    if unread is None:
+        # First use: counter row is created from the table
+        unread = await notification_service.unread_count(db, current_user.id)
+    return schemas.NotificationMarkReadResult(marked=len(marked), unread=unread)
+
+
+@router.get("/unread_count", response_model=schemas.UnreadCountRead)
+async def get_unread_count(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the current user's unread notification count (badge).
     
-    # Refresh to get updated record with any database-side changes
-    await db.refresh(n)
+    Features:
+    - Primary-key lookup on the maintained per-user counter
+    - No scan of the notifications table
     
-    return n
+    Returns:
+    - UnreadCountRead with unread
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK
+    """
+    return schemas.UnreadCountRead(unread=await notification_service.unread_count(db, current_user.id))
 
 
 @router.get("/achievements", response_model=List[schemas.AchievementRead])
@@ -246,6 +450,8 @@ async def get_ai_recommendation(
       * course_id: Suggested course (if applicable)
 
     Recommendation Logic:
+    - Weakest topic by mastery estimate (below 95%): practice that topic
+    - Otherwise, by progress on the user's best lesson:
     - Progress >= 70%: Suggest advanced topics to challenge mastery
     - Progress 40-70%: Encourage continuation to deepen understanding
     - Progress < 40%: Suggest beginner-friendly lessons for foundation
@@ -259,6 +465,15 @@ async def get_ai_recommendation(
     - Recommendations update dynamically as user progresses
     - Useful for motivational messaging and guided learning paths
     """
+    # Weakest not-yet-mastered topic (and a lesson on it) in one query
+    weakest = await mastery.weakest_topic(db, current_user.id)
+    if weakest is not None:
+        return RecommendationResponse(
+            text=mastery.recommendation_text(weakest.topic, weakest.p_mastery),
+            lesson_id=str(weakest.lesson_id) if weakest.lesson_id else None,
+            course_id=str(weakest.course_id) if weakest.course_id else None
+        )
+
     # Get user's progress ordered by highest progress_pct first
     q = select(models.Progress).where(
         models.Progress.user_id == current_user.id
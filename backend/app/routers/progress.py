@@ -7,6 +7,7 @@ Monitors completion status, progress percentage, and learning advancement.
 Endpoints:
 - GET /api/progress/users/me/progress - Retrieve current user's progress records
 - POST /api/progress - Create or update progress for a lesson
+- GET /api/progress/resume - Lesson the current user should continue with
 
 Dependencies:
 - FastAPI for routing
@@ -20,6 +21,7 @@ from sqlalchemy import select
 from ..db.session import get_db
 from .. import schemas, models
 from ..core.deps import get_current_user
+from ..services import resume_service
 
 router = APIRouter()
 
@@ -97,7 +99,7 @@ async def update_progress(
       * updated_at - Current timestamp
     
     Raises:
-    - HTTPException (404): If lesson doesn't exist (FK constraint)
+    - HTTPException (404): If lesson doesn't exist
     - HTTPException (422): If validation fails
     
     Authentication: Required (current_user)
@@ -108,6 +110,7 @@ async def update_progress(
     - Creates new record if none exists
     - Updates status and/or progress_pct if provided
     - Leaves unchanged fields unmodified
+    - Rewrites the user's resume pointer in the same transaction
     
     Notes:
     - One progress record per user per lesson
@@ -124,6 +127,16 @@ async def update_progress(
     }
     ```
     """
+    # Resolve the lesson's course (also validates the lesson exists)
+    lesson_q = select(models.Lesson.course_id).where(models.Lesson.id == payload.lesson_id)
+    lesson_res = await db.execute(lesson_q)
+    course_id = lesson_res.scalar_one_or_none()
+    if course_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lesson with ID '{payload.lesson_id}' not found"
+        )
+
     # Check if progress record already exists for this user + lesson
     q = select(models.Progress).where(
         models.Progress.user_id == current_user.id,
@@ -149,6 +162,10 @@ async def update_progress(
     if payload.progress_pct is not None:
         p.progress_pct = payload.progress_pct
 
+    # Point the user's "continue learning" record at this lesson
+    await db.flush()
+    await resume_service.record_progress(db, p, course_id)
+
     # Commit changes to database
     await db.commit()
     
@@ -156,3 +173,51 @@ async def update_progress(
     await db.refresh(p)
     
     return p
+
+
+@router.get("/progress/resume", response_model=schemas.ResumeRead)
+async def get_resume(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the lesson the current user should continue with.
+    
+    Features:
+    - Single primary-key lookup on the user's resume record
+    - Resume record is maintained on every POST /api/progress
+    - Next lesson is precomputed from the course's lesson ordering
+    
+    Returns:
+    - ResumeRead: Resume pointer with:
+      * course_id - Course of the most recently touched lesson
+      * lesson_id - Most recently touched lesson
+      * next_lesson_id - Following lesson in the course (NULL if last)
+      * resume_lesson_id - Lesson to open: next lesson once the current one
+        is completed, otherwise the current lesson
+      * status / progress_pct - Progress on lesson_id
+      * updated_at - When the pointer was last written
+    
+    Raises:
+    - HTTPException (404): If the user has not recorded any progress yet
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success, 404 Not Found
+    """
+    # One indexed lookup on the user's resume record
+    resume = await db.get(models.LearningResume, current_user.id)
+    if resume is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No lesson to resume yet"
+        )
+
+    return schemas.ResumeRead(
+        course_id=resume.course_id,
+        lesson_id=resume.lesson_id,
+        next_lesson_id=resume.next_lesson_id,
+        resume_lesson_id=resume_service.resume_target(resume),
+        status=getattr(resume.status, "value", resume.status),
+        progress_pct=resume.progress_pct or 0,
+        updated_at=resume.updated_at,
+    )
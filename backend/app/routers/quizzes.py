@@ -7,8 +7,17 @@ Quizzes are assessments linked to lessons that test user knowledge and track pro
 Endpoints:
 - GET /api/quizzes - List all quizzes with optional filtering
 - GET /api/quizzes/{quiz_id} - Get specific quiz details
-- POST /api/quizzes/{quiz_id}/attempts - Create a new quiz attempt
+- GET /api/quizzes/{quiz_id}/questions - Get quiz questions without answers
+- POST /api/quizzes/{quiz_id}/attempts - Submit and grade a quiz attempt
+- PATCH /api/quizzes/{quiz_id}/attempts/{attempt_id} - Autosave partial answers
+- GET /api/quizzes/{quiz_id}/attempts/{attempt_id}/next - Next question of an adaptive attempt
+- POST /api/quizzes/{quiz_id}/attempts/{attempt_id}/submit - Finalize and grade an attempt
 - GET /api/quizzes/{quiz_id}/attempts - List user's attempts for a quiz
+- PUT /api/quizzes/{quiz_id}/questions/{question_id} - Edit a question and re-grade (admin only)
+- GET /api/quizzes/{quiz_id}/regrade - Status of the latest re-grade run (admin only)
+- GET /api/quizzes/{quiz_id}/analytics - Per-question item analytics (admin only)
+- GET /api/quizzes/{quiz_id}/distribution - Score distribution and quantiles
+- GET /api/quizzes/{quiz_id}/leaderboard - Top scores and the caller's rank
 
 Dependencies:
 - FastAPI for routing and HTTP handling
@@ -16,15 +25,21 @@ Dependencies:
 - Authentication for user-specific operations
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, update, func, literal
+from sqlalchemy.dialects.postgresql import JSONB
 from ..db.session import get_db
 from .. import schemas, models
 from ..core.deps import get_current_user
+from ..core.tasks import enqueue
+from ..services import adaptive, grading, leaderboard, mastery, quiz_delivery, regrading, score_distribution, spaced_repetition
+from .courses import is_admin
+import logging
 from typing import List, Optional
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.get("", response_model=List[schemas.QuizRead])
@@ -148,6 +163,102 @@ async def get_quiz(
     return quiz
 
 
+@router.get("/{quiz_id}/questions", response_model=schemas.QuizQuestionsRead)
+async def get_quiz_questions(
+    quiz_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve a quiz's questions for taking the quiz, with answers removed.
+    
+    Features:
+    - Quiz and questions loaded together in one query on a cache miss
+    - Correct answers, tolerances and explanations stripped server-side
+    - Payload cached as pre-serialized JSON bytes per quiz version
+    - ETag per quiz version; If-None-Match returns 304 Not Modified
+    
+    Path Parameters:
+    - quiz_id: (required) The UUID of the quiz
+    
+    Returns:
+    - QuizQuestionsRead: Quiz id, version, title, passing_score and questions
+      Each question is its question_json minus answer fields, plus "id"
+    
+    Raises:
+    - HTTPException (404): If quiz with given ID does not exist
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success, 304 Not Modified, 404 Not Found
+    
+    Notes:
+    - Submit answers keyed by question "id" to POST /api/quizzes/{quiz_id}/attempts
+    - Editing a question bumps the quiz version, which invalidates the cache
+    """
+    # Version lookup + cached bytes (built once per quiz version)
+    payload = await quiz_delivery.get_question_payload(db, quiz_id)
+    if payload is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Quiz with ID '{quiz_id}' not found"
+        )
+
+    headers = {"ETag": payload.etag, "Cache-Control": "private, max-age=60"}
+
+    # Client already has this version
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+
+async def _finalize_attempt(db: AsyncSession, quiz: models.Quiz, attempt: models.QuizAttempt) -> None:
+    """Grade an attempt and mark it completed; the caller commits.
+
+    Raises 409 when a stored question cannot be compiled into an answer key
+    (legacy or hand-edited question_json), or when an adaptive attempt has
+    not met its stopping rule; nothing is committed, so the attempt can be
+    submitted again later.
+    """
+    try:
+        if quiz.adaptive:
+            bank = await adaptive.get_item_bank(db, quiz)
+            if not adaptive.select_next(quiz, bank, attempt.answers, attempt.served)["done"]:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Adaptive attempt is not finished: answer the questions from GET .../next until done is true"
+                )
+            key = (await adaptive.grade_attempt(db, quiz, attempt)).key
+        else:
+            key = await grading.grade_attempt(db, quiz, attempt)
+    except grading.InvalidQuestion as exc:
+        logger.error("Quiz %s cannot be graded: %s", quiz.id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This quiz cannot be graded until an administrator fixes its questions"
+        )
+    await score_distribution.record_score(db, quiz.id, attempt.score)
+    # Missed questions join the user's review queue in the same transaction
+    await spaced_repetition.schedule_attempt(db, attempt, key, only_answered=quiz.adaptive)
+    await mastery.record_attempt(db, quiz, attempt, key, only_answered=quiz.adaptive)
+
+
+async def _after_graded(db: AsyncSession, quiz: models.Quiz, attempt: models.QuizAttempt) -> None:
+    """Post-commit side effects of a graded attempt; failures never fail the request."""
+    try:
+        await leaderboard.record_attempt(db, quiz, attempt)
+    except Exception:
+        logger.exception("Leaderboard update failed for attempt %s", attempt.id)
+
+
+async def _attach_percentiles(db: AsyncSession, quiz_id, attempts) -> None:
+    """Set ``percentile`` on attempts from the quiz's score sketch (one lookup)."""
+    counts = await score_distribution.get_counts(db, quiz_id)
+    for attempt in attempts:
+        attempt.percentile = score_distribution.percentile_rank(counts, attempt.score) if counts else None
+
+
 @router.post("/{quiz_id}/attempts", response_model=schemas.QuizAttemptRead, status_code=status.HTTP_201_CREATED)
 async def post_attempt(
     quiz_id: str,
@@ -156,57 +267,331 @@ async def post_attempt(
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Create a new quiz attempt for the current user.
+    Submit a quiz attempt for the current user, or start one for autosave.
     
     Features:
-    - Start a new quiz attempt with initial answers
-    - Creates timestamp records for attempt tracking
-    - Stores answers in JSONB format for flexibility
-    - Scoring is currently not implemented (score left as None)
+    - Stores the submitted answers
+    - Scores answers against the quiz's compiled answer key
+    - Sets score, pass/fail and completion time in the same transaction
+    - Supports multiple-choice, multi-select, numeric (with tolerance)
+      and short-text questions
+    - With submit=false, creates an in-progress attempt instead
     
     Path Parameters:
     - quiz_id: (required) The UUID of the quiz to attempt
     
     Request Body:
-    - answers: (required) Dictionary/object containing user's answers to quiz questions
-      Format: Can be flexible depending on quiz question types
+    - answers: (optional) Object mapping question ID to the user's answer
+      Format: {"<question_id>": 2, "<question_id>": [0, 3], "<question_id>": "mitosis"}
+    - submit: (optional) Grade immediately (default true). Use false to start
+      an attempt, then PATCH .../attempts/{attempt_id} and POST .../submit
     
     Returns:
-    - QuizAttemptRead: Created attempt object with:
+    - QuizAttemptRead: Attempt object with:
       * id - Unique attempt ID
       * user_id - Current user's ID
       * quiz_id - Associated quiz ID
       * answers - Submitted answers
       * started_at - Timestamp when attempt began
-      * score - NULL (scoring not yet implemented)
-      * completed_at - NULL (attempt is in progress)
+      * score - Percentage of points earned (0-100; NULL while in progress)
+      * passed - Whether score meets passing_score (NULL if quiz has none)
+      * completed_at - Timestamp when the attempt was graded
+      * version - Autosave version (send with the next PATCH)
+    
+    Raises:
+    - HTTPException (404): If quiz with given ID does not exist
+    - HTTPException (400): If submit=true on an adaptive quiz (start it with
+      submit=false and follow GET .../next)
+    - HTTPException (409): If a question of the quiz cannot be graded
+      (nothing is stored)
     
     Authentication: Required (current_user)
     HTTP Status: 201 Created on success
     
     Notes:
-    - This endpoint initializes the attempt; it doesn't validate answers
-    - Score calculation is a TODO for future implementation
+    - Unanswered or unknown question IDs score zero / are ignored
+    - Answer keys are compiled once per quiz version and cached
     - Use GET /api/quizzes/{quiz_id}/attempts to retrieve this attempt later
     """
+    # Load quiz (needed for passing_score and answer-key version)
+    quiz = await db.get(models.Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Quiz with ID '{quiz_id}' not found"
+        )
+    # Adaptive attempts are only graded once their stopping rule is met
+    if quiz.adaptive and payload.submit:
+        raise HTTPException(
+            status_code=400,
+            detail="Adaptive quizzes must be started with submit=false and answered through GET .../next"
+        )
+
     # Create new quiz attempt record
-    # Note: We don't validate the quiz exists here; DB will handle that via FK constraint
     attempt = models.QuizAttempt(
         user_id=current_user.id,
-        quiz_id=quiz_id,
-        answers=payload.answers
+        quiz_id=quiz.id,
+        answers=payload.answers if payload.answers is not None else {},
+        version=1
     )
     
     # Add to session and flush to get ID
     db.add(attempt)
     await db.flush()
     
+    # Grade against the compiled answer key (same transaction)
+    if payload.submit:
+        await _finalize_attempt(db, quiz, attempt)
+    
     # Commit transaction
     await db.commit()
     
     # Refresh to get all default values (timestamps, etc.)
     await db.refresh(attempt)
+    if payload.submit:
+        await _after_graded(db, quiz, attempt)
+    await _attach_percentiles(db, quiz.id, [attempt])
+    
+    return attempt
+
+
+async def _attempt_conflict(db: AsyncSession, quiz_id: str, attempt_id: str, user_id) -> HTTPException:
+    """Explain why a guarded attempt write matched no row (404 or 409)."""
+    q = select(models.QuizAttempt.completed_at, models.QuizAttempt.version).where(
+        models.QuizAttempt.id == attempt_id,
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.user_id == user_id
+    )
+    row = (await db.execute(q)).one_or_none()
+    if row is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Attempt with ID '{attempt_id}' not found"
+        )
+    if row.completed_at is not None:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Attempt has already been submitted"
+        )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": "Attempt was modified by another save", "version": row.version}
+    )
+
+
+@router.patch("/{quiz_id}/attempts/{attempt_id}", response_model=schemas.QuizAttemptSaved)
+async def autosave_attempt(
+    quiz_id: str,
+    attempt_id: str,
+    payload: schemas.QuizAttemptAutosave,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Autosave partial answers into an in-progress attempt.
+    
+    Features:
+    - Merges only the changed answers into the stored answers document
+      (JSONB ||) in a single UPDATE statement; the full document is never
+      sent or rewritten by the client
+    - Optimistic concurrency: the save applies only if the attempt is still
+      at the given version, and returns the new version
+    - Adaptive quizzes only accept answers to questions already returned by
+      GET .../next (checked in the same UPDATE)
+    
+    Path Parameters:
+    - quiz_id: (required) UUID of the quiz
+    - attempt_id: (required) UUID of the in-progress attempt
+    
+    Request Body:
+    - answers: (required) Changed answers, {"<question_id>": <answer>}
+    - version: (required) Version returned by the previous save/start
+    
+    Returns:
+    - QuizAttemptSaved: {id, version} with the incremented version
+    
+    Raises:
+    - HTTPException (400): If an adaptive attempt gets an answer to a
+      question it was not served
+    - HTTPException (404): If attempt doesn't exist or belongs to another user
+    - HTTPException (409): If attempt was already submitted, or version is
+      stale (detail includes the current version)
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success
+    """
+    adaptive_quiz = (await db.execute(
+        select(models.Quiz.adaptive).where(models.Quiz.id == quiz_id)
+    )).scalar()
+    # Merge + version bump guarded by ownership, state and version
+    stmt = update(models.QuizAttempt).where(
+        models.QuizAttempt.id == attempt_id,
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.user_id == current_user.id,
+        models.QuizAttempt.version == payload.version,
+        models.QuizAttempt.completed_at.is_(None)
+    )
+    if adaptive_quiz and payload.answers:
+        # Every answered id must already be in served
+        served = func.coalesce(models.QuizAttempt.served, literal([], JSONB))
+        stmt = stmt.where(served.contains(literal(list(payload.answers), JSONB)))
+    stmt = stmt.values(
+        answers=func.coalesce(models.QuizAttempt.answers, literal({}, JSONB)).op("||")(literal(payload.answers, JSONB)),
+        version=models.QuizAttempt.version + 1
+    ).returning(
+        models.QuizAttempt.id, models.QuizAttempt.version
+    ).execution_options(synchronize_session=False)
+    res = await db.execute(stmt)
+    row = res.one_or_none()
+
+    # Nothing matched: report missing attempt, submitted attempt or stale version
+    if row is None:
+        await db.rollback()
+        if adaptive_quiz and payload.answers:
+            q = select(models.QuizAttempt.version, models.QuizAttempt.served).where(
+                models.QuizAttempt.id == attempt_id,
+                models.QuizAttempt.quiz_id == quiz_id,
+                models.QuizAttempt.user_id == current_user.id,
+                models.QuizAttempt.completed_at.is_(None)
+            )
+            current = (await db.execute(q)).one_or_none()
+            if current is not None and current.version == payload.version:
+                unserved = sorted(set(payload.answers) - set(current.served or []))
+                raise HTTPException(
+                    status_code=400,
+                    detail={"message": "Answers to questions not served by GET .../next", "question_ids": unserved}
+                )
+        raise await _attempt_conflict(db, quiz_id, attempt_id, current_user.id)
+
+    await db.commit()
+    return schemas.QuizAttemptSaved(id=row.id, version=row.version)
+
+
+@router.get("/{quiz_id}/attempts/{attempt_id}/next", response_model=schemas.AdaptiveNextRead)
+async def next_adaptive_question(
+    quiz_id: str,
+    attempt_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Pick the next question of an in-progress adaptive attempt.
+    
+    Features:
+    - Estimates the student's ability from the answers autosaved so far
+    - Returns the unanswered question with maximum information at that ability
+    - Records the returned question as served: it is returned again until
+      answered, and counts as incorrect if the attempt is graded without it
+    - Uses the quiz's precomputed item bank (no per-request model fitting)
+    - Reports done once the quiz length or target precision is reached
+    
+    Flow:
+    - POST /attempts with submit=false, then repeat: GET /next, PATCH the answer;
+      POST /submit once done is true
+    
+    Returns:
+    - AdaptiveNextRead with ability, standard_error, answered count, done and
+      the next question (answer fields removed)
+    
+    Raises:
+    - HTTPException (404): If the attempt doesn't exist or belongs to another user
+    - HTTPException (400): If the quiz is not adaptive
+    - HTTPException (409): If the attempt was already submitted
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success
+    """
+    q = select(models.QuizAttempt).where(
+        models.QuizAttempt.id == attempt_id,
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.user_id == current_user.id
+    )
+    attempt = (await db.execute(q)).scalar_one_or_none()
+    if attempt is None:
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    if attempt.completed_at is not None:
+        raise HTTPException(status_code=409, detail="Attempt already submitted")
+
+    quiz = await db.get(models.Quiz, attempt.quiz_id)
+    if not quiz.adaptive:
+        raise HTTPException(status_code=400, detail="Quiz is not adaptive")
+
+    bank = await adaptive.get_item_bank(db, quiz)
+    state = adaptive.select_next(quiz, bank, attempt.answers, attempt.served)
+    question = state["question"]
+    if question is not None and question["id"] not in (attempt.served or []):
+        # Append once; a concurrent call serving the same question is a no-op
+        served = func.coalesce(models.QuizAttempt.served, literal([], JSONB))
+        await db.execute(
+            update(models.QuizAttempt)
+            .where(
+                models.QuizAttempt.id == attempt.id,
+                models.QuizAttempt.completed_at.is_(None),
+                ~served.has_key(question["id"])
+            )
+            .values(served=served.op("||")(literal([question["id"]], JSONB)))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return schemas.AdaptiveNextRead(attempt_id=attempt.id, **state)
+
+
+@router.post("/{quiz_id}/attempts/{attempt_id}/submit", response_model=schemas.QuizAttemptRead)
+async def submit_attempt(
+    quiz_id: str,
+    attempt_id: str,
+    payload: Optional[schemas.QuizAttemptSubmit] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Finalize an in-progress attempt and grade it.
+    
+    Features:
+    - Grades the autosaved answers against the compiled answer key
+    - Sets score, pass/fail and completion time in the same transaction
+    - Optional version check so a stale tab cannot submit over newer saves
+    
+    Path Parameters:
+    - quiz_id: (required) UUID of the quiz
+    - attempt_id: (required) UUID of the in-progress attempt
+    
+    Request Body (optional):
+    - version: Expected autosave version
+    
+    Returns:
+    - QuizAttemptRead: The graded attempt
+    
+    Raises:
+    - HTTPException (404): If attempt doesn't exist or belongs to another user
+    - HTTPException (409): If already submitted or version is stale, an
+      adaptive attempt is not done yet, or a question of the quiz cannot be
+      graded (the attempt stays in progress)
     
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success
+    """
+    # Lock the attempt so a concurrent autosave cannot slip in mid-grade
+    q = select(models.QuizAttempt).where(
+        models.QuizAttempt.id == attempt_id,
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.user_id == current_user.id
+    ).with_for_update()
+    res = await db.execute(q)
+    attempt = res.scalar_one_or_none()
+    stale = payload is not None and payload.version is not None and attempt is not None and attempt.version != payload.version
+    if attempt is None or attempt.completed_at is not None or stale:
+        await db.rollback()
+        raise await _attempt_conflict(db, quiz_id, attempt_id, current_user.id)
+
+    # Grade with the quiz's current answer key
+    quiz = await db.get(models.Quiz, attempt.quiz_id)
+    await _finalize_attempt(db, quiz, attempt)
+
+    await db.commit()
+    await db.refresh(attempt)
+    await _after_graded(db, quiz, attempt)
+    await _attach_percentiles(db, quiz.id, [attempt])
     return attempt
 
 
@@ -234,6 +619,7 @@ async def list_attempts(
       * started_at - When the attempt began
       * completed_at - When it was submitted (NULL if still in progress)
       * score - User's score (NULL if not yet graded)
+      * percentile - Rank of the score among all graded attempts (0-100)
       * answers - Submitted answers
     
     Authentication: Required (current_user)
@@ -253,6 +639,263 @@ async def list_attempts(
     
     # Execute query
     res = await db.execute(q)
+    attempts = res.scalars().all()
+    
+    # Rank each score against the quiz's distribution (single sketch lookup)
+    await _attach_percentiles(db, quiz_id, attempts)
     
     # Return all matching attempts
-    return res.scalars().all()
+    return attempts
+
+
+@router.put("/{quiz_id}/questions/{question_id}", response_model=schemas.RegradeRunRead, status_code=status.HTTP_202_ACCEPTED)
+async def update_question(
+    quiz_id: str,
+    question_id: str,
+    payload: schemas.QuizQuestionUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Replace a question's definition and re-grade historical attempts (admin only).
+    
+    Features:
+    - Validates the new question_json compiles into an answer key
+    - Bumps the quiz version so cached answer keys are recompiled
+    - Queues a background re-grade of every completed attempt
+    
+    Path Parameters:
+    - quiz_id: (required) UUID of the quiz
+    - question_id: (required) UUID of the question to replace
+    
+    Request Body:
+    - question_json: (required) New question definition (see services/grading.py)
+    
+    Returns:
+    - RegradeRunRead: The queued re-grade run (status 'pending')
+    
+    Raises:
+    - HTTPException (403): If user is not admin
+    - HTTPException (404): If quiz or question doesn't exist
+    - HTTPException (422): If question_json cannot be graded
+    
+    Authentication: Required with admin role
+    HTTP Status: 202 Accepted
+    
+    Notes:
+    - The re-grade runs in Celery and commits in chunks; poll
+      GET /api/quizzes/{quiz_id}/regrade for progress
+    - Editing again before a run finishes supersedes the older run
+    """
+    # Check admin authorization
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required to edit quiz questions"
+        )
+
+    # Load question scoped to its quiz
+    q = select(models.QuizQuestion).where(
+        models.QuizQuestion.id == question_id,
+        models.QuizQuestion.quiz_id == quiz_id
+    )
+    res = await db.execute(q)
+    question = res.scalar_one_or_none()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Question with ID '{question_id}' not found in quiz '{quiz_id}'"
+        )
+
+    # Reject definitions the grading engine cannot compile
+    try:
+        grading.validate_question(question.id, payload.question_json)
+    except grading.InvalidQuestion as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    # Replace question and bump the quiz version in one transaction
+    quiz = await db.get(models.Quiz, question.quiz_id, with_for_update=True)
+    question.question_json = payload.question_json
+    quiz.version = (quiz.version or 1) + 1
+    run = await regrading.create_run(db, quiz)
+    await db.commit()
+    await db.refresh(run)
+
+    # Enqueue after commit so the worker sees the new version
+    try:
+        enqueue("smartlearn.regrade_quiz", str(quiz.id), str(run.id))
+    except Exception:
+        # Run stays 'pending' and can be re-enqueued; the edit itself is saved
+        logger.exception("Failed to enqueue regrade run %s", run.id)
+
+    return run
+
+
+@router.get("/{quiz_id}/regrade", response_model=schemas.RegradeRunRead)
+async def get_regrade_status(
+    quiz_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the most recent re-grade run for a quiz (admin only).
+    
+    Returns:
+    - RegradeRunRead: Run status ('pending', 'running', 'completed', 'failed',
+      'superseded') with processed/total attempt counts
+    
+    Raises:
+    - HTTPException (403): If user is not admin
+    - HTTPException (404): If the quiz has never been re-graded
+    
+    Authentication: Required with admin role
+    HTTP Status: 200 OK on success
+    """
+    # Check admin authorization
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required to view re-grade runs"
+        )
+
+    # Latest run for this quiz
+    q = select(models.QuizRegradeRun).where(
+        models.QuizRegradeRun.quiz_id == quiz_id
+    ).order_by(models.QuizRegradeRun.created_at.desc()).limit(1)
+    res = await db.execute(q)
+    run = res.scalar_one_or_none()
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No re-grade runs for quiz '{quiz_id}'"
+        )
+
+    return run
+
+
+@router.get("/{quiz_id}/analytics", response_model=schemas.QuizAnalyticsRead)
+async def get_quiz_analytics(
+    quiz_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve per-question item analytics for a quiz (admin only).
+    
+    Features:
+    - p_value: share of attempts answering each question correctly
+    - discrimination: point-biserial correlation with the rest-of-quiz score
+      (low or negative values flag ambiguous or miskeyed questions)
+    - distractors: how often each option index was chosen ("none" = unanswered)
+    
+    Returns:
+    - QuizAnalyticsRead: Attempt count, quiz version the stats belong to,
+      last refresh time and one entry per question
+    
+    Raises:
+    - HTTPException (403): If user is not admin
+    - HTTPException (404): If analytics have not been computed for the quiz
+    
+    Authentication: Required with admin role
+    HTTP Status: 200 OK on success
+    
+    Notes:
+    - Computed by the hourly smartlearn.refresh_all_quiz_analytics job, which
+      only processes attempts completed since its previous run
+    """
+    # Check admin authorization
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required to view quiz analytics"
+        )
+
+    # Watermark row tells us whether analytics exist
+    state = await db.get(models.QuizAnalyticsState, quiz_id)
+    if not state:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No analytics computed for quiz '{quiz_id}' yet"
+        )
+
+    # Stored per-question statistics
+    q = select(models.QuizItemStat).where(models.QuizItemStat.quiz_id == state.quiz_id)
+    res = await db.execute(q)
+
+    return schemas.QuizAnalyticsRead(
+        quiz_id=state.quiz_id,
+        quiz_version=state.quiz_version,
+        attempts_count=state.attempts_count,
+        updated_at=state.updated_at,
+        items=[schemas.QuizItemStatRead.model_validate(stat, from_attributes=True) for stat in res.scalars().all()]
+    )
+
+
+@router.get("/{quiz_id}/distribution", response_model=schemas.ScoreDistributionRead)
+async def get_score_distribution(
+    quiz_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the score distribution of all graded attempts for a quiz.
+    
+    Features:
+    - Reads the quiz's maintained score sketch (one row, fixed size)
+    - No sorting or scanning of quiz_attempts per request
+    
+    Returns:
+    - ScoreDistributionRead with:
+      * total - Number of graded attempts
+      * mean - Mean score (NULL if no attempts)
+      * quantiles - p10/p25/p50/p75/p90 scores
+      * counts - Attempts per score value 0-100
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK (empty distribution if the quiz has no graded attempts)
+    """
+    # Single-row sketch lookup; empty histogram if nothing graded yet
+    counts = await score_distribution.get_counts(db, quiz_id) or score_distribution.empty_counts()
+
+    return schemas.ScoreDistributionRead(
+        quiz_id=quiz_id,
+        total=sum(counts),
+        mean=score_distribution.mean(counts),
+        quantiles=score_distribution.quantiles(counts),
+        counts=counts
+    )
+
+
+@router.get("/{quiz_id}/leaderboard", response_model=schemas.LeaderboardRead)
+async def get_quiz_leaderboard(
+    quiz_id: str,
+    limit: int = Query(10, ge=1, le=100, description="Number of top entries to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the leaderboard for a quiz (each user's best score).
+    
+    Features:
+    - Served from a sorted set maintained on every graded attempt
+    - Top N and the caller's rank are O(log n) lookups, no attempt scans
+    - Board is loaded from quiz_attempts once, on first use
+    
+    Query Parameters:
+    - limit: Number of top entries (1-100, default 10)
+    
+    Returns:
+    - LeaderboardRead with:
+      * size - Number of ranked users
+      * entries - Top entries (rank, user_id, display_name, score)
+      * me - Caller's own entry (NULL if not ranked)
+    
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK, 404 Not Found if the quiz does not exist
+    """
+    quiz = await db.get(models.Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    board = await leaderboard.ensure_quiz_board(db, quiz.id)
+    return await leaderboard.snapshot(db, board, current_user.id, limit)
@@ -0,0 +1,120 @@
+"""
+Reviews Router Module
+
+Spaced-repetition review queue built from quiz questions the user missed.
+Each missed question is scheduled with SM-2 and comes back when it is due.
+
+Endpoints:
+- GET /api/reviews/due - Review items due now, plus today's due count
+- POST /api/reviews/{item_id} - Record a review of an item (quality 0-5)
+
+Dependencies:
+- FastAPI for routing
+- SQLAlchemy for async database operations
+- Authentication for user-specific review queues
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from ..db.session import get_db
+from .. import schemas, models
+from ..core.deps import get_current_user
+from ..services import spaced_repetition
+
+router = APIRouter()
+
+
+def _read(item: models.ReviewItem, question=None) -> schemas.ReviewItemRead:
+    read = schemas.ReviewItemRead.model_validate(item, from_attributes=True)
+    read.question = spaced_repetition.question_payload(question)
+    return read
+
+
+@router.get("/due", response_model=schemas.ReviewQueueRead)
+async def get_due_reviews(
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of items to return"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Retrieve the review items that are due for the current user.
+
+    Features:
+    - Range scan on the (user_id, due_at) index, most overdue first
+    - Each item includes its question with answer fields removed
+    - due_today comes from the nightly snapshot (live count if it is stale)
+
+    Query Parameters:
+    - limit: Maximum number of items (1-100, default 20)
+
+    Returns:
+    - ReviewQueueRead with:
+      * due_today - Items due before the next midnight (UTC)
+      * items - Due review items with their SM-2 state and question
+
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK
+    """
+    # Due items and their questions in one indexed query
+    q = select(models.ReviewItem, models.QuizQuestion).join(
+        models.QuizQuestion, models.QuizQuestion.id == models.ReviewItem.question_id
+    ).where(
+        models.ReviewItem.user_id == current_user.id,
+        models.ReviewItem.due_at <= func.now()
+    ).order_by(models.ReviewItem.due_at.asc()).limit(limit)
+    res = await db.execute(q)
+
+    return schemas.ReviewQueueRead(
+        due_today=await spaced_repetition.due_count(db, current_user.id),
+        items=[_read(item, question) for item, question in res.all()]
+    )
+
+
+@router.post("/{item_id}", response_model=schemas.ReviewItemRead)
+async def review_item(
+    item_id: str,
+    payload: schemas.ReviewGrade,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Record a review of a due item and reschedule it.
+
+    Features:
+    - Applies SM-2: quality < 3 resets the item to a 1-day interval,
+      otherwise the interval grows (1 day, 6 days, then interval x ease)
+    - Adjusts the ease factor and the user's due count
+
+    Path Parameters:
+    - item_id: (required) UUID of the review item
+
+    Request Body:
+    - quality: 0-5 (0-2 forgotten, 3 hard, 4 good, 5 easy)
+
+    Returns:
+    - ReviewItemRead: The rescheduled item
+
+    Raises:
+    - HTTPException (404): If the item doesn't exist or belongs to another user
+    - HTTPException (422): If quality is out of range
+
+    Authentication: Required (current_user)
+    HTTP Status: 200 OK on success
+    """
+    q = select(models.ReviewItem).where(
+        models.ReviewItem.id == item_id,
+        models.ReviewItem.user_id == current_user.id
+    ).with_for_update()
+    res = await db.execute(q)
+    item = res.scalar_one_or_none()
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review item not found"
+        )
+
+    await spaced_repetition.review(db, item, payload.quality)
+    await db.commit()
+    await db.refresh(item)
+    return _read(item)
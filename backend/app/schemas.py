@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Any
 from uuid import UUID
 from datetime import datetime
@@ -39,11 +39,20 @@ class ConversationRead(BaseModel):
     user_id: UUID
     title: Optional[str]
     last_message_at: Optional[datetime]
+    message_count: int = 0
+    # start of the newest message's text
+    last_message_preview: Optional[str] = None
 
     class Config:
         orm_mode = True
 
 
+class ConversationPage(BaseModel):
+    items: list[ConversationRead]
+    # pass as ?cursor= for the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+
 class MessageCreate(BaseModel):
     sender: str
     content: Any
@@ -54,12 +63,60 @@ class MessageRead(BaseModel):
     conversation_id: UUID
     sender: str
     content: Any
+    token_count: Optional[int] = None
     created_at: datetime
 
     class Config:
         orm_mode = True
 
 
+class MessagePage(BaseModel):
+    # oldest first
+    items: list[MessageRead]
+    # pass as ?before= for older messages; null when the first message is included
+    before_cursor: Optional[str] = None
+    # pass as ?after= for newer messages (or to poll for new ones)
+    after_cursor: Optional[str] = None
+    # whether newer messages than this page already exist
+    has_newer: bool = False
+
+
+class MessageSearchHit(BaseModel):
+    message_id: UUID
+    conversation_id: UUID
+    conversation_title: Optional[str]
+    sender: str
+    created_at: datetime
+    rank: float
+    # matching fragments, terms wrapped in <mark>...</mark>
+    snippet: str
+
+
+class MessageSearchPage(BaseModel):
+    items: list[MessageSearchHit]
+    # pass as ?offset= for the next page; null on the last page
+    next_offset: Optional[int] = None
+
+
+class AIGenerationJobRead(BaseModel):
+    id: UUID
+    conversation_id: UUID
+    message_id: UUID
+    # pending, running, completed or failed
+    status: str
+    result_message_id: Optional[UUID]
+    attempts: int
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    # the assistant reply, once completed
+    result: Optional[MessageRead] = None
+
+    class Config:
+        orm_mode = True
+
+
 # Courses & Lessons
 class LessonRead(BaseModel):
     id: UUID
@@ -91,13 +148,89 @@ class QuizRead(BaseModel):
     lesson_id: UUID
     title: str
     passing_score: Optional[int]
+    adaptive: bool = False
+
+    class Config:
+        orm_mode = True
+
+
+class QuizQuestionsRead(BaseModel):
+    quiz_id: UUID
+    version: int
+    title: str
+    passing_score: Optional[int]
+    # question_json with answer fields removed, plus the question "id"
+    questions: list[dict]
+
+
+class QuizQuestionUpdate(BaseModel):
+    question_json: dict
+
+
+class RegradeRunRead(BaseModel):
+    id: UUID
+    quiz_id: UUID
+    quiz_version: int
+    status: str
+    total: Optional[int]
+    processed: int
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
+class QuizItemStatRead(BaseModel):
+    question_id: UUID
+    n: int
+    p_value: Optional[float]
+    discrimination: Optional[float]
+    distractors: Optional[dict]
 
     class Config:
         orm_mode = True
 
 
+class QuizAnalyticsRead(BaseModel):
+    quiz_id: UUID
+    quiz_version: int
+    attempts_count: int
+    updated_at: Optional[datetime]
+    items: list[QuizItemStatRead]
+
+
 class QuizAttemptCreate(BaseModel):
-    answers: Any
+    answers: Any = {}
+    # False starts an in-progress attempt to be autosaved and submitted later
+    submit: bool = True
+
+
+class QuizAttemptAutosave(BaseModel):
+    answers: dict
+    version: int
+
+
+class QuizAttemptSubmit(BaseModel):
+    version: Optional[int] = None
+
+
+class AdaptiveNextRead(BaseModel):
+    attempt_id: UUID
+    answered: int
+    ability: float
+    standard_error: float
+    # True once the stopping rule is met; submit the attempt then
+    done: bool
+    # next question (answer fields removed), NULL when done
+    question: Optional[dict]
+
+
+class QuizAttemptSaved(BaseModel):
+    id: UUID
+    version: int
 
 
 class QuizAttemptRead(BaseModel):
@@ -105,9 +238,79 @@ class QuizAttemptRead(BaseModel):
     user_id: UUID
     quiz_id: UUID
     score: Optional[int]
+    passed: Optional[bool] = None
     started_at: datetime
     completed_at: Optional[datetime]
     answers: Any
+    version: int = 1
+    # percentile rank of score among all graded attempts of the quiz
+    percentile: Optional[float] = None
+    # IRT ability estimate (adaptive quizzes only)
+    ability: Optional[float] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ScoreDistributionRead(BaseModel):
+    quiz_id: UUID
+    total: int
+    mean: Optional[float]
+    quantiles: dict[str, Optional[int]]
+    # counts[s] = number of graded attempts that scored s (0-100)
+    counts: list[int]
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: UUID
+    display_name: Optional[str]
+    score: float
+
+
+class LeaderboardRead(BaseModel):
+    board: str
+    size: int
+    entries: list[LeaderboardEntry]
+    # caller's own position; NULL if they have no graded attempt on this board
+    me: Optional[LeaderboardEntry]
+
+
+class ReviewItemRead(BaseModel):
+    id: UUID
+    question_id: UUID
+    quiz_id: UUID
+    ease: float
+    interval_days: float
+    repetitions: int
+    lapses: int
+    due_at: datetime
+    last_reviewed_at: Optional[datetime]
+    # question_json with answer fields removed, plus the question "id"
+    question: Optional[dict] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ReviewQueueRead(BaseModel):
+    # items due before the next midnight (UTC)
+    due_today: int
+    items: list[ReviewItemRead]
+
+
+class ReviewGrade(BaseModel):
+    # SM-2 quality: 0-2 forgotten, 3 hard, 4 good, 5 easy
+    quality: int = Field(..., ge=0, le=5)
+
+
+class TopicMasteryRead(BaseModel):
+    topic: str
+    p_mastery: float
+    answers: int
+    correct: int
+    mastered: bool = False
+    updated_at: Optional[datetime]
 
     class Config:
         orm_mode = True
@@ -132,6 +335,19 @@ class ProgressUpdate(BaseModel):
     progress_pct: Optional[int] = None
 
 
+class ResumeRead(BaseModel):
+    course_id: UUID
+    lesson_id: UUID
+    next_lesson_id: Optional[UUID]
+    resume_lesson_id: UUID
+    status: str
+    progress_pct: int
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
 class NotificationRead(BaseModel):
     id: UUID
     user_id: UUID
@@ -144,6 +360,39 @@ class NotificationRead(BaseModel):
         orm_mode = True
 
 
+class NotificationMarkRead(BaseModel):
+    # mark these ids, and/or everything created at or before ``before``
+    ids: Optional[list[UUID]] = None
+    before: Optional[datetime] = None
+
+
+class NotificationMarkReadResult(BaseModel):
+    marked: int
+    unread: int
+
+
+class UnreadCountRead(BaseModel):
+    unread: int
+
+
+class NotificationFanoutRead(BaseModel):
+    id: UUID
+    course_id: UUID
+    type: str
+    status: str
+    sent: int
+    skipped: int
+    # recipients per second over the run
+    rate: Optional[float]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
 class AchievementRead(BaseModel):
     id: UUID
     user_id: UUID
@@ -0,0 +1,379 @@
+"""Adaptive quizzes driven by a two-parameter logistic (2PL) IRT model.
+
+The probability that a student of ability ``theta`` answers item ``j``
+correctly is ``P = 1 / (1 + exp(-a_j (theta - b_j)))`` where ``a`` is the
+item's discrimination and ``b`` its difficulty.
+
+- Item parameters are fitted offline in batch from completed attempts
+  (``fit_quiz_item_params``, run by Celery) and stored in ``quiz_item_params``.
+- At request time an ``ItemBank`` holds the parameters as NumPy arrays,
+  together with tables precomputed over a fixed ability grid: log P / log Q
+  for ability estimation, Fisher information per item, and the items of each
+  grid point sorted by information. Picking the next question is a grid
+  lookup followed by a walk down that list to the first unanswered item.
+- Ability is the posterior mean (EAP) over the grid with a N(0, 1) prior.
+  The final score of an adaptive attempt is the expected percentage of
+  points at that ability over the whole bank (test characteristic curve), so
+  students who saw different items get comparable scores.
+- Every question handed out is recorded in ``QuizAttempt.served``. A served
+  question stays the next question until it is answered, the attempt can
+  only be submitted once the stopping rule is met, and served questions
+  left unanswered score as incorrect. Only served questions count: answers
+  to any other question are ignored by ability estimation and scoring.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from .. import models
+from ..core.cache import VersionedLRUCache
+from ..db.session import WorkerSessionLocal
+from . import grading
+
+logger = logging.getLogger(__name__)
+
+THETA_GRID = np.linspace(-4.0, 4.0, 161)
+_GRID_STEP = THETA_GRID[1] - THETA_GRID[0]
+_LOG_PRIOR = -0.5 * THETA_GRID ** 2
+
+DEFAULT_MAX_ITEMS = 20
+DEFAULT_TARGET_SE = 0.3
+
+# Fitting
+MIN_FIT_ATTEMPTS = 50
+MAX_FIT_ATTEMPTS = 200000
+FIT_ROUNDS = 15
+NEWTON_STEPS = 3
+# Ridge penalty pulling (a, c) toward (1, 0); keeps sparse items stable
+RIDGE = 0.5
+A_RANGE = (0.2, 4.0)
+B_RANGE = (-4.0, 4.0)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+@dataclass(frozen=True)
+class ItemBank:
+    """Item parameters of one quiz version plus tables precomputed over ``THETA_GRID``.
+
+    All per-item arrays are aligned with ``key.question_ids``.
+    """
+    key: grading.AnswerKey
+    questions: Tuple[dict, ...]
+    a: np.ndarray
+    b: np.ndarray
+    log_p: np.ndarray      # (grid, items)
+    log_q: np.ndarray      # (grid, items)
+    order: np.ndarray      # (grid, items) item indexes by decreasing information
+    expected: np.ndarray   # (grid,) expected score percentage
+
+    def __len__(self) -> int:
+        return len(self.key)
+
+
+def grid_probabilities(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """P(correct) of every item at every ``THETA_GRID`` point, shape (grid, items)."""
+    p = _sigmoid(a[None, :] * (THETA_GRID[:, None] - b[None, :]))
+    return np.clip(p, 1e-9, 1 - 1e-9)
+
+
+def build_item_bank(key: grading.AnswerKey, questions: Sequence[dict], a: np.ndarray, b: np.ndarray) -> ItemBank:
+    """Precompute the grid tables for items with parameters ``a``/``b``."""
+    p = grid_probabilities(a, b)
+    info = a[None, :] ** 2 * p * (1 - p)
+    total = key.total_points
+    expected = p @ key.points * 100.0 / total if total > 0 else np.zeros(len(THETA_GRID))
+    return ItemBank(
+        key=key,
+        questions=tuple(questions),
+        a=a,
+        b=b,
+        log_p=np.log(p),
+        log_q=np.log1p(-p),
+        order=np.argsort(-info, axis=1, kind="stable").astype(np.int32),
+        expected=expected,
+    )
+
+
+def posterior(
+    log_p: np.ndarray, log_q: np.ndarray, correct: np.ndarray, present: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """EAP ability and its standard error for response matrices of shape (attempts, items)."""
+    right = (correct & present).astype(np.float64)
+    wrong = (~correct & present).astype(np.float64)
+    loglik = right @ log_p.T + wrong @ log_q.T + _LOG_PRIOR
+    loglik -= loglik.max(axis=1, keepdims=True)
+    weights = np.exp(loglik)
+    weights /= weights.sum(axis=1, keepdims=True)
+    theta = weights @ THETA_GRID
+    var = weights @ THETA_GRID ** 2 - theta ** 2
+    return theta, np.sqrt(np.maximum(var, 0.0))
+
+
+def responses(bank: ItemBank, submissions: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """``(correct, present)`` matrices for raw ``answers`` dicts."""
+    sel, num = grading.encode_batch(bank.key, submissions)
+    return grading.correctness(bank.key, sel, num), grading.answered(bank.key, sel, num)
+
+
+def shown(bank: ItemBank, served: Sequence[Optional[Sequence[str]]]) -> np.ndarray:
+    """Boolean (attempts, items) matrix of the questions each attempt was served."""
+    mask = np.zeros((len(served), len(bank)), dtype=bool)
+    for row, question_ids in enumerate(served):
+        for question_id in question_ids or ():
+            j = bank.key.index.get(str(question_id))
+            if j is not None:
+                mask[row, j] = True
+    return mask
+
+
+def expected_score(bank: ItemBank, theta: np.ndarray) -> np.ndarray:
+    """Expected percentage of points at ``theta`` (interpolated on the grid)."""
+    return np.rint(np.interp(theta, THETA_GRID, bank.expected)).astype(np.int64)
+
+
+def administered(
+    bank: ItemBank, submissions: Sequence[Any], served: Sequence[Optional[Sequence[str]]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(correct, present, pending)`` restricted to the questions each attempt was served.
+
+    ``present`` is every served question (unanswered ones are incorrect) and
+    ``pending`` the served questions without an answer yet. Attempts with
+    ``served`` None predate served tracking and keep all their answers.
+    """
+    correct, answered = responses(bank, submissions)
+    mask = shown(bank, served)
+    legacy = np.array([ids is None for ids in served], dtype=bool)
+    mask[legacy] = answered[legacy]
+    return correct & answered & mask, mask, mask & ~answered
+
+
+def score_batch(
+    bank: ItemBank, submissions: Sequence[Any], served: Optional[Sequence[Optional[Sequence[str]]]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Adaptive counterpart of ``grading.score_batch``: ``(scores, abilities)``.
+
+    With ``served`` (one list of question ids per submission), only served
+    questions count, and those left unanswered are incorrect.
+    """
+    if served is None:
+        correct, present = responses(bank, submissions)
+    else:
+        correct, present, _ = administered(bank, submissions, served)
+    theta, _ = posterior(bank.log_p, bank.log_q, correct, present)
+    return expected_score(bank, theta), theta
+
+
+def next_item(bank: ItemBank, theta: float, present: np.ndarray) -> Optional[int]:
+    """Index of the most informative unanswered item at ``theta``, or None."""
+    g = int(round((theta - THETA_GRID[0]) / _GRID_STEP))
+    g = min(max(g, 0), len(THETA_GRID) - 1)
+    for j in bank.order[g]:
+        if not present[j]:
+            return int(j)
+    return None
+
+
+def stopping_rule(quiz: models.Quiz, bank: ItemBank) -> Tuple[int, float]:
+    """``(max_items, target_se)`` from ``quiz_metadata`` with module defaults."""
+    meta = quiz.quiz_metadata or {}
+    max_items = int(meta.get("adaptive_length") or DEFAULT_MAX_ITEMS)
+    target_se = float(meta.get("adaptive_se") or DEFAULT_TARGET_SE)
+    return min(max_items, len(bank)), target_se
+
+
+def select_next(quiz: models.Quiz, bank: ItemBank, answers: Any, served: Optional[Sequence[str]] = None) -> dict:
+    """Current ability estimate and the next question for an in-progress attempt.
+
+    A question already served but not yet answered is returned again, so
+    the attempt is done only when every served question has an answer and
+    the stopping rule is met.
+    """
+    correct, shown_mask, pending_mask = administered(bank, [answers], [served or []])
+    present = shown_mask & ~pending_mask
+    theta, se = posterior(bank.log_p, bank.log_q, correct, present)
+    theta, se = float(theta[0]), float(se[0])
+    answered = int(present[0].sum())
+    max_items, target_se = stopping_rule(quiz, bank)
+
+    pending = np.flatnonzero(pending_mask[0])
+    j = None
+    if len(pending):
+        j = int(pending[0])
+    elif answered < max_items and not (answered and se <= target_se):
+        j = next_item(bank, theta, present[0])
+    return {
+        "answered": answered,
+        "ability": round(theta, 4),
+        "standard_error": round(se, 4),
+        "done": j is None,
+        "question": None if j is None else {"id": bank.key.question_ids[j], **bank.questions[j]},
+    }
+
+
+# Banks live as long as their quiz version and item-parameter fit
+_banks = VersionedLRUCache(maxsize=512)
+
+
+async def load_item_bank(db: AsyncSession, quiz: models.Quiz) -> ItemBank:
+    """Build the item bank from the quiz's questions and fitted parameters (no cache).
+
+    Items without fitted parameters for the current quiz version get a = 1, b = 0.
+    """
+    q = select(models.QuizQuestion.id, models.QuizQuestion.question_json).where(
+        models.QuizQuestion.quiz_id == quiz.id
+    ).order_by(models.QuizQuestion.id)
+    rows = (await db.execute(q)).all()
+    key = grading.compile_answer_key(rows)
+    questions = [grading.strip_answers(spec) for _, spec in rows]
+
+    a = np.ones(len(key))
+    b = np.zeros(len(key))
+    params_q = select(models.QuizItemParam).where(
+        models.QuizItemParam.quiz_id == quiz.id,
+        models.QuizItemParam.quiz_version == quiz.version,
+    )
+    for param in (await db.execute(params_q)).scalars():
+        i = key.index.get(str(param.question_id))
+        if i is not None:
+            a[i], b[i] = param.discrimination, param.difficulty
+    return build_item_bank(key, questions, a, b)
+
+
+async def get_item_bank(db: AsyncSession, quiz: models.Quiz) -> ItemBank:
+    return await _banks.get_or_build(
+        quiz.id, (quiz.version, quiz.item_params_version), lambda: load_item_bank(db, quiz)
+    )
+
+
+async def grade_attempt(db: AsyncSession, quiz: models.Quiz, attempt: models.QuizAttempt) -> ItemBank:
+    """Adaptive counterpart of ``grading.grade_attempt``; also sets ``ability``."""
+    bank = await get_item_bank(db, quiz)
+    if len(bank):
+        scores, theta = score_batch(bank, [attempt.answers], [attempt.served])
+        attempt.score = int(scores[0])
+        attempt.ability = round(float(theta[0]), 4)
+    else:
+        attempt.score = None
+    attempt.passed = grading.is_passing(attempt.score, quiz.passing_score)
+    attempt.completed_at = datetime.now(timezone.utc)
+    return bank
+
+
+def fit_2pl(correct: np.ndarray, present: np.ndarray, rounds: int = FIT_ROUNDS) -> Tuple[np.ndarray, np.ndarray]:
+    """Fit 2PL ``(a, b)`` by alternating item Newton steps and EAP abilities.
+
+    Missing responses (``present`` False) are ignored, so adaptive attempts
+    that saw only part of the bank contribute to the items they answered.
+    """
+    x = correct.astype(np.float64)
+    m = present.astype(np.float64)
+    n_items = x.shape[1]
+
+    # Start from standardized logits of the share answered correctly
+    share = (x * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1)
+    share = np.clip(share, 0.02, 0.98)
+    theta = np.log(share / (1 - share))
+    theta = (theta - theta.mean()) / (theta.std() or 1.0)
+
+    a = np.ones(n_items)
+    c = np.zeros(n_items)
+    for _ in range(rounds):
+        for _ in range(NEWTON_STEPS):
+            p = _sigmoid(theta[:, None] * a + c)
+            r = (x - p) * m
+            w = p * (1 - p) * m
+            g_a = r.T @ theta - RIDGE * (a - 1)
+            g_c = r.sum(axis=0) - RIDGE * c
+            h_aa = w.T @ theta ** 2 + RIDGE
+            h_ac = w.T @ theta
+            h_cc = w.sum(axis=0) + RIDGE
+            det = h_aa * h_cc - h_ac ** 2
+            a = a + (h_cc * g_a - h_ac * g_c) / det
+            c = c + (h_aa * g_c - h_ac * g_a) / det
+            a = np.clip(a, *A_RANGE)
+            c = np.clip(c, -B_RANGE[1] * a, -B_RANGE[0] * a)
+        p = grid_probabilities(a, -c / a)
+        theta, _ = posterior(np.log(p), np.log1p(-p), correct, present)
+        # EAP shrinks toward the prior mean; re-anchor the scale to N(0, 1)
+        theta = (theta - theta.mean()) / (theta.std() or 1.0)
+    return a, np.clip(-c / a, *B_RANGE)
+
+
+async def fit_quiz_item_params(quiz_id) -> dict:
+    """Refit a quiz's item parameters from its most recent completed attempts."""
+    async with WorkerSessionLocal() as db:
+        quiz = await db.get(models.Quiz, quiz_id)
+        if quiz is None:
+            return {"quiz_id": str(quiz_id), "status": "missing"}
+        key = await grading.load_answer_key(db, quiz.id)
+        if not len(key):
+            return {"quiz_id": str(quiz.id), "status": "empty"}
+
+        q = select(models.QuizAttempt.answers).where(
+            models.QuizAttempt.quiz_id == quiz.id,
+            models.QuizAttempt.completed_at.isnot(None),
+        ).order_by(models.QuizAttempt.completed_at.desc()).limit(MAX_FIT_ATTEMPTS)
+        correct_parts, present_parts = [], []
+        stream = await db.stream(q.execution_options(yield_per=5000))
+        async for chunk in stream.partitions(5000):
+            sel, num = grading.encode_batch(key, [row.answers for row in chunk])
+            correct_parts.append(grading.correctness(key, sel, num))
+            present_parts.append(grading.answered(key, sel, num))
+        if not correct_parts or sum(len(part) for part in correct_parts) < MIN_FIT_ATTEMPTS:
+            return {"quiz_id": str(quiz.id), "status": "insufficient"}
+
+        correct = np.concatenate(correct_parts)
+        present = np.concatenate(present_parts)
+        a, b = fit_2pl(correct, present)
+        counts = present.sum(axis=0)
+
+        rows = [
+            {
+                "quiz_id": quiz.id,
+                "question_id": question_id,
+                "quiz_version": quiz.version,
+                "discrimination": round(float(a[i]), 6),
+                "difficulty": round(float(b[i]), 6),
+                "n": int(counts[i]),
+            }
+            for i, question_id in enumerate(key.question_ids)
+        ]
+        stmt = insert(models.QuizItemParam).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.QuizItemParam.quiz_id, models.QuizItemParam.question_id],
+            set_={
+                **{c: stmt.excluded[c] for c in rows[0] if c not in ("quiz_id", "question_id")},
+                "fitted_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        await db.execute(
+            update(models.Quiz).where(models.Quiz.id == quiz.id)
+            .values(item_params_version=models.Quiz.item_params_version + 1)
+        )
+        await db.commit()
+
+    logger.info("Fitted IRT parameters for quiz %s from %d attempts", quiz_id, len(correct))
+    return {"quiz_id": str(quiz_id), "status": "fitted", "attempts": len(correct)}
+
+
+async def fit_adaptive_quizzes() -> dict:
+    """Refit item parameters of every adaptive quiz."""
+    async with WorkerSessionLocal() as db:
+        res = await db.execute(select(models.Quiz.id).where(models.Quiz.adaptive.is_(True)))
+        quiz_ids = res.scalars().all()
+    results: Dict[str, int] = {}
+    for quiz_id in quiz_ids:
+        status = (await fit_quiz_item_params(quiz_id))["status"]
+        results[status] = results.get(status, 0) + 1
+    return {"quizzes": len(quiz_ids), **results}
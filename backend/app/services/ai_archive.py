@@ -0,0 +1,194 @@
+"""Cold storage for the messages of idle AI tutor conversations.
+
+``archive_idle`` (nightly Celery task) moves every message of a conversation
+whose ``last_message_at`` is older than ``AI_ARCHIVE_IDLE_DAYS`` into one
+``ai_message_archives`` row: the rows as JSON lines, compressed with zstd at
+``AI_ARCHIVE_ZSTD_LEVEL``, and sets ``Conversation.archived_at``. Each
+conversation is archived in its own transaction with its row locked, so the
+job can be stopped and rerun at any point and never races a new message.
+
+``rehydrate`` reverses this when an archived conversation is opened or
+written to: the messages are inserted back (ids, timestamps and search
+vectors intact) and the archive row is deleted in the caller's transaction.
+The conversation's ``message_count``, ``last_message_at`` and preview are
+left untouched throughout, so the conversation list does not change.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import zstandard
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from .. import models
+from ..core.config import settings
+from ..db.session import WorkerSessionLocal
+from .ai_client import message_text
+from .ai_search import search_vector
+
+logger = logging.getLogger(__name__)
+
+CODEC = "zstd"
+# Rows per INSERT when rehydrating
+INSERT_BATCH = 1000
+
+_COLUMNS = (
+    models.Message.id,
+    models.Message.sender,
+    models.Message.content,
+    models.Message.token_count,
+    models.Message.created_at,
+)
+
+
+def pack(rows, level: Optional[int] = None) -> Tuple[bytes, int]:
+    """zstd-compressed JSON lines of message rows and their uncompressed size."""
+    raw = "\n".join(
+        json.dumps(
+            {
+                "id": str(row.id),
+                "sender": getattr(row.sender, "value", row.sender),
+                "content": row.content,
+                "token_count": row.token_count,
+                "created_at": row.created_at.isoformat(),
+            },
+            separators=(",", ":"),
+        )
+        for row in rows
+    ).encode()
+    level = level or settings.AI_ARCHIVE_ZSTD_LEVEL
+    return zstandard.ZstdCompressor(level=level).compress(raw), len(raw)
+
+
+def unpack(data: bytes) -> List[dict]:
+    raw = zstandard.ZstdDecompressor().decompress(data)
+    return [json.loads(line) for line in raw.splitlines() if line]
+
+
+async def archive_conversation(db: AsyncSession, conv_id, cutoff: datetime) -> Optional[models.MessageArchive]:
+    """Move a still-idle conversation's messages into an archive row (caller commits).
+
+    Returns None when the conversation is gone, busy (locked by a writer),
+    already archived or no longer idle.
+    """
+    q = select(models.Conversation).where(
+        models.Conversation.id == conv_id,
+        models.Conversation.archived_at.is_(None),
+        models.Conversation.last_message_at < cutoff,
+    ).with_for_update(skip_locked=True)
+    conv = (await db.execute(q)).scalar_one_or_none()
+    if conv is None:
+        return None
+
+    rows = (await db.execute(
+        select(*_COLUMNS)
+        .where(models.Message.conversation_id == conv_id)
+        .order_by(models.Message.created_at.asc(), models.Message.id.asc())
+    )).all()
+    if not rows:
+        return None
+
+    data, raw_bytes = pack(rows)
+    archive = models.MessageArchive(
+        conversation_id=conv_id,
+        message_count=len(rows),
+        codec=CODEC,
+        data=data,
+        raw_bytes=raw_bytes,
+        first_message_at=rows[0].created_at,
+        last_message_at=rows[-1].created_at,
+    )
+    db.add(archive)
+    last = rows[-1]
+    await db.execute(
+        delete(models.Message).where(
+            models.Message.conversation_id == conv_id,
+            tuple_(models.Message.created_at, models.Message.id) <= (last.created_at, last.id),
+        ).execution_options(synchronize_session=False)
+    )
+    conv.archived_at = func.now()
+    return archive
+
+
+async def archive_idle(idle_days: Optional[int] = None, batch: Optional[int] = None) -> dict:
+    """Archive every conversation idle for ``idle_days``, oldest first."""
+    started = time.perf_counter()
+    idle_days = idle_days or settings.AI_ARCHIVE_IDLE_DAYS
+    batch = batch or settings.AI_ARCHIVE_BATCH
+    cutoff = datetime.now(timezone.utc) - timedelta(days=idle_days)
+    stats = {"conversations": 0, "messages": 0, "raw_bytes": 0, "compressed_bytes": 0}
+
+    async with WorkerSessionLocal() as db:
+        cursor = None
+        while True:
+            q = select(models.Conversation.last_message_at, models.Conversation.id).where(
+                models.Conversation.archived_at.is_(None),
+                models.Conversation.last_message_at < cutoff,
+                models.Conversation.message_count > 0,
+            )
+            if cursor is not None:
+                q = q.where(tuple_(models.Conversation.last_message_at, models.Conversation.id) > cursor)
+            q = q.order_by(models.Conversation.last_message_at.asc(), models.Conversation.id.asc()).limit(batch)
+            candidates = (await db.execute(q)).all()
+            await db.rollback()
+
+            for last_message_at, conv_id in candidates:
+                try:
+                    archive = await archive_conversation(db, conv_id, cutoff)
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    logger.exception("Could not archive conversation %s", conv_id)
+                    continue
+                if archive is not None:
+                    stats["conversations"] += 1
+                    stats["messages"] += archive.message_count
+                    stats["raw_bytes"] += archive.raw_bytes
+                    stats["compressed_bytes"] += len(archive.data)
+                # Keep the session's identity map from growing over a long run
+                db.expunge_all()
+            if len(candidates) < batch:
+                break
+            cursor = tuple(candidates[-1])
+
+    stats["ratio"] = round(stats["raw_bytes"] / stats["compressed_bytes"], 2) if stats["compressed_bytes"] else None
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    logger.info("AI message archival: %s", stats)
+    return stats
+
+
+async def rehydrate(db: AsyncSession, conv: models.Conversation) -> int:
+    """Move an archived conversation's messages back into ``ai_messages`` (caller commits)."""
+    q = select(models.MessageArchive).where(models.MessageArchive.conversation_id == conv.id).with_for_update()
+    archive = (await db.execute(q)).scalar_one_or_none()
+    restored = 0
+    # None when a concurrent request already restored it
+    if archive is not None:
+        rows = unpack(archive.data)
+        for start in range(0, len(rows), INSERT_BATCH):
+            values = [
+                {
+                    "id": uuid.UUID(row["id"]),
+                    "conversation_id": conv.id,
+                    "user_id": conv.user_id,
+                    "sender": row["sender"],
+                    "content": row["content"],
+                    "token_count": row["token_count"],
+                    "created_at": datetime.fromisoformat(row["created_at"]),
+                    "search_vector": search_vector(message_text(row["content"])),
+                }
+                for row in rows[start:start + INSERT_BATCH]
+            ]
+            await db.execute(
+                insert(models.Message.__table__).values(values).on_conflict_do_nothing(index_elements=["id"])
+            )
+        await db.delete(archive)
+        restored = len(rows)
+    conv.archived_at = None
+    return restored
@@ -0,0 +1,181 @@
+"""Cache of AI tutor replies for repeated questions.
+
+Students in one class ask nearly the same questions about the same lesson.
+A reply is cached under a hash of
+
+- the normalized prompt (case, Unicode form, whitespace and trailing
+  punctuation folded),
+- the conversation's context identifiers (lesson, course, topic, ...), and
+- a digest of the earlier turns, so follow-ups only share an answer when
+  the conversation so far is the same (empty for a first question).
+
+Lookups go through two tiers: an in-process TTL LRU, then (with
+``AI_CACHE_BACKEND="redis"``) a Redis string shared by all workers; a Redis
+hit is copied into the local tier. Identical requests that arrive while the
+reply is being generated wait for that one provider call (single-flight)
+instead of starting their own. Redis errors are logged and treated as misses.
+
+Entries store the reply's tokens, so a hit is replayed with the original
+``token_count`` in milliseconds and without a provider call.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from ..core.cache import TTLLRUCache
+from ..core.config import settings
+from ..core.redis import get_redis
+from .ai_client import ChatMessage, get_provider
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached reply (e.g. after a prompt change)
+KEY_VERSION = 1
+# conversation_metadata fields that change what a good answer looks like
+CONTEXT_FIELDS = ("lesson_id", "course_id", "quiz_id", "topic", "subject", "difficulty", "grade_level")
+
+_SPACE = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_prompt(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _TRAILING.sub("", _SPACE.sub(" ", text).strip())
+
+
+def context_ids(metadata: Optional[dict]) -> Dict[str, str]:
+    metadata = metadata or {}
+    return {field: str(metadata[field]) for field in CONTEXT_FIELDS if metadata.get(field) not in (None, "")}
+
+
+def response_key(messages: Sequence[ChatMessage], metadata: Optional[dict] = None) -> str:
+    """Cache key for the reply to the last message of ``messages``."""
+    *earlier, prompt = messages
+    turns = [[m.role, normalize_prompt(m.content)] for m in earlier]
+    material = json.dumps(
+        {
+            "v": KEY_VERSION,
+            "provider": get_provider().name,
+            "prompt": normalize_prompt(prompt.content),
+            "context": context_ids(metadata),
+            "history": hashlib.sha256(json.dumps(turns).encode()).hexdigest() if turns else None,
+        },
+        sort_keys=True,
+    )
+    return "ai:reply:" + hashlib.sha256(material.encode()).hexdigest()
+
+
+class _LeaderGone(Exception):
+    """The request generating a reply stopped before finishing it."""
+
+
+class AIResponseCache:
+    def __init__(self, backend: Optional[str] = None, maxsize: Optional[int] = None, ttl: Optional[int] = None):
+        self.backend = backend or settings.AI_CACHE_BACKEND
+        self.ttl = ttl or settings.AI_CACHE_TTL_SECONDS
+        self.local = TTLLRUCache(maxsize=maxsize or settings.AI_CACHE_MAXSIZE, ttl=self.ttl)
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.stats = {"local_hits": 0, "redis_hits": 0, "coalesced": 0, "misses": 0, "stores": 0}
+
+    async def _redis_get(self, key: str) -> Optional[List[str]]:
+        if self.backend != "redis":
+            return None
+        try:
+            raw = await get_redis().get(key)
+        except Exception:
+            logger.warning("AI cache read from Redis failed", exc_info=True)
+            return None
+        return json.loads(raw) if raw else None
+
+    async def _redis_set(self, key: str, tokens: List[str]) -> None:
+        if self.backend != "redis":
+            return
+        try:
+            await get_redis().set(key, json.dumps(tokens), ex=self.ttl)
+        except Exception:
+            logger.warning("AI cache write to Redis failed", exc_info=True)
+
+    async def lookup(self, key: str) -> Optional[List[str]]:
+        """Cached tokens from the local tier, then Redis; None on a miss."""
+        tokens = self.local.get(key)
+        if tokens is not None:
+            self.stats["local_hits"] += 1
+            return tokens
+        tokens = await self._redis_get(key)
+        if tokens is not None:
+            self.stats["redis_hits"] += 1
+            self.local.set(key, tokens)
+        return tokens
+
+    async def store(self, key: str, tokens: List[str]) -> None:
+        self.local.set(key, tokens)
+        self.stats["stores"] += 1
+        await self._redis_set(key, tokens)
+
+    async def stream(self, key: str, produce: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Tokens of the reply for ``key``: cached, shared with an identical
+        in-flight request, or freshly produced (and then cached)."""
+        tokens = await self.lookup(key)
+        loop = asyncio.get_running_loop()
+        if tokens is None and key in self._flights and self._flights[key].get_loop() is loop:
+            try:
+                tokens = await asyncio.shield(self._flights[key])
+                self.stats["coalesced"] += 1
+            except _LeaderGone:
+                tokens = None
+        if tokens is not None:
+            for token in tokens:
+                yield token
+            return
+
+        self.stats["misses"] += 1
+        # A flight started on another event loop (e.g. an eager Celery task
+        # run from a request thread) cannot be awaited here; produce our own
+        leader = key not in self._flights
+        if leader:
+            flight = self._flights[key] = loop.create_future()
+        produced: List[str] = []
+        try:
+            async for token in produce():
+                produced.append(token)
+                yield token
+        except BaseException as exc:
+            if leader:
+                self._flights.pop(key, None)
+                # Followers re-raise provider errors; if the leader's client went away they retry
+                flight.set_exception(exc if isinstance(exc, Exception) else _LeaderGone())
+                flight.exception()  # retrieved, so no warning when nobody was waiting
+            raise
+        if leader:
+            self._flights.pop(key, None)
+            flight.set_result(produced)
+        await self.store(key, produced)
+
+    async def generate(self, key: str, produce: Callable[[], AsyncIterator[str]]) -> List[str]:
+        """All tokens of the reply for ``key`` (see ``stream``)."""
+        return [token async for token in self.stream(key, produce)]
+
+    def metrics(self) -> dict:
+        hits = self.stats["local_hits"] + self.stats["redis_hits"] + self.stats["coalesced"]
+        lookups = hits + self.stats["misses"]
+        return {
+            "backend": self.backend,
+            "entries": len(self.local),
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[AIResponseCache] = None
+
+
+def get_cache() -> AIResponseCache:
+    """Process-wide reply cache configured by ``settings.AI_CACHE_*``."""
+    global _cache
+    if _cache is None:
+        _cache = AIResponseCache()
+    return _cache
@@ -1,12 +1,137 @@
-"""Placeholder AI client service.
+"""AI client service.
 
-This module should be replaced with real integration to OpenAI/other providers.
-It exposes a simple async function to request a response.
+Providers produce a response as an async stream of text tokens so callers can
+forward the first token as soon as it exists; time-to-first-token, not total
+generation time, is what a user waits for. ``generate_response`` collects a
+stream for callers that need the whole text.
+
+Providers are selected with ``settings.AI_PROVIDER``:
+
+- ``fake`` (default): local provider with configurable first-token and
+  per-token delays, latency jitter and injected errors, for development,
+  tests and benchmarks
+
+Application code goes through ``ai_gateway``, which bounds concurrency and
+rate and retries transient ``ProviderError``s; call providers directly only
+from the gateway.
 """
+import abc
 import asyncio
+import random
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from ..core.config import settings
+
+# Roughly one token per word or punctuation mark, keeping leading whitespace
+_TOKEN = re.compile(r"\s*\w+|\s*[^\w\s]|\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count of ``text`` (same split as the fake provider)."""
+    return len(_TOKEN.findall(text or ""))
+
+
+def message_text(content) -> str:
+    """Plain text of a ``Message.content`` value (a string or ``{"text": ...}``)."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        return str(content.get("text") or content.get("content") or "")
+    return str(content)
+
+
+class ProviderError(Exception):
+    """A provider call failed in a way that may succeed on retry (timeout, 5xx, 429)."""
+
+
+@dataclass
+class ChatMessage:
+    role: str
+    content: str
+
+
+class Provider(abc.ABC):
+    """Interface of an AI backend: stream the reply to a chat history."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def stream(self, messages: Sequence[ChatMessage], max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Yield the reply's tokens; raise ``ProviderError`` for retryable failures."""
+
+
+class FakeProvider(Provider):
+    """Local stand-in that echoes the prompt back token by token.
+
+    ``jitter`` scales the first-token delay by a random factor in
+    [1 - jitter, 1 + jitter]; ``error_rate`` is the probability that a call
+    fails with ``ProviderError`` before producing a token.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        first_token_delay: Optional[float] = None,
+        token_delay: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.first_token_delay = settings.AI_FAKE_FIRST_TOKEN_SECONDS if first_token_delay is None else first_token_delay
+        self.token_delay = settings.AI_FAKE_TOKEN_SECONDS if token_delay is None else token_delay
+        self.error_rate = settings.AI_FAKE_ERROR_RATE if error_rate is None else error_rate
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def reply_text(self, messages: Sequence[ChatMessage]) -> str:
+        prompt = next((m.content for m in reversed(messages) if m.role == "user"), "")
+        return f"Simulated AI response to: {prompt}"
+
+    async def stream(self, messages: Sequence[ChatMessage], max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        tokens = _TOKEN.findall(self.reply_text(messages))
+        if max_tokens is not None:
+            tokens = tokens[:max_tokens]
+        self.calls += 1
+        delay = self.first_token_delay * (1 + self.jitter * (2 * self._rng.random() - 1))
+        await asyncio.sleep(delay)
+        if self._rng.random() < self.error_rate:
+            raise ProviderError("injected provider failure")
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+
+_providers: Dict[str, Provider] = {}
+
+
+def get_provider(name: Optional[str] = None) -> Provider:
+    """Process-wide provider instance for ``name`` (default ``settings.AI_PROVIDER``)."""
+    name = name or settings.AI_PROVIDER
+    if name not in _providers:
+        if name != "fake":
+            raise ValueError(f"Unknown AI provider: {name}")
+        _providers[name] = FakeProvider()
+    return _providers[name]
+
+
+def stream_response(
+    messages: Sequence[ChatMessage],
+    max_tokens: Optional[int] = None,
+    provider: Optional[Provider] = None,
+) -> AsyncIterator[str]:
+    """Stream the assistant's reply to ``messages`` token by token (no limits; see ``ai_gateway``)."""
+    provider = provider or get_provider()
+    return provider.stream(messages, max_tokens or settings.AI_MAX_TOKENS)
 
 
-async def generate_response(prompt: str) -> str:
-    # Simulate a small delay and return a canned response for now
-    await asyncio.sleep(1.0)
-    return f"Simulated AI response to: {prompt}"
+async def generate_response(prompt: str, history: Optional[List[ChatMessage]] = None) -> str:
+    """Whole reply to ``prompt`` (after optional ``history``), collected from the stream."""
+    messages = list(history or []) + [ChatMessage("user", prompt)]
+    return "".join([token async for token in stream_response(messages)])
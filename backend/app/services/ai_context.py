@@ -0,0 +1,169 @@
+"""Token-budgeted prompt context for AI tutor conversations.
+
+``build_context`` assembles what the provider sees for the next reply:
+
+1. a system message with the conversation's rolling summary (if any),
+2. a system message with the lesson passages most relevant to the new
+   question (``lesson_retrieval``, limited to the conversation's lesson or
+   course when its metadata names one), within ``AI_RETRIEVAL_TOKENS``,
+3. the most recent messages whose stored ``Message.token_count`` fit in
+   ``AI_CONTEXT_TOKENS`` minus the tokens reserved for 1 and 2, oldest first.
+
+Recent messages are read newest-first in small keyset pages on
+``(created_at, id)`` and the scan stops as soon as the budget is used up, so
+a turn costs O(budget) rows whatever the length of the conversation.
+
+Messages that fall out of the window are folded into the rolling summary in
+``conversation_metadata["summary"]``::
+
+    {"items": ["Student asked: ...", ...],
+     "through": {"created_at": "...", "id": "..."},   # last folded message
+     "tokens": 123}
+
+Each turn only reads the messages between ``through`` and the oldest message
+of the new window (usually one or two), and the summary keeps its newest
+items within ``AI_SUMMARY_TOKENS``. Summaries are extractive: one short line
+per folded message, no provider call.
+"""
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..core.config import settings
+from . import lesson_retrieval
+from .ai_client import ChatMessage, count_tokens, message_text
+
+# Rows fetched per keyset page while filling the window
+PAGE_SIZE = 16
+# Messages folded into the summary per turn (older backlog is folded over later turns)
+FOLD_LIMIT = 200
+# Characters of a message kept in its summary line
+SUMMARY_LINE_CHARS = 160
+
+_COLUMNS = (
+    models.Message.id,
+    models.Message.created_at,
+    models.Message.sender,
+    models.Message.content,
+    models.Message.token_count,
+)
+
+
+def _role(sender) -> str:
+    return getattr(sender, "value", sender)
+
+
+def _tokens(row) -> int:
+    return row.token_count if row.token_count is not None else count_tokens(message_text(row.content))
+
+
+def summary_line(role: str, text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "..."
+    return f"{'Student asked' if role == 'user' else 'Tutor answered'}: {text}"
+
+
+def fold_summary(items: List[str], rows, max_tokens: int) -> Tuple[List[str], int]:
+    """Append one line per row and drop the oldest lines beyond ``max_tokens``."""
+    items = items + [summary_line(_role(row.sender), message_text(row.content)) for row in rows]
+    sizes = [count_tokens(item) for item in items]
+    total = sum(sizes)
+    start = 0
+    while total > max_tokens and start < len(items) - 1:
+        total -= sizes[start]
+        start += 1
+    return items[start:], total
+
+
+def summary_text(items: List[str]) -> str:
+    return "Summary of the earlier conversation:\n" + "\n".join(f"- {item}" for item in items)
+
+
+async def recent_window(
+    db: AsyncSession, conv_id, budget: int, until: Optional[Tuple[datetime, uuid.UUID]] = None
+) -> list:
+    """Newest messages fitting ``budget`` tokens (always at least one), newest first.
+
+    ``until`` is an inclusive ``(created_at, id)`` key of the newest message to include.
+    """
+    window, used, cursor = [], 0, None
+    while True:
+        q = select(*_COLUMNS).where(models.Message.conversation_id == conv_id)
+        if until is not None:
+            q = q.where(tuple_(models.Message.created_at, models.Message.id) <= until)
+        if cursor is not None:
+            q = q.where(tuple_(models.Message.created_at, models.Message.id) < cursor)
+        q = q.order_by(models.Message.created_at.desc(), models.Message.id.desc()).limit(PAGE_SIZE)
+        rows = (await db.execute(q)).all()
+        for row in rows:
+            cost = _tokens(row)
+            if window and used + cost > budget:
+                return window
+            window.append(row)
+            used += cost
+        if len(rows) < PAGE_SIZE:
+            return window
+        cursor = (rows[-1].created_at, rows[-1].id)
+
+
+async def _evicted(db: AsyncSession, conv_id, through: Optional[dict], oldest) -> list:
+    """Messages after the summary's ``through`` cursor and before the window, oldest first."""
+    q = select(*_COLUMNS).where(
+        models.Message.conversation_id == conv_id,
+        tuple_(models.Message.created_at, models.Message.id) < (oldest.created_at, oldest.id),
+    )
+    if through:
+        q = q.where(
+            tuple_(models.Message.created_at, models.Message.id)
+            > (datetime.fromisoformat(through["created_at"]), uuid.UUID(through["id"]))
+        )
+    q = q.order_by(models.Message.created_at.asc(), models.Message.id.asc()).limit(FOLD_LIMIT)
+    return (await db.execute(q)).all()
+
+
+async def build_context(
+    db: AsyncSession, conv: models.Conversation, until: Optional[Tuple[datetime, uuid.UUID]] = None
+) -> List[ChatMessage]:
+    """Prompt messages for the next reply; updates ``conv``'s rolling summary (caller commits).
+
+    With ``until`` the window ends at that ``(created_at, id)`` message, so a
+    background job answers its own question even if newer messages exist.
+    """
+    metadata = dict(conv.conversation_metadata or {})
+    summary = metadata.get("summary") or {}
+    items = summary.get("items", [])
+
+    reserved = settings.AI_SUMMARY_TOKENS + settings.AI_RETRIEVAL_TOKENS
+    window = await recent_window(db, conv.id, max(1, settings.AI_CONTEXT_TOKENS - reserved), until)
+    if not window:
+        return []
+
+    # Fold whatever slid out of the window since the last turn into the summary
+    evicted = await _evicted(db, conv.id, summary.get("through"), window[-1])
+    if evicted:
+        items, summary_tokens = fold_summary(items, evicted, settings.AI_SUMMARY_TOKENS)
+        last = evicted[-1]
+        metadata["summary"] = {
+            "items": items,
+            "through": {"created_at": last.created_at.isoformat(), "id": str(last.id)},
+            "tokens": summary_tokens,
+        }
+        # JSON columns are not mutation-tracked; assign a new dict
+        conv.conversation_metadata = metadata
+
+    messages = [ChatMessage("system", summary_text(items))] if items else []
+    question = window[0]
+    if _role(question.sender) == "user":
+        passages = lesson_retrieval.retrieve(
+            message_text(question.content), course_id=metadata.get("course_id"), lesson_id=metadata.get("lesson_id")
+        )
+        grounding = lesson_retrieval.context_block(passages, settings.AI_RETRIEVAL_TOKENS)
+        if grounding:
+            messages.append(ChatMessage("system", grounding))
+    messages.extend(ChatMessage(_role(row.sender), message_text(row.content)) for row in reversed(window))
+    return messages
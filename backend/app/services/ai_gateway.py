@@ -0,0 +1,417 @@
+"""Gateway in front of the AI provider: concurrency limits and backpressure.
+
+Every provider call from the application goes through ``AIGateway.stream``
+(or ``generate``), which applies, in order:
+
+1. admission: a request is rejected at once (``QueueFull``) when
+   ``AI_QUEUE_SIZE`` requests are already waiting, or (``CircuitOpen``) while
+   the circuit breaker is open,
+2. a per-user semaphore (``AI_MAX_CONCURRENCY_PER_USER``) so one user cannot
+   occupy the shared slots, then the global semaphore (``AI_MAX_CONCURRENCY``),
+3. a token bucket (``AI_RATE_PER_SECOND``, bursts of ``AI_RATE_BURST``) that
+   keeps call starts under the provider's rate limit.
+
+Steps 2-3 must finish within ``AI_QUEUE_TIMEOUT_SECONDS`` or the request fails
+with ``QueueTimeout``. Transient ``ProviderError``s raised before the first
+token are retried up to ``AI_RETRIES`` times with full-jitter exponential
+backoff; once tokens have been sent a failure is final. Consecutive failures
+open the breaker for ``AI_BREAKER_RESET_SECONDS``, after which a single probe
+call decides whether it closes again.
+
+``metrics()`` reports queue depth, in-flight calls, wait and first-token
+latency percentiles, rejections, retries and the breaker state.
+
+There is one gateway per process. Its state does not belong to any event
+loop: the bucket and breaker are plain objects behind a lock and the slots
+are ``SharedSemaphore``s, so the API's loop, eager Celery tasks (which run on
+a helper thread) and worker tasks (a fresh loop per job) all count against
+the same limits. Each Celery worker process has its own gateway, so provider
+calls from workers are bounded by worker concurrency times these limits.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from ..core.config import settings
+from .ai_client import ChatMessage, Provider, ProviderError, get_provider
+
+logger = logging.getLogger(__name__)
+
+# Samples kept for latency percentiles
+LATENCY_WINDOW = 1000
+RETRY_MAX_SECONDS = 5.0
+
+
+class GatewayError(Exception):
+    """The gateway refused or gave up on a request; maps to HTTP 503."""
+
+    reason = "unavailable"
+    retry_after = 5
+
+
+class QueueFull(GatewayError):
+    reason = "queue_full"
+
+
+class QueueTimeout(GatewayError):
+    reason = "queue_timeout"
+
+
+class CircuitOpen(GatewayError):
+    reason = "circuit_open"
+    retry_after = 30
+
+
+class SharedSemaphore:
+    """Counting semaphore that tasks on any event loop, in any thread, can share.
+
+    ``asyncio.Semaphore`` binds to the first loop that waits on it. Here
+    waiters park on a future of their own loop and ``release`` wakes the
+    oldest one with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Granted while being cancelled: pass the slot on (a pending
+            # grant to the cancelled future does that by itself)
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    # The waiter's loop is closed
+                    continue
+            self._value += 1
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self, deadline: float) -> None:
+        """Wait for a token; raise ``QueueTimeout`` if none is free by ``deadline``."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            if self.clock() + wait > deadline:
+                raise QueueTimeout("rate limit wait exceeds the queue timeout")
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failures; half-opens after ``reset_seconds``."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failures: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = failures
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the single probe when half-open)."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._probing or self.consecutive_failures >= self.threshold:
+                if self.opened_at is None or self._probing:
+                    logger.warning("AI provider circuit opened after %d failures", self.consecutive_failures)
+                self.opened_at = self.clock()
+            self._probing = False
+
+    def abandon(self) -> None:
+        """A call ended without an outcome (client went away); free the probe."""
+        with self._lock:
+            self._probing = False
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return {
+        "p50": round(pick(0.50), 4),
+        "p95": round(pick(0.95), 4),
+        "p99": round(pick(0.99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+class AIGateway:
+    """Concurrency-, queue- and rate-limited access to one provider."""
+
+    def __init__(
+        self,
+        provider: Optional[Provider] = None,
+        max_concurrency: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        retries: Optional[int] = None,
+        retry_base: Optional[float] = None,
+        breaker_failures: Optional[int] = None,
+        breaker_reset: Optional[float] = None,
+    ):
+        pick = lambda value, default: default if value is None else value  # noqa: E731
+        self.provider = provider or get_provider()
+        self.max_concurrency = pick(max_concurrency, settings.AI_MAX_CONCURRENCY)
+        self.max_per_user = pick(max_per_user, settings.AI_MAX_CONCURRENCY_PER_USER)
+        self.queue_size = pick(queue_size, settings.AI_QUEUE_SIZE)
+        self.queue_timeout = pick(queue_timeout, settings.AI_QUEUE_TIMEOUT_SECONDS)
+        self.retries = pick(retries, settings.AI_RETRIES)
+        self.retry_base = pick(retry_base, settings.AI_RETRY_BASE_SECONDS)
+        self.bucket = TokenBucket(pick(rate, settings.AI_RATE_PER_SECOND), pick(burst, settings.AI_RATE_BURST))
+        self.breaker = CircuitBreaker(
+            pick(breaker_failures, settings.AI_BREAKER_FAILURES), pick(breaker_reset, settings.AI_BREAKER_RESET_SECONDS)
+        )
+        self._global = SharedSemaphore(self.max_concurrency)
+        # user_id -> [semaphore, holders and waiters]; dropped when unused
+        self._users: Dict[str, list] = {}
+        # Guards the counts below, which tasks on several loops update
+        self._lock = threading.Lock()
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.counters = {"admitted": 0, "completed": 0, "failed": 0, "retries": 0}
+        self.rejected = {QueueFull.reason: 0, QueueTimeout.reason: 0, CircuitOpen.reason: 0}
+        self.wait_times = deque(maxlen=LATENCY_WINDOW)
+        self.first_token_times = deque(maxlen=LATENCY_WINDOW)
+
+    def _reject(self, error: GatewayError) -> GatewayError:
+        self.rejected[error.reason] += 1
+        return error
+
+    def check(self) -> None:
+        """Fail fast, before any work starts, if a new request would be refused."""
+        if self.waiting >= self.queue_size:
+            raise self._reject(QueueFull("too many AI requests are waiting"))
+        if self.breaker.state == CircuitBreaker.OPEN:
+            raise self._reject(CircuitOpen("AI provider is unavailable"))
+
+    def _user_semaphore(self, user_id: str) -> list:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._users[user_id] = [SharedSemaphore(self.max_per_user), 0]
+            entry[1] += 1
+            return entry
+
+    def _release_user(self, user_id: str, entry: list) -> None:
+        with self._lock:
+            entry[1] -= 1
+            if not entry[1]:
+                self._users.pop(user_id, None)
+
+    def _count(self, name: str, delta: int) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+            if name == "waiting":
+                self.max_waiting = max(self.max_waiting, self.waiting)
+
+    @asynccontextmanager
+    async def slot(self, user_id) -> AsyncIterator[None]:
+        """Hold a per-user and a global slot (and one rate token) for one call."""
+        self.check()
+        user_id = str(user_id)
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        entry = self._user_semaphore(user_id)
+        held_user = held_global = False
+        self._count("waiting", 1)
+        try:
+            await asyncio.wait_for(entry[0].acquire(), self.queue_timeout)
+            held_user = True
+            await asyncio.wait_for(self._global.acquire(), max(0.0, deadline - time.monotonic()))
+            held_global = True
+            await self.bucket.acquire(deadline)
+        except (asyncio.TimeoutError, QueueTimeout):
+            self._release(user_id, entry, held_user, held_global)
+            raise self._reject(QueueTimeout("timed out waiting for an AI slot"))
+        except BaseException:
+            self._release(user_id, entry, held_user, held_global)
+            raise
+        finally:
+            self._count("waiting", -1)
+
+        self.wait_times.append(time.monotonic() - started)
+        self.counters["admitted"] += 1
+        self._count("in_flight", 1)
+        try:
+            yield
+        finally:
+            self._count("in_flight", -1)
+            self._release(user_id, entry, True, True)
+
+    def _release(self, user_id: str, entry: list, held_user: bool, held_global: bool) -> None:
+        if held_global:
+            self._global.release()
+        if held_user:
+            entry[0].release()
+        self._release_user(user_id, entry)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+        return random.uniform(0, min(RETRY_MAX_SECONDS, self.retry_base * 2 ** (attempt - 1)))
+
+    async def stream(
+        self,
+        user_id,
+        messages: Sequence[ChatMessage],
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Stream a reply through the gateway's limits, retrying transient failures."""
+        max_tokens = max_tokens or settings.AI_MAX_TOKENS
+        async with self.slot(user_id):
+            attempt = 0
+            while True:
+                if not self.breaker.allow():
+                    raise self._reject(CircuitOpen("AI provider is unavailable"))
+                started = time.monotonic()
+                sent = False
+                try:
+                    async for token in self.provider.stream(messages, max_tokens):
+                        if not sent:
+                            self.first_token_times.append(time.monotonic() - started)
+                            sent = True
+                        yield token
+                except ProviderError:
+                    self.breaker.record_failure()
+                    if sent or attempt >= self.retries:
+                        self.counters["failed"] += 1
+                        raise
+                    attempt += 1
+                    self.counters["retries"] += 1
+                    await asyncio.sleep(self.backoff(attempt))
+                    continue
+                except BaseException:
+                    self.breaker.abandon()
+                    raise
+                self.breaker.record_success()
+                self.counters["completed"] += 1
+                return
+
+    async def generate(self, user_id, messages: Sequence[ChatMessage], max_tokens: Optional[int] = None) -> str:
+        """Whole reply, collected from ``stream``."""
+        tokens: List[str] = [token async for token in self.stream(user_id, messages, max_tokens)]
+        return "".join(tokens)
+
+    def metrics(self) -> dict:
+        return {
+            "provider": self.provider.name,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "active_users": len(self._users),
+            "circuit": self.breaker.state,
+            **self.counters,
+            "rejected": dict(self.rejected),
+            "wait_seconds": _percentiles(self.wait_times),
+            "first_token_seconds": _percentiles(self.first_token_times),
+        }
+
+
+_gateway: Optional[AIGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> AIGateway:
+    """The process-wide gateway (created on first use), shared by every event loop."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = AIGateway()
+    return _gateway
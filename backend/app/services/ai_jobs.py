@@ -0,0 +1,128 @@
+"""AI tutor replies generated by Celery workers (``POST ...messages?async=true``).
+
+The request stores the user's message and an ``AIGenerationJob`` row and
+returns at once; ``smartlearn.generate_ai_reply`` then calls ``run_job``:
+
+1. claim the job: one ``UPDATE ... WHERE status = 'pending'`` marks it
+   ``running`` (committed, so pollers see it). A redelivered task finds it
+   already claimed and does nothing, unless the claim is older than
+   ``STALE_AFTER`` (its worker died),
+2. build the prompt context (``ai_context``) ending at the job's message and
+   generate the reply through the response cache and provider gateway, as a
+   streamed request would,
+3. store the assistant message, mark the job ``completed`` and add an
+   ``ai_reply`` notification in one transaction, then push the notification.
+
+Errors the task may retry (gateway rejections, provider failures) put the
+job back to ``pending``; once retries are exhausted, or on any other error,
+the job is ``failed`` and the user is notified as well. A job that is
+already ``completed`` is not generated again, so a redelivered task (acks
+are late) does not store a second reply.
+"""
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.sql import func
+
+from .. import models
+from ..db.session import WorkerSessionLocal
+from . import ai_context, notification_service, tutor
+from .ai_cache import get_cache, response_key
+from .ai_client import ProviderError
+from .ai_gateway import GatewayError, get_gateway
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, COMPLETED, FAILED = "pending", "running", "completed", "failed"
+# Errors worth another attempt later
+RETRYABLE = (GatewayError, ProviderError)
+NOTIFICATION_TYPE = "ai_reply"
+# A running job not finished after this long is presumed orphaned and may be claimed again
+STALE_AFTER = timedelta(minutes=10)
+
+
+def _payload(job: models.AIGenerationJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "conversation_id": str(job.conversation_id),
+        "status": job.status,
+        "message_id": str(job.result_message_id) if job.result_message_id else None,
+    }
+
+
+async def _finish(db, job: models.AIGenerationJob, status: str, error: Optional[str] = None) -> models.Notification:
+    job.status = status
+    job.error = error
+    job.finished_at = func.now()
+    notification = await notification_service.create_notification(db, job.user_id, NOTIFICATION_TYPE, _payload(job))
+    await db.commit()
+    await db.refresh(notification)
+    return notification
+
+
+async def run_job(job_id, final: bool = True) -> dict:
+    """Generate and store the reply for a job; ``final`` is False while the task can still retry."""
+    async with WorkerSessionLocal() as db:
+        job = await db.get(models.AIGenerationJob, job_id)
+        if job is None:
+            logger.warning("AI generation job %s not found", job_id)
+            return {"job_id": str(job_id), "status": "missing"}
+        if job.status in (COMPLETED, FAILED):
+            return _payload(job)
+
+        table = models.AIGenerationJob
+        claimed = (await db.execute(
+            update(table)
+            .where(
+                table.id == job.id,
+                or_(
+                    table.status == PENDING,
+                    and_(table.status == RUNNING, table.started_at < func.now() - STALE_AFTER),
+                ),
+            )
+            .values(status=RUNNING, attempts=table.attempts + 1, started_at=func.now())
+            .returning(table.id)
+            .execution_options(synchronize_session=False)
+        )).first()
+        await db.commit()
+        await db.refresh(job)
+        if claimed is None:
+            logger.info("AI generation job %s is already %s", job_id, job.status)
+            return _payload(job)
+
+        try:
+            conv = (await db.execute(
+                select(models.Conversation).where(models.Conversation.id == job.conversation_id)
+            )).scalar_one()
+            question = (await db.execute(
+                select(models.Message.created_at, models.Message.id).where(models.Message.id == job.message_id)
+            )).one()
+            context = await ai_context.build_context(db, conv, until=tuple(question))
+            key = response_key(context, conv.conversation_metadata)
+            tokens = await get_cache().generate(key, lambda: get_gateway().stream(job.user_id, context))
+        except RETRYABLE as exc:
+            await db.rollback()
+            await db.refresh(job)
+            if not final:
+                job.status = PENDING
+                job.error = str(exc)
+                await db.commit()
+                raise
+            notification = await _finish(db, job, FAILED, str(exc))
+            await notification_service.publish([notification])
+            return _payload(job)
+        except Exception:
+            logger.exception("AI generation job %s failed", job_id)
+            await db.rollback()
+            await db.refresh(job)
+            notification = await _finish(db, job, FAILED, "AI response generation failed")
+            await notification_service.publish([notification])
+            return _payload(job)
+
+        msg = await tutor.add_assistant_message(db, job.conversation_id, "".join(tokens), len(tokens))
+        job.result_message_id = msg.id
+        notification = await _finish(db, job, COMPLETED)
+        await notification_service.publish([notification])
+        return _payload(job)
@@ -0,0 +1,117 @@
+"""Storing AI tutor messages together with their conversation's summary columns.
+
+``add_message`` inserts a message and updates the conversation's
+``message_count``, ``last_message_at`` and ``last_message_preview`` in one
+statement (the last two only when the message is the newest)::
+
+    WITH inserted AS (INSERT INTO ai_messages ... RETURNING ...),
+         bumped AS (UPDATE ai_conversations SET message_count = message_count + 1, ...)
+    SELECT * FROM inserted
+
+so the conversation list is always consistent with its messages and never
+needs a per-conversation lookup. All message inserts go through here.
+
+``page_messages`` reads a conversation in keyset pages on ``(created_at, id)``
+in either direction.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from .. import models
+from .ai_client import message_text
+from .ai_search import search_vector
+
+# Characters of the newest message shown in the conversation list
+PREVIEW_CHARS = 120
+
+
+def preview(content: Any) -> str:
+    return " ".join(message_text(content).split())[:PREVIEW_CHARS]
+
+
+async def add_message(
+    db: AsyncSession,
+    conv_id,
+    sender,
+    content: Any,
+    token_count: Optional[int] = None,
+) -> models.Message:
+    """Insert a message and bump its conversation in the same statement (caller commits).
+
+    The ORM copy of the conversation, if loaded, is expired so it reflects
+    the new counts on next access.
+    """
+    message = models.Message.__table__
+    conversation = models.Conversation.__table__
+    inserted = (
+        insert(message)
+        .values(
+            id=uuid.uuid4(),
+            conversation_id=conv_id,
+            user_id=select(conversation.c.user_id).where(conversation.c.id == conv_id).scalar_subquery(),
+            sender=sender,
+            content=content,
+            token_count=token_count,
+            search_vector=search_vector(message_text(content)),
+        )
+        .returning(*(column for column in message.c if column.key != "search_vector"))
+        .cte("inserted")
+    )
+    created_at = select(inserted.c.created_at).scalar_subquery()
+    # Never move backwards (e.g. a message stored with an older timestamp)
+    newest = or_(conversation.c.last_message_at.is_(None), created_at >= conversation.c.last_message_at)
+    bumped = (
+        update(conversation)
+        .where(conversation.c.id == conv_id)
+        .values(
+            message_count=conversation.c.message_count + 1,
+            last_message_at=func.greatest(conversation.c.last_message_at, created_at),
+            last_message_preview=case((newest, preview(content)), else_=conversation.c.last_message_preview),
+        )
+        .returning(conversation.c.id)
+        .cte("bumped")
+    )
+    row = (await db.execute(select(inserted).add_cte(bumped))).one()
+
+    msg = models.Message(**row._mapping)
+    make_transient_to_detached(msg)
+    db.add(msg)
+    conv = db.identity_map.get(identity_key(models.Conversation, conv_id))
+    if conv is not None:
+        db.expire(conv, ["message_count", "last_message_at", "last_message_preview"])
+    return msg
+
+
+async def page_messages(
+    db: AsyncSession,
+    conv_id,
+    limit: int,
+    before: Optional[Tuple[datetime, uuid.UUID]] = None,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None,
+) -> Tuple[List[models.Message], bool, bool]:
+    """One page of a conversation, oldest first, as ``(messages, has_older, has_newer)``.
+
+    Without a cursor this is the newest ``limit`` messages. ``before`` and
+    ``after`` are exclusive ``(created_at, id)`` keys; pages before a key
+    (and the newest page) are read newest-first and reversed, so every page
+    is a single range scan of ``ix_ai_messages_conversation_created`` that
+    stops after ``limit + 1`` rows.
+    """
+    key = tuple_(models.Message.created_at, models.Message.id)
+    q = select(models.Message).where(models.Message.conversation_id == conv_id)
+    if after is not None:
+        q = q.where(key > after).order_by(models.Message.created_at.asc(), models.Message.id.asc())
+        rows = (await db.execute(q.limit(limit + 1))).scalars().all()
+        return list(rows[:limit]), True, len(rows) > limit
+
+    if before is not None:
+        q = q.where(key < before)
+    q = q.order_by(models.Message.created_at.desc(), models.Message.id.desc())
+    rows = (await db.execute(q.limit(limit + 1))).scalars().all()
+    return list(reversed(rows[:limit])), len(rows) > limit, before is not None
@@ -0,0 +1,82 @@
+"""Full-text search over a user's AI tutor messages.
+
+Each ``ai_messages`` row carries ``search_vector``, the ``to_tsvector`` of its
+text, and ``user_id``, the conversation's owner, both written by the
+statement that inserts the message (``ai_messages.add_message``).
+``ix_ai_messages_user_search`` is a btree_gin index on ``(user_id,
+search_vector)``, so ``search`` matches a ``websearch_to_tsquery`` (quoted
+phrases, ``or``, ``-word``) against the caller's messages only, instead of
+every user's matches being filtered after the index scan. It ranks with
+``ts_rank_cd`` and builds ``ts_headline`` snippets only for the rows of the
+requested page.
+
+Messages of archived conversations (``ai_archive``) are out of
+``ai_messages`` and therefore not searchable until the conversation is
+opened again and rehydrated.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import Text, case, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+# Text search configuration used for indexing and queries
+SEARCH_CONFIG = "english"
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=12, MaxFragments=2, FragmentDelimiter=\" ... \""
+
+
+def content_text(content):
+    """SQL text of a ``Message.content`` value, as ``ai_client.message_text`` reads it."""
+    doc = cast(content, JSONB)
+    return case(
+        (func.jsonb_typeof(doc) == "string", doc.op("#>>")(literal_column("'{}'"))),
+        (func.jsonb_typeof(doc) == "object", func.coalesce(doc["text"].astext, doc["content"].astext, "")),
+        else_=cast(content, Text),
+    )
+
+
+def search_vector(text: str):
+    """Value for ``Message.search_vector`` of a message whose text is ``text``."""
+    return func.to_tsvector(SEARCH_CONFIG, text)
+
+
+async def search(db: AsyncSession, user_id, query: str, limit: int, offset: int = 0) -> Tuple[List, bool]:
+    """Best-ranked messages of ``user_id`` matching ``query`` and whether more follow.
+
+    Rows have ``id, conversation_id, conversation_title, sender, created_at,
+    rank, snippet``.
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    message, conversation = models.Message, models.Conversation
+    rank = func.ts_rank_cd(message.search_vector, ts_query).label("rank")
+    hits = (
+        select(
+            message.id,
+            message.conversation_id,
+            conversation.title.label("conversation_title"),
+            message.sender,
+            message.created_at,
+            message.content,
+            rank,
+        )
+        .join(conversation, conversation.id == message.conversation_id)
+        .where(message.user_id == user_id, message.search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), message.created_at.desc(), message.id.desc())
+        .limit(limit + 1)
+        .offset(offset)
+        .subquery()
+    )
+    # Headlines are costly (they re-parse the text), so only for this page
+    q = select(
+        hits.c.id,
+        hits.c.conversation_id,
+        hits.c.conversation_title,
+        hits.c.sender,
+        hits.c.created_at,
+        hits.c.rank,
+        func.ts_headline(SEARCH_CONFIG, content_text(hits.c.content), ts_query, HEADLINE_OPTIONS).label("snippet"),
+    ).order_by(hits.c.rank.desc(), hits.c.created_at.desc(), hits.c.id.desc())
+    rows = (await db.execute(q)).all()
+    return rows[:limit], len(rows) > limit
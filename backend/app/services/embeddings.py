@@ -0,0 +1,98 @@
+"""Local text chunking and deterministic embeddings for lesson retrieval.
+
+``chunk_text`` splits lesson content into overlapping passages of whole
+sentences. ``HashingVectorizer`` embeds a passage without a model or network
+call: word unigrams and bigrams are hashed (CRC32, stable across processes)
+into ``dim`` signed buckets, weighted by ``1 + log(tf)`` and L2-normalized,
+so the dot product of two embeddings is their cosine similarity.
+"""
+import html
+import math
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+from ..core.config import settings
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP_WORDS = 30
+
+_TAG = re.compile(r"<[^>]+>")
+_MARKUP = re.compile(r"[#*_`>|]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or that the this to was "
+    "were what when where which who why will with you your do does can".split()
+)
+
+
+def clean_text(text: str) -> str:
+    """Plain text of HTML or Markdown lesson content."""
+    text = html.unescape(_TAG.sub(" ", text or ""))
+    return _MARKUP.sub(" ", text)
+
+
+def chunk_text(text: str, max_words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP_WORDS) -> List[str]:
+    """Passages of whole sentences up to ``max_words``, overlapping by ~``overlap`` words."""
+    sentences = [" ".join(s.split()) for s in _SENTENCE.split(clean_text(text))]
+    sentences = [s for s in sentences if s]
+    chunks: List[str] = []
+    current: List[str] = []
+    words = 0
+    for sentence in sentences:
+        n = len(sentence.split())
+        if current and words + n > max_words:
+            chunks.append(" ".join(current))
+            # Carry trailing sentences into the next chunk for context
+            carried: List[str] = []
+            carried_words = 0
+            for previous in reversed(current):
+                size = len(previous.split())
+                if carried_words + size > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_words += size
+            current, words = carried, carried_words
+        current.append(sentence)
+        words += n
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def tokens(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+class HashingVectorizer:
+    """Stateless unigram + bigram feature hashing into ``dim`` dimensions."""
+
+    def __init__(self, dim: int = None):
+        self.dim = dim or settings.AI_EMBEDDING_DIM
+
+    def features(self, text: str) -> List[str]:
+        words = tokens(text)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        counts = {}
+        for feature in self.features(text):
+            h = zlib.crc32(feature.encode())
+            # Low 31 bits pick the bucket, the top bit the sign
+            key = ((h & 0x7FFFFFFF) % self.dim, 1.0 if h >> 31 else -1.0)
+            counts[key] = counts.get(key, 0) + 1
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for (index, sign), tf in counts.items():
+            vector[index] += sign * (1.0 + math.log(tf))
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        rows = [self.embed(text) for text in texts]
+        return np.vstack(rows) if rows else np.zeros((0, self.dim), dtype=np.float32)
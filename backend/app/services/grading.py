@@ -0,0 +1,312 @@
+"""Server-side quiz grading.
+
+Each quiz's ``QuizQuestion.question_json`` rows are compiled once into an
+``AnswerKey`` made of flat NumPy arrays. Submitted answers are encoded into
+arrays aligned with the key and scored in a single vectorized pass, which also
+works for many attempts at once (see ``score_batch``).
+
+Supported ``question_json`` shapes::
+
+    {"type": "multiple_choice", "options": ["3", "4", "5"], "answer": 1}
+    {"type": "multi_select", "options": ["a", "b", "c"], "answer": [0, 2]}
+    {"type": "numeric", "answer": 3.14, "tolerance": 0.01}
+    {"type": "short_text", "answer": ["photosynthesis", "photo synthesis"]}
+
+Choice answers may be given as option indexes or option text. Every question
+may carry ``"points"`` (default 1). ``correct_answer`` is accepted as an alias
+of ``answer``. Attempts submit ``answers`` as ``{question_id: answer}``.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..core.cache import VersionedLRUCache
+
+MULTIPLE_CHOICE = 0
+MULTI_SELECT = 1
+NUMERIC = 2
+SHORT_TEXT = 3
+
+QUESTION_TYPES = {
+    "multiple_choice": MULTIPLE_CHOICE,
+    "single_choice": MULTIPLE_CHOICE,
+    "true_false": MULTIPLE_CHOICE,
+    "multi_select": MULTI_SELECT,
+    "multiple_select": MULTI_SELECT,
+    "numeric": NUMERIC,
+    "number": NUMERIC,
+    "short_text": SHORT_TEXT,
+    "short_answer": SHORT_TEXT,
+    "text": SHORT_TEXT,
+}
+
+# question_json keys that reveal the answer; removed before delivery to students
+ANSWER_FIELDS = frozenset({
+    "answer", "answers", "correct_answer", "correct", "tolerance",
+    "explanation", "solution", "accepted",
+})
+
+# Sentinel for "no usable answer"; never equal to a compiled expected value.
+NO_ANSWER = -1
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class InvalidQuestion(ValueError):
+    """Raised when a question_json cannot be compiled into an answer key."""
+
+
+def validate_question(question_id, spec: dict) -> None:
+    """Raise ``InvalidQuestion`` unless ``spec`` compiles into an answer key."""
+    compile_answer_key([(question_id, spec)])
+
+
+@event.listens_for(models.QuizQuestion.question_json, "set")
+def _validate_on_write(target, value, oldvalue, initiator):
+    # Every write of question_json (API, seed scripts) must stay gradable
+    validate_question(target.id, value)
+
+
+def strip_answers(spec: dict) -> dict:
+    """Copy of a question_json without any answer-revealing fields."""
+    return {k: v for k, v in (spec or {}).items() if k not in ANSWER_FIELDS}
+
+
+def normalize_text(value: Any) -> str:
+    """Case- and whitespace-insensitive form used for text and option matching."""
+    return _WHITESPACE.sub(" ", str(value)).strip().casefold()
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """Compiled answer key for one quiz version.
+
+    Arrays are aligned with ``question_ids``. For choice and text questions
+    ``expected`` holds the value an encoded answer must equal (option index,
+    option bitmask, or 1 for an accepted text); numeric questions compare
+    against ``target`` within ``tolerance``.
+    """
+    question_ids: Tuple[str, ...]
+    index: Dict[str, int]
+    kinds: np.ndarray
+    points: np.ndarray
+    expected: np.ndarray
+    target: np.ndarray
+    tolerance: np.ndarray
+    options: Tuple[Dict[str, int], ...]
+    accepted: Tuple[frozenset, ...]
+
+    @property
+    def total_points(self) -> float:
+        return float(self.points.sum())
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+
+def _answer_of(spec: dict) -> Any:
+    return spec["answer"] if "answer" in spec else spec.get("correct_answer")
+
+
+def _option_index(value: Any, options: Dict[str, int], n_options: int) -> int:
+    """Resolve a choice given as an index or as option text."""
+    if isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, int):
+        return value if 0 <= value < n_options else NO_ANSWER
+    if isinstance(value, str):
+        found = options.get(normalize_text(value))
+        if found is not None:
+            return found
+        if value.strip().isdigit():
+            return _option_index(int(value.strip()), options, n_options)
+    return NO_ANSWER
+
+
+def _option_mask(values: Any, options: Dict[str, int], n_options: int) -> int:
+    if not isinstance(values, (list, tuple, set)):
+        values = [values]
+    mask = 0
+    for value in values:
+        idx = _option_index(value, options, n_options)
+        if idx == NO_ANSWER:
+            return NO_ANSWER
+        mask |= 1 << idx
+    return mask
+
+
+def compile_answer_key(questions: Iterable[Tuple[Any, dict]]) -> AnswerKey:
+    """Compile ``(question_id, question_json)`` pairs into an ``AnswerKey``."""
+    ids: List[str] = []
+    kinds, points, expected, target, tolerance = [], [], [], [], []
+    options_list: List[Dict[str, int]] = []
+    accepted_list: List[frozenset] = []
+
+    for question_id, spec in questions:
+        spec = spec or {}
+        kind = QUESTION_TYPES.get(str(spec.get("type", "multiple_choice")).lower())
+        if kind is None:
+            raise InvalidQuestion(f"Question {question_id}: unsupported type {spec.get('type')!r}")
+
+        raw_options = spec.get("options") or []
+        options = {normalize_text(opt): i for i, opt in enumerate(raw_options)}
+        answer = _answer_of(spec)
+        exp, tgt, tol, accepted = NO_ANSWER, np.nan, 0.0, frozenset()
+
+        if kind == MULTIPLE_CHOICE:
+            exp = _option_index(answer, options, len(raw_options))
+        elif kind == MULTI_SELECT:
+            if len(raw_options) > 62:
+                raise InvalidQuestion(f"Question {question_id}: too many options for multi_select")
+            exp = _option_mask(answer, options, len(raw_options))
+        elif kind == NUMERIC:
+            try:
+                tgt = float(answer)
+                tol = abs(float(spec.get("tolerance", 0) or 0))
+            except (TypeError, ValueError):
+                raise InvalidQuestion(f"Question {question_id}: numeric answer required")
+        else:
+            values = answer if isinstance(answer, (list, tuple, set)) else [answer]
+            accepted = frozenset(normalize_text(v) for v in values if v is not None)
+            exp = 1
+
+        if kind != NUMERIC and exp == NO_ANSWER:
+            raise InvalidQuestion(f"Question {question_id}: answer does not match any option")
+
+        ids.append(str(question_id))
+        kinds.append(kind)
+        points.append(float(spec.get("points", 1) or 0))
+        expected.append(exp)
+        target.append(tgt)
+        tolerance.append(tol)
+        options_list.append(options)
+        accepted_list.append(accepted)
+
+    return AnswerKey(
+        question_ids=tuple(ids),
+        index={qid: i for i, qid in enumerate(ids)},
+        kinds=np.asarray(kinds, dtype=np.int8),
+        points=np.asarray(points, dtype=np.float64),
+        expected=np.asarray(expected, dtype=np.int64),
+        target=np.asarray(target, dtype=np.float64),
+        tolerance=np.asarray(tolerance, dtype=np.float64),
+        options=tuple(options_list),
+        accepted=tuple(accepted_list),
+    )
+
+
+def encode_answers(key: AnswerKey, answers: Any, sel: np.ndarray, num: np.ndarray) -> None:
+    """Encode one submission into the preallocated ``sel``/``num`` rows (in place)."""
+    if not isinstance(answers, dict):
+        return
+    for question_id, value in answers.items():
+        i = key.index.get(str(question_id))
+        if i is None or value is None:
+            continue
+        kind = key.kinds[i]
+        if kind == MULTIPLE_CHOICE:
+            sel[i] = _option_index(value, key.options[i], len(key.options[i]))
+        elif kind == MULTI_SELECT:
+            sel[i] = _option_mask(value, key.options[i], len(key.options[i]))
+        elif kind == NUMERIC:
+            try:
+                num[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        else:
+            sel[i] = 1 if normalize_text(value) in key.accepted[i] else 0
+
+
+def encode_batch(key: AnswerKey, submissions: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode many submissions into ``(sel, num)`` matrices of shape (attempts, questions)."""
+    shape = (len(submissions), len(key))
+    sel = np.full(shape, NO_ANSWER, dtype=np.int64)
+    num = np.full(shape, np.nan, dtype=np.float64)
+    for row, answers in enumerate(submissions):
+        encode_answers(key, answers, sel[row], num[row])
+    return sel, num
+
+
+def correctness(key: AnswerKey, sel: np.ndarray, num: np.ndarray) -> np.ndarray:
+    """Boolean matrix of correct answers, vectorized over attempts and questions."""
+    with np.errstate(invalid="ignore"):
+        numeric_ok = np.abs(num - key.target) <= key.tolerance
+    return np.where(key.kinds == NUMERIC, numeric_ok, sel == key.expected)
+
+
+def answered(key: AnswerKey, sel: np.ndarray, num: np.ndarray) -> np.ndarray:
+    """Boolean matrix of questions that received a usable answer."""
+    return np.where(key.kinds == NUMERIC, ~np.isnan(num), sel != NO_ANSWER)
+
+
+def score_batch(key: AnswerKey, submissions: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Score many submissions at once.
+
+    Returns ``(scores, correct)`` where ``scores`` is an int array of
+    percentages (0-100) and ``correct`` the per-question boolean matrix.
+    """
+    sel, num = encode_batch(key, submissions)
+    correct = correctness(key, sel, num)
+    total = key.total_points
+    if total <= 0:
+        return np.zeros(len(submissions), dtype=np.int64), correct
+    earned = correct.astype(np.float64) @ key.points
+    scores = np.rint(earned * 100.0 / total).astype(np.int64)
+    return scores, correct
+
+
+def score_answers(key: AnswerKey, answers: Any) -> int:
+    """Score a single submission as a percentage (0-100)."""
+    scores, _ = score_batch(key, [answers])
+    return int(scores[0])
+
+
+def is_passing(score: Optional[int], passing_score: Optional[int]) -> Optional[bool]:
+    if score is None or passing_score is None:
+        return None
+    return score >= passing_score
+
+
+# Compiled keys are small and reused by every submission of the same quiz;
+# entries are tied to Quiz.version so an edited quiz recompiles on next use.
+_answer_keys = VersionedLRUCache(maxsize=2048)
+
+
+async def load_answer_key(db: AsyncSession, quiz_id) -> AnswerKey:
+    """Compile the answer key for a quiz straight from its questions (no cache)."""
+    q = select(models.QuizQuestion.id, models.QuizQuestion.question_json).where(
+        models.QuizQuestion.quiz_id == quiz_id
+    ).order_by(models.QuizQuestion.id)
+    res = await db.execute(q)
+    return compile_answer_key(res.all())
+
+
+async def get_answer_key(db: AsyncSession, quiz: models.Quiz) -> AnswerKey:
+    """Return the compiled answer key for ``quiz``, compiling on version change."""
+    return await _answer_keys.get_or_build(
+        quiz.id, quiz.version, lambda: load_answer_key(db, quiz.id)
+    )
+
+
+def invalidate_answer_key(quiz_id) -> None:
+    _answer_keys.invalidate(quiz_id)
+
+
+async def grade_attempt(db: AsyncSession, quiz: models.Quiz, attempt: models.QuizAttempt) -> AnswerKey:
+    """Score ``attempt`` and mark it completed; the caller commits.
+
+    Sets ``score`` (percentage), ``passed`` (against ``quiz.passing_score``) and
+    ``completed_at``. A quiz without questions leaves ``score`` empty.
+    """
+    key = await get_answer_key(db, quiz)
+    score = score_answers(key, attempt.answers) if len(key) else None
+    attempt.score = score
+    attempt.passed = is_passing(score, quiz.passing_score)
+    attempt.completed_at = datetime.now(timezone.utc)
+    return key
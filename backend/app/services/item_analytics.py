@@ -0,0 +1,236 @@
+"""Per-question item analytics for quizzes.
+
+For each quiz, completed attempts are turned into a student-by-question
+correctness matrix (using the grading engine's encoders) and reduced with
+NumPy into per-question sufficient statistics:
+
+- ``p_value``: share of attempts answering the question correctly (difficulty)
+- ``discrimination``: point-biserial correlation between answering correctly
+  and the rest-of-quiz score
+- ``distractors``: how often each choice option was picked
+
+Statistics are sums, so new attempts are merged into the stored rows instead of
+replaying history. A watermark on ``(completed_at, id)`` records how far each
+quiz has been processed; a quiz version change (question edit / re-grade)
+resets the stats for that quiz.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from .. import models
+from ..db.session import WorkerSessionLocal
+from . import grading
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+
+# Attempts are graded with an application timestamp before commit; skipping the
+# most recent window avoids missing one that commits after the watermark moves.
+SETTLE_DELAY = timedelta(minutes=2)
+
+STAT_FIELDS = ("n_correct", "sum_rest", "sum_rest_sq", "sum_correct_rest")
+
+
+async def iter_completed_attempts(
+    db: AsyncSession,
+    quiz_id,
+    after: Optional[tuple] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[Sequence]:
+    """Stream ``(id, completed_at, answers)`` rows in watermark order, chunk by chunk."""
+    attempt = models.QuizAttempt
+    q = select(attempt.id, attempt.completed_at, attempt.answers).where(
+        attempt.quiz_id == quiz_id,
+        attempt.completed_at.isnot(None),
+    ).order_by(attempt.completed_at.asc(), attempt.id.asc())
+    if after is not None:
+        q = q.where(tuple_(attempt.completed_at, attempt.id) > tuple_(*after))
+    if until is not None:
+        q = q.where(attempt.completed_at < until)
+
+    stream = await db.stream(q.execution_options(yield_per=chunk_size))
+    async for chunk in stream.partitions(chunk_size):
+        yield chunk
+
+
+def correctness_matrix(key: grading.AnswerKey, submissions: Sequence) -> tuple:
+    """Return ``(sel, num, correct)`` for a batch of submissions."""
+    sel, num = grading.encode_batch(key, submissions)
+    return sel, num, grading.correctness(key, sel, num)
+
+
+def distractor_counts(key: grading.AnswerKey, sel: np.ndarray, num: np.ndarray) -> List[Dict[str, int]]:
+    """Count option picks per question (choice types) plus unanswered ("none")."""
+    counts: List[Dict[str, int]] = []
+    for i, kind in enumerate(key.kinds):
+        column = sel[:, i]
+        n_options = len(key.options[i])
+        picked: Dict[str, int] = {}
+        if kind == grading.MULTIPLE_CHOICE:
+            valid = column[column >= 0]
+            for option, count in enumerate(np.bincount(valid, minlength=n_options)):
+                if count:
+                    picked[str(option)] = int(count)
+        elif kind == grading.MULTI_SELECT:
+            valid = column[column >= 0]
+            for option in range(n_options):
+                count = int(((valid >> option) & 1).sum())
+                if count:
+                    picked[str(option)] = count
+        missing = np.isnan(num[:, i]) if kind == grading.NUMERIC else column == grading.NO_ANSWER
+        if missing.any():
+            picked["none"] = int(missing.sum())
+        counts.append(picked)
+    return counts
+
+
+def chunk_statistics(key: grading.AnswerKey, submissions: Sequence) -> dict:
+    """Reduce a batch of submissions to per-question sufficient statistics."""
+    sel, num, correct = correctness_matrix(key, submissions)
+    x = correct.astype(np.float64)
+    earned = x @ key.points
+    # Score on the other questions, per (attempt, question)
+    rest = earned[:, None] - x * key.points
+    return {
+        "n": x.shape[0],
+        "n_correct": x.sum(axis=0),
+        "sum_rest": rest.sum(axis=0),
+        "sum_rest_sq": np.square(rest).sum(axis=0),
+        "sum_correct_rest": (x * rest).sum(axis=0),
+        "distractors": distractor_counts(key, sel, num),
+    }
+
+
+def point_biserial(n: np.ndarray, sx: np.ndarray, sy: np.ndarray, sy2: np.ndarray, sxy: np.ndarray) -> np.ndarray:
+    """Vectorized Pearson r for binary x from sums; NaN where undefined."""
+    num = n * sxy - sx * sy
+    # x is 0/1, so sum(x^2) == sum(x)
+    den = np.sqrt((n * sx - sx * sx) * (n * sy2 - sy * sy))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(den > 0, num / den, np.nan)
+    return r
+
+
+def _nullable(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else round(float(v), 6) for v in values]
+
+
+async def refresh_quiz_analytics(quiz_id, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Fold attempts completed since the last run into the quiz's item statistics."""
+    async with WorkerSessionLocal() as db:
+        quiz = await db.get(models.Quiz, quiz_id)
+        if quiz is None:
+            return {"quiz_id": str(quiz_id), "status": "missing"}
+        key = await grading.load_answer_key(db, quiz.id)
+        size = len(key)
+        state = await db.get(models.QuizAnalyticsState, quiz.id)
+
+        totals = {field: np.zeros(size) for field in STAT_FIELDS}
+        distractors: List[Dict[str, int]] = [{} for _ in range(size)]
+        n = 0
+        watermark = None
+
+        if state is None or state.quiz_version != quiz.version:
+            # New quiz version: answers were re-keyed, start over
+            await db.execute(delete(models.QuizItemStat).where(models.QuizItemStat.quiz_id == quiz.id))
+        else:
+            n = state.attempts_count
+            if state.last_completed_at is not None:
+                watermark = (state.last_completed_at, state.last_attempt_id)
+            rows = await db.execute(select(models.QuizItemStat).where(models.QuizItemStat.quiz_id == quiz.id))
+            for stat in rows.scalars():
+                i = key.index.get(str(stat.question_id))
+                if i is None:
+                    continue
+                for field in STAT_FIELDS:
+                    totals[field][i] = getattr(stat, field)
+                distractors[i] = dict(stat.distractors or {})
+
+        until = datetime.now(timezone.utc) - SETTLE_DELAY
+        new_attempts = 0
+        async with WorkerSessionLocal() as reader:
+            async for chunk in iter_completed_attempts(reader, quiz.id, watermark, until, chunk_size):
+                stats = chunk_statistics(key, [row.answers for row in chunk])
+                for field in STAT_FIELDS:
+                    totals[field] += stats[field]
+                for i, picked in enumerate(stats["distractors"]):
+                    for option, count in picked.items():
+                        distractors[i][option] = distractors[i].get(option, 0) + count
+                new_attempts += stats["n"]
+                watermark = (chunk[-1].completed_at, chunk[-1].id)
+
+        n += new_attempts
+        if state is not None and state.quiz_version == quiz.version and new_attempts == 0:
+            return {"quiz_id": str(quiz.id), "status": "unchanged", "attempts": n}
+
+        counts = np.full(size, float(n))
+        p_values = np.divide(totals["n_correct"], counts, out=np.full(size, np.nan), where=counts > 0)
+        discrimination = point_biserial(
+            counts, totals["n_correct"], totals["sum_rest"], totals["sum_rest_sq"], totals["sum_correct_rest"]
+        )
+
+        if size:
+            rows = [
+                {
+                    "quiz_id": quiz.id,
+                    "question_id": question_id,
+                    "n": n,
+                    "n_correct": int(totals["n_correct"][i]),
+                    "sum_rest": float(totals["sum_rest"][i]),
+                    "sum_rest_sq": float(totals["sum_rest_sq"][i]),
+                    "sum_correct_rest": float(totals["sum_correct_rest"][i]),
+                    "distractors": distractors[i],
+                    "p_value": p,
+                    "discrimination": r,
+                }
+                for i, (question_id, p, r) in enumerate(
+                    zip(key.question_ids, _nullable(p_values), _nullable(discrimination))
+                )
+            ]
+            stmt = insert(models.QuizItemStat).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[models.QuizItemStat.quiz_id, models.QuizItemStat.question_id],
+                set_={
+                    **{c: stmt.excluded[c] for c in rows[0] if c not in ("quiz_id", "question_id")},
+                    "updated_at": func.now(),
+                },
+            )
+            await db.execute(stmt)
+
+        state_values = {
+            "quiz_id": quiz.id,
+            "quiz_version": quiz.version,
+            "attempts_count": n,
+            "last_completed_at": watermark[0] if watermark else None,
+            "last_attempt_id": watermark[1] if watermark else None,
+        }
+        stmt = insert(models.QuizAnalyticsState).values(**state_values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.QuizAnalyticsState.quiz_id],
+            set_={**{c: stmt.excluded[c] for c in state_values if c != "quiz_id"}, "updated_at": func.now()},
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+    logger.info("Item analytics for quiz %s: +%d attempts (%d total)", quiz_id, new_attempts, n)
+    return {"quiz_id": str(quiz_id), "status": "updated", "new_attempts": new_attempts, "attempts": n}
+
+
+async def refresh_all_quiz_analytics() -> dict:
+    """Run the incremental refresh for every quiz (no-op for quizzes without new attempts)."""
+    async with WorkerSessionLocal() as db:
+        quiz_ids = (await db.execute(select(models.Quiz.id))).scalars().all()
+    updated = 0
+    for quiz_id in quiz_ids:
+        result = await refresh_quiz_analytics(quiz_id)
+        updated += result.get("status") == "updated"
+    return {"quizzes": len(quiz_ids), "updated": updated}
@@ -0,0 +1,484 @@
+"""Quiz and course leaderboards.
+
+Boards are sorted sets of ``user_id -> score``:
+
+- ``quiz:<quiz_id>`` holds each user's best score on the quiz
+- ``course:<course_id>`` holds the sum of each user's best quiz scores in the
+  course; its ``<user_id>:<quiz_id>`` parts (the bests being summed) are kept
+  next to it, so ``add_best`` raises a part and adds the improvement to the
+  total in one atomic step
+
+Boards are loaded from ``quiz_attempts`` on first use. ``load`` is
+set-if-absent: concurrent loaders race, one snapshot wins and the others
+are discarded, and attempts are applied only after a board is loaded, so
+every attempt is counted exactly once (by the snapshot or by its update).
+
+Updates happen on every graded attempt and reads (top N, a user's rank) are
+O(log n + N). Production uses Redis sorted sets; ``MemoryLeaderboardStore``
+implements the same operations on an indexable skiplist for tests and
+single-node deployments. Select with ``settings.LEADERBOARD_BACKEND``.
+
+Ordering matches Redis ``ZREVRANGE``: higher score first, ties by member
+descending. Ranks returned by the stores are 0-based.
+"""
+import logging
+import random
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..core.config import settings
+from ..core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def quiz_board(quiz_id) -> str:
+    return f"quiz:{quiz_id}"
+
+
+def course_board(course_id) -> str:
+    return f"course:{course_id}"
+
+
+def course_part(user_id, quiz_id) -> str:
+    return f"{user_id}:{quiz_id}"
+
+
+class _Node:
+    __slots__ = ("key", "forward", "span", "backward")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span: List[int] = [0] * level
+        self.backward: Optional["_Node"] = None
+
+
+class SkipList:
+    """Indexable skiplist of unique, ordered keys with O(log n) rank queries.
+
+    Each forward link records how many level-0 nodes it skips (its span), so
+    the rank of a key is the sum of spans along the search path.
+    """
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def insert(self, key) -> None:
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = rank[i + 1] if i + 1 < self._level else 0
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._size
+            self._level = level
+
+        new = _Node(key, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+        new.backward = update[0] if update[0] is not self._head else None
+        if new.forward[0] is not None:
+            new.forward[0].backward = new
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+        target = node.forward[0]
+        if target is None or target.key != key:
+            return False
+
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        if target.forward[0] is not None:
+            target.forward[0].backward = target.backward
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def rank(self, key) -> Optional[int]:
+        """0-based ascending rank of ``key``, or None if absent."""
+        rank = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                rank += node.span[i]
+                node = node.forward[i]
+            if node is not self._head and node.key == key:
+                return rank - 1
+        return None
+
+    def _node_at(self, index: int) -> Optional[_Node]:
+        """Node at 0-based ascending position ``index``."""
+        if index < 0 or index >= self._size:
+            return None
+        traversed = 0
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and traversed + node.span[i] <= index + 1:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == index + 1:
+                return node
+        return None
+
+    def iter_desc(self, start: int, count: int):
+        """Yield up to ``count`` keys in descending order, skipping the first ``start``."""
+        node = self._node_at(self._size - 1 - start)
+        while node is not None and count > 0:
+            yield node.key
+            node = node.backward
+            count -= 1
+
+
+class MemoryLeaderboardStore:
+    """In-process sorted sets backed by ``SkipList`` (keys are ``(score, member)``)."""
+
+    def __init__(self):
+        self._lists: Dict[str, SkipList] = {}
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._parts: Dict[str, Dict[str, float]] = {}
+        self._loaded: set = set()
+
+    def _board(self, board: str) -> Tuple[SkipList, Dict[str, float]]:
+        if board not in self._lists:
+            self._lists[board] = SkipList()
+            self._scores[board] = {}
+        return self._lists[board], self._scores[board]
+
+    def _set(self, board: str, member: str, score: float) -> None:
+        skiplist, scores = self._board(board)
+        old = scores.get(member)
+        if old is not None:
+            skiplist.remove((old, member))
+        scores[member] = score
+        skiplist.insert((score, member))
+
+    async def is_loaded(self, board: str) -> bool:
+        return board in self._loaded
+
+    # Methods below never await, so each runs atomically on the event loop
+
+    async def load(
+        self, board: str, entries: Sequence[Tuple[str, float]], parts: Sequence[Tuple[str, float]] = ()
+    ) -> bool:
+        """Replace ``board`` with a snapshot unless it is already loaded; returns whether it was."""
+        if board in self._loaded:
+            return False
+        self._lists.pop(board, None)
+        self._scores.pop(board, None)
+        for member, score in entries:
+            self._set(board, member, float(score))
+        self._parts[board] = {part: float(score) for part, score in parts}
+        self._loaded.add(board)
+        return True
+
+    async def record_best(self, board: str, member: str, score: float) -> None:
+        _, scores = self._board(board)
+        old = scores.get(member)
+        if old is None or score > old:
+            self._set(board, member, float(score))
+
+    async def add_best(self, board: str, member: str, part: str, score: float) -> float:
+        """Raise ``part`` to ``score`` and add the improvement to ``member``; returns it."""
+        parts = self._parts.setdefault(board, {})
+        old = parts.get(part)
+        if old is not None and old >= score:
+            return 0.0
+        parts[part] = float(score)
+        delta = float(score) - (old or 0.0)
+        _, scores = self._board(board)
+        self._set(board, member, scores.get(member, 0.0) + delta)
+        return delta
+
+    async def top(self, board: str, n: int) -> List[Tuple[str, float]]:
+        skiplist, _ = self._board(board)
+        return [(member, score) for score, member in skiplist.iter_desc(0, n)]
+
+    async def rank(self, board: str, member: str) -> Optional[Tuple[int, float]]:
+        skiplist, scores = self._board(board)
+        score = scores.get(member)
+        if score is None:
+            return None
+        return len(skiplist) - 1 - skiplist.rank((score, member)), score
+
+    async def size(self, board: str) -> int:
+        skiplist, _ = self._board(board)
+        return len(skiplist)
+
+    async def drop(self, board: str) -> None:
+        self._lists.pop(board, None)
+        self._scores.pop(board, None)
+        self._parts.pop(board, None)
+        self._loaded.discard(board)
+
+
+class RedisLeaderboardStore:
+    """Sorted sets in Redis, shared by all workers."""
+
+    PREFIX = "leaderboard:"
+    LOADED_KEY = "leaderboard:loaded"
+    # Rows per ZADD while staging a snapshot
+    LOAD_BATCH = 5000
+
+    # KEYS: loaded set, board, staged board, parts, staged parts; ARGV: board name
+    _LOAD = """
+    if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+        redis.call('DEL', KEYS[3], KEYS[5])
+        return 0
+    end
+    for i = 2, 4, 2 do
+        if redis.call('EXISTS', KEYS[i + 1]) == 1 then
+            redis.call('RENAME', KEYS[i + 1], KEYS[i])
+        else
+            redis.call('DEL', KEYS[i])
+        end
+    end
+    redis.call('SADD', KEYS[1], ARGV[1])
+    return 1
+    """
+    # KEYS: board, parts; ARGV: member, part, score
+    _ADD_BEST = """
+    local old = redis.call('ZSCORE', KEYS[2], ARGV[2])
+    local new = tonumber(ARGV[3])
+    if old and tonumber(old) >= new then
+        return '0'
+    end
+    redis.call('ZADD', KEYS[2], new, ARGV[2])
+    local delta = new - (old and tonumber(old) or 0)
+    redis.call('ZINCRBY', KEYS[1], delta, ARGV[1])
+    return tostring(delta)
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_redis()
+
+    def _key(self, board: str) -> str:
+        return self.PREFIX + board
+
+    def _parts_key(self, board: str) -> str:
+        return self.PREFIX + board + ":parts"
+
+    async def is_loaded(self, board: str) -> bool:
+        return bool(await self.client.sismember(self.LOADED_KEY, board))
+
+    async def _stage(self, key: str, entries: Sequence[Tuple[str, float]]) -> None:
+        for start in range(0, len(entries), self.LOAD_BATCH):
+            batch = entries[start:start + self.LOAD_BATCH]
+            await self.client.zadd(key, {member: float(score) for member, score in batch})
+
+    async def load(
+        self, board: str, entries: Sequence[Tuple[str, float]], parts: Sequence[Tuple[str, float]] = ()
+    ) -> bool:
+        """Stage a snapshot under temporary keys, then swap it in unless another loader won."""
+        token = uuid.uuid4().hex
+        staged, staged_parts = f"{self._key(board)}:load:{token}", f"{self._parts_key(board)}:load:{token}"
+        try:
+            await self._stage(staged, entries)
+            await self._stage(staged_parts, parts)
+            loaded = await self.client.eval(
+                self._LOAD, 5,
+                self.LOADED_KEY, self._key(board), staged, self._parts_key(board), staged_parts, board,
+            )
+        except BaseException:
+            await self.client.delete(staged, staged_parts)
+            raise
+        return bool(loaded)
+
+    async def record_best(self, board: str, member: str, score: float) -> None:
+        await self.client.zadd(self._key(board), {member: float(score)}, gt=True)
+
+    async def add_best(self, board: str, member: str, part: str, score: float) -> float:
+        delta = await self.client.eval(
+            self._ADD_BEST, 2, self._key(board), self._parts_key(board), member, part, float(score)
+        )
+        return float(delta)
+
+    async def top(self, board: str, n: int) -> List[Tuple[str, float]]:
+        rows = await self.client.zrevrange(self._key(board), 0, n - 1, withscores=True)
+        return [(member, float(score)) for member, score in rows]
+
+    async def rank(self, board: str, member: str) -> Optional[Tuple[int, float]]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(self._key(board), member)
+            pipe.zscore(self._key(board), member)
+            rank, score = await pipe.execute()
+        if rank is None:
+            return None
+        return int(rank), float(score)
+
+    async def size(self, board: str) -> int:
+        return int(await self.client.zcard(self._key(board)))
+
+    async def drop(self, board: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(board), self._parts_key(board))
+            pipe.srem(self.LOADED_KEY, board)
+            await pipe.execute()
+
+
+_store = None
+
+
+def get_store():
+    """Process-wide leaderboard store selected by ``settings.LEADERBOARD_BACKEND``."""
+    global _store
+    if _store is None:
+        if settings.LEADERBOARD_BACKEND == "redis":
+            _store = RedisLeaderboardStore()
+        else:
+            _store = MemoryLeaderboardStore()
+    return _store
+
+
+async def _best_scores_query(db: AsyncSession, quiz_ids) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+    """Each user's summed best scores over ``quiz_ids`` and the per-quiz bests summed.
+
+    Returns ``(totals, parts)`` with parts keyed by ``course_part``.
+    """
+    q = select(
+        models.QuizAttempt.user_id,
+        models.QuizAttempt.quiz_id,
+        func.max(models.QuizAttempt.score).label("best"),
+    ).where(
+        models.QuizAttempt.quiz_id.in_(quiz_ids),
+        models.QuizAttempt.score.isnot(None),
+    ).group_by(models.QuizAttempt.user_id, models.QuizAttempt.quiz_id)
+    totals: Dict[str, float] = {}
+    parts = []
+    for user_id, quiz_id, best in (await db.execute(q)).all():
+        totals[str(user_id)] = totals.get(str(user_id), 0.0) + float(best)
+        parts.append((course_part(user_id, quiz_id), float(best)))
+    return list(totals.items()), parts
+
+
+async def ensure_quiz_board(db: AsyncSession, quiz_id) -> str:
+    """Load a quiz board from quiz_attempts the first time it is used."""
+    store = get_store()
+    board = quiz_board(quiz_id)
+    if not await store.is_loaded(board):
+        totals, _ = await _best_scores_query(db, [quiz_id])
+        await store.load(board, totals)
+    return board
+
+
+async def ensure_course_board(db: AsyncSession, course_id) -> str:
+    """Load a course board and its per-quiz parts from quiz_attempts the first time it is used."""
+    store = get_store()
+    board = course_board(course_id)
+    if not await store.is_loaded(board):
+        quiz_ids = select(models.Quiz.id).join(
+            models.Lesson, models.Lesson.id == models.Quiz.lesson_id
+        ).where(models.Lesson.course_id == course_id)
+        totals, parts = await _best_scores_query(db, quiz_ids)
+        await store.load(board, totals, parts)
+    return board
+
+
+async def record_attempt(db: AsyncSession, quiz: models.Quiz, attempt: models.QuizAttempt) -> None:
+    """Apply a committed, graded attempt to the quiz and course boards.
+
+    Both updates are idempotent maxima, so an attempt already in a freshly
+    loaded snapshot changes nothing and concurrent attempts of the same
+    user and quiz leave the course total at exactly the best score.
+    """
+    if attempt.score is None:
+        return
+    store = get_store()
+    member = str(attempt.user_id)
+    course_q = select(models.Lesson.course_id).where(models.Lesson.id == quiz.lesson_id)
+    course_id = (await db.execute(course_q)).scalar_one_or_none()
+
+    board = await ensure_quiz_board(db, quiz.id)
+    await store.record_best(board, member, attempt.score)
+    if course_id is not None:
+        board = await ensure_course_board(db, course_id)
+        await store.add_best(board, member, course_part(attempt.user_id, quiz.id), attempt.score)
+
+
+async def invalidate_quiz(db: AsyncSession, quiz_id) -> None:
+    """Drop the quiz and course boards after scores were rewritten (re-grade).
+
+    They are reloaded from quiz_attempts on next use.
+    """
+    store = get_store()
+    course_q = select(models.Lesson.course_id).join(
+        models.Quiz, models.Quiz.lesson_id == models.Lesson.id
+    ).where(models.Quiz.id == quiz_id)
+    course_id = (await db.execute(course_q)).scalar_one_or_none()
+    await store.drop(quiz_board(quiz_id))
+    if course_id is not None:
+        await store.drop(course_board(course_id))
+
+
+async def snapshot(db: AsyncSession, board: str, user_id, limit: int) -> dict:
+    """Top ``limit`` entries plus the caller's own rank, with display names."""
+    store = get_store()
+    top = await store.top(board, limit)
+    mine = await store.rank(board, str(user_id))
+
+    ids = {member for member, _ in top}
+    if mine is not None:
+        ids.add(str(user_id))
+    names = {}
+    if ids:
+        res = await db.execute(
+            select(models.Profile.user_id, models.Profile.display_name).where(models.Profile.user_id.in_(ids))
+        )
+        names = {str(uid): name for uid, name in res.all()}
+
+    entries = [
+        {"rank": i + 1, "user_id": member, "display_name": names.get(member), "score": score}
+        for i, (member, score) in enumerate(top)
+    ]
+    me = None
+    if mine is not None:
+        me = {"rank": mine[0] + 1, "user_id": str(user_id), "display_name": names.get(str(user_id)), "score": mine[1]}
+    return {"board": board, "size": await store.size(board), "entries": entries, "me": me}
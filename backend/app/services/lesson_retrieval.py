@@ -0,0 +1,217 @@
+"""Retrieval of lesson passages to ground AI tutor answers.
+
+Offline (``sync_lessons``, run by Celery):
+
+1. read ``(id, course_id, md5(title, content))`` for every lesson, so only
+   lessons whose hash changed (or that are new) have their content loaded,
+2. chunk and embed those lessons (``embeddings``), tombstone their old rows
+   and append the new ones to the ``VectorIndex`` under ``AI_INDEX_DIR``,
+3. drop rows of deleted lessons, compact when many rows are dead, retrain
+   the IVF clusters when the index has grown, and save a new version.
+
+Online (``retrieve``): each process keeps a read-only view of the index,
+reloaded when the sync job saves a new version, and answers top-k queries
+(optionally limited to one course) without touching the database.
+"""
+import fcntl
+import json
+import logging
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import String, cast, func, select
+
+from .. import models
+from ..core.config import settings
+from ..db.session import WorkerSessionLocal
+from .ai_client import count_tokens
+from .embeddings import HashingVectorizer, chunk_text
+from .vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Identifies how vectors were produced; a different value rebuilds the index
+EMBEDDER = "hashing-uni-bigram-v1"
+FETCH_BATCH = 200
+# Compact once this share of rows are tombstones
+COMPACT_DEAD_FRACTION = 0.3
+# Seconds between checks for a newer index version in a reading process
+RELOAD_INTERVAL = 2.0
+
+_vectorizer: Optional[HashingVectorizer] = None
+_reader: Optional[VectorIndex] = None
+_reader_checked = 0.0
+
+
+def vectorizer() -> HashingVectorizer:
+    global _vectorizer
+    if _vectorizer is None:
+        _vectorizer = HashingVectorizer(settings.AI_EMBEDDING_DIM)
+    return _vectorizer
+
+
+def index_dir() -> Path:
+    return Path(settings.AI_INDEX_DIR)
+
+
+@contextmanager
+def _writer_lock():
+    """One sync at a time per index directory."""
+    index_dir().mkdir(parents=True, exist_ok=True)
+    with open(index_dir() / ".lock", "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _open_writer() -> VectorIndex:
+    try:
+        index = VectorIndex.open(index_dir(), settings.AI_EMBEDDING_DIM, writable=True)
+    except ValueError:
+        index = None
+    if index is None or (index.extra and index.extra.get("embedder") != EMBEDDER):
+        logger.warning("Rebuilding lesson index at %s (embedding settings changed)", index_dir())
+        for entry in index_dir().iterdir():
+            if entry.name != ".lock":
+                shutil.rmtree(entry) if entry.is_dir() else entry.unlink()
+        index = VectorIndex.open(index_dir(), settings.AI_EMBEDDING_DIM, writable=True)
+    return index
+
+
+def _passages(lesson) -> List[str]:
+    return chunk_text(lesson.content or "")
+
+
+async def sync_lessons() -> dict:
+    """Bring the lesson index up to date with the ``lessons`` table."""
+    started = time.perf_counter()
+    async with WorkerSessionLocal() as db:
+        # A lesson moved to another course must be re-added under that course's group
+        fingerprint = func.md5(
+            func.coalesce(cast(models.Lesson.course_id, String), "") + "\n"
+            + func.coalesce(models.Lesson.title, "") + "\n" + func.coalesce(models.Lesson.content, "")
+        )
+        res = await db.execute(select(models.Lesson.id, models.Lesson.course_id, fingerprint))
+        current = {str(lesson_id): (str(course_id), digest) for lesson_id, course_id, digest in res.all()}
+
+        with _writer_lock():
+            index = _open_writer()
+            extra = index.extra or {"embedder": EMBEDDER, "lessons": {}, "courses": {}}
+            lessons: Dict[str, dict] = extra["lessons"]
+            courses: Dict[str, int] = extra["courses"]
+
+            removed = [lesson_id for lesson_id in lessons if lesson_id not in current]
+            for lesson_id in removed:
+                index.remove(lessons.pop(lesson_id)["rows"])
+
+            changed = [lesson_id for lesson_id, (_, digest) in current.items()
+                       if lessons.get(lesson_id, {}).get("hash") != digest]
+            for start in range(0, len(changed), FETCH_BATCH):
+                batch = changed[start:start + FETCH_BATCH]
+                q = select(models.Lesson.id, models.Lesson.course_id, models.Lesson.title, models.Lesson.content).where(
+                    models.Lesson.id.in_(batch)
+                )
+                for lesson in (await db.execute(q)).all():
+                    lesson_id, course_id = str(lesson.id), str(lesson.course_id)
+                    if lesson_id in lessons:
+                        index.remove(lessons[lesson_id]["rows"])
+                    group = courses.setdefault(course_id, len(courses))
+                    passages = _passages(lesson)
+                    # The title is embedded with each passage; stored texts keep it for citations
+                    vectors = vectorizer().embed_batch(f"{lesson.title}\n{p}" for p in passages)
+                    texts = [json.dumps({"lesson_id": lesson_id, "title": lesson.title, "text": p}) for p in passages]
+                    rows = index.add(vectors, texts, group)
+                    lessons[lesson_id] = {"hash": current[lesson_id][1], "course": course_id, "rows": rows.tolist()}
+
+            compacted = False
+            if index.count and 1 - index.live_count / index.count > COMPACT_DEAD_FRACTION:
+                remap = index.compact()
+                for entry in lessons.values():
+                    entry["rows"] = [int(remap[row]) for row in entry["rows"]]
+                compacted = True
+            trained = index.needs_training()
+            if trained:
+                index.train()
+            if removed or changed or compacted or trained or not index.version:
+                index.save(extra)
+
+    result = {
+        "lessons": len(current),
+        "changed": len(changed),
+        "removed": len(removed),
+        "rows": index.live_count,
+        "compacted": compacted,
+        "trained": trained,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info("Lesson index sync: %s", result)
+    return result
+
+
+def get_reader() -> Optional[VectorIndex]:
+    """This process's read-only view of the index (None until the first sync)."""
+    global _reader, _reader_checked
+    now = time.monotonic()
+    if _reader is not None and now - _reader_checked < RELOAD_INTERVAL:
+        return _reader
+    _reader_checked = now
+    if _reader is None:
+        if not (index_dir() / "manifest.json").exists():
+            return None
+        try:
+            _reader = VectorIndex.open(index_dir(), settings.AI_EMBEDDING_DIM)
+        except (ValueError, FileNotFoundError):
+            logger.warning("Lesson index at %s is not readable yet", index_dir())
+            return None
+    else:
+        _reader.reload_if_changed()
+    return _reader
+
+
+def retrieve(
+    query: str,
+    course_id=None,
+    lesson_id=None,
+    k: Optional[int] = None,
+) -> List[dict]:
+    """Best lesson passages for ``query`` as ``{lesson_id, title, text, score}``.
+
+    Limited to the course of ``lesson_id`` / ``course_id`` when given.
+    """
+    index = get_reader()
+    if index is None or not index.count or not query.strip():
+        return []
+    extra = index.extra
+    if lesson_id is not None and course_id is None:
+        course_id = extra["lessons"].get(str(lesson_id), {}).get("course")
+    group = None
+    if course_id is not None:
+        group = extra["courses"].get(str(course_id))
+        if group is None:
+            return []
+    hits = index.search(
+        vectorizer().embed(query), k=k or settings.AI_RETRIEVAL_K, nprobe=settings.AI_RETRIEVAL_NPROBE, group=group
+    )
+    return [
+        {**json.loads(index.text(row)), "score": round(score, 4)}
+        for row, score in hits if score >= settings.AI_RETRIEVAL_MIN_SCORE
+    ]
+
+
+def context_block(passages: List[dict], max_tokens: int) -> Optional[str]:
+    """System-prompt text citing ``passages``, best first, within ``max_tokens``."""
+    lines = ["Relevant lesson material (cite the lesson title when you use it):"]
+    used = count_tokens(lines[0])
+    for i, passage in enumerate(passages, 1):
+        line = f"[{i}] {passage['title']}: {passage['text']}"
+        cost = count_tokens(line)
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if len(lines) > 1 else None
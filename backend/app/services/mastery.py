@@ -0,0 +1,154 @@
+"""Per-topic mastery via Bayesian Knowledge Tracing (BKT).
+
+Each (user, topic) pair keeps a single probability that the skill is
+mastered. A graded answer updates it in O(1):
+
+1. condition on the observation, allowing for slips and guesses::
+
+       correct:   P(L | obs) = P(L)(1 - S) / (P(L)(1 - S) + (1 - P(L)) G)
+       incorrect: P(L | obs) = P(L) S / (P(L) S + (1 - P(L))(1 - G))
+
+2. apply the chance of learning from the opportunity::
+
+       P(L') = P(L | obs) + (1 - P(L | obs)) T
+
+Topics come from the quiz lesson's ``lesson_metadata["topic"]`` (falling back
+to ``"subject"`` when missing or blank), trimmed; ``lesson_topic`` and
+``lesson_topic_sql`` apply the same rule in Python and SQL. Readers get the
+current estimates from ``topic_mastery`` in one query instead of replaying
+attempt history.
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select, true
+from sqlalchemy import update as sa_update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from .. import models
+from . import grading
+
+P_INIT = 0.2
+P_LEARN = 0.15
+P_GUESS = 0.2
+P_SLIP = 0.1
+MASTERED = 0.95
+TOPIC_FIELDS = ("topic", "subject")
+# Characters str.strip() removes that btrim() should too
+_WHITESPACE = " \t\n\r\f\v"
+
+
+def update(p: float, correct: bool) -> float:
+    """One BKT step for a single observed answer."""
+    if correct:
+        known = p * (1 - P_SLIP)
+        posterior = known / (known + (1 - p) * P_GUESS)
+    else:
+        known = p * P_SLIP
+        posterior = known / (known + (1 - p) * (1 - P_GUESS))
+    return posterior + (1 - posterior) * P_LEARN
+
+
+def update_many(p: float, observations: Iterable[bool]) -> float:
+    for correct in observations:
+        p = update(p, bool(correct))
+    return p
+
+
+def lesson_topic(metadata: Optional[dict]) -> Optional[str]:
+    """First non-blank of the lesson's topic and subject, trimmed."""
+    metadata = metadata or {}
+    for field in TOPIC_FIELDS:
+        value = metadata.get(field)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def lesson_topic_sql(metadata):
+    """``lesson_topic`` as a SQL expression over a ``lesson_metadata`` column."""
+    return func.coalesce(*(
+        func.nullif(func.btrim(metadata[field].as_string(), _WHITESPACE), "") for field in TOPIC_FIELDS
+    ))
+
+
+async def record_attempt(
+    db: AsyncSession,
+    quiz: models.Quiz,
+    attempt: models.QuizAttempt,
+    key: grading.AnswerKey,
+    only_answered: bool = False,
+) -> Optional[float]:
+    """Fold a graded attempt's answers into the user's topic mastery; the caller commits."""
+    if not len(key):
+        return None
+    res = await db.execute(select(models.Lesson.lesson_metadata).where(models.Lesson.id == quiz.lesson_id))
+    topic = lesson_topic(res.scalar_one_or_none())
+    if topic is None:
+        return None
+
+    sel, num = grading.encode_batch(key, [attempt.answers])
+    correct = grading.correctness(key, sel, num)[0]
+    if only_answered:
+        correct = correct[grading.answered(key, sel, num)[0]]
+    if not len(correct):
+        return None
+
+    # Make sure the row exists, then lock it so concurrent submissions
+    # (including a user's first ones for the topic) apply their updates in turn
+    mastery = models.TopicMastery
+    await db.execute(
+        insert(mastery)
+        .values(user_id=attempt.user_id, topic=topic, p_mastery=P_INIT, answers=0, correct=0)
+        .on_conflict_do_nothing(index_elements=[mastery.user_id, mastery.topic])
+    )
+    this_row = (mastery.user_id == attempt.user_id, mastery.topic == topic)
+    current = (await db.execute(select(mastery.p_mastery).where(*this_row).with_for_update())).scalar_one()
+    p = update_many(current, correct)
+    await db.execute(
+        sa_update(mastery)
+        .where(*this_row)
+        .values(
+            p_mastery=p,
+            answers=mastery.answers + len(correct),
+            correct=mastery.correct + int(np.count_nonzero(correct)),
+            updated_at=func.now(),
+        )
+    )
+    return p
+
+
+async def list_mastery(db: AsyncSession, user_id) -> List[models.TopicMastery]:
+    q = select(models.TopicMastery).where(
+        models.TopicMastery.user_id == user_id
+    ).order_by(models.TopicMastery.p_mastery.asc(), models.TopicMastery.topic)
+    return (await db.execute(q)).scalars().all()
+
+
+async def weakest_topic(db: AsyncSession, user_id):
+    """The user's least-mastered, not yet mastered topic with a lesson to study.
+
+    Returns a row ``(topic, p_mastery, lesson_id, course_id)`` or None, in one query.
+    """
+    lesson = select(models.Lesson.id, models.Lesson.course_id).where(
+        lesson_topic_sql(models.Lesson.lesson_metadata) == models.TopicMastery.topic
+    ).order_by(models.Lesson.order.asc().nullslast(), models.Lesson.id).limit(1).lateral()
+    q = select(
+        models.TopicMastery.topic,
+        models.TopicMastery.p_mastery,
+        lesson.c.id.label("lesson_id"),
+        lesson.c.course_id.label("course_id"),
+    ).select_from(models.TopicMastery).outerjoin(lesson, true()).where(
+        models.TopicMastery.user_id == user_id,
+        models.TopicMastery.p_mastery < MASTERED,
+    ).order_by(models.TopicMastery.p_mastery.asc()).limit(1)
+    return (await db.execute(q)).first()
+
+
+def recommendation_text(topic: str, p_mastery: float) -> str:
+    percent = int(round(p_mastery * 100))
+    if p_mastery < 0.4:
+        return f"Let's strengthen {topic}: review the basics and try a few practice questions ({percent}% mastery)."
+    return f"You're close on {topic} ({percent}% mastery). A little more practice will lock it in."
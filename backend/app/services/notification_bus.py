@@ -0,0 +1,141 @@
+"""Fan-out of new notifications to connected ``/api/notifications/stream`` clients.
+
+Every worker keeps the queues of its own connected clients, keyed by user.
+Publishing goes through a broker so that a notification created anywhere
+(another API worker, a Celery job) reaches the worker holding the user's
+connection:
+
+- ``MemoryBroker`` delivers straight to local queues (tests, single process)
+- ``RedisBroker`` publishes on ``notifications:<user_id>``; each worker keeps
+  one pub/sub connection and subscribes to a user's channel only while that
+  user has a local stream open
+
+Select with ``settings.NOTIFICATION_BROKER``.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from ..core.config import settings
+from ..core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Per-connection buffer; a client that falls this far behind misses messages
+# and catches up from the list endpoint (or Last-Event-ID) on reconnect.
+QUEUE_SIZE = 100
+
+
+class StreamLimitReached(Exception):
+    """Raised when this worker already serves the maximum number of streams."""
+
+
+class MemoryBroker:
+    """Local fan-out of messages to the queues of connected clients."""
+
+    def __init__(self, max_connections: Optional[int] = None):
+        self.max_connections = max_connections or settings.NOTIFICATION_STREAM_MAX_CONNECTIONS
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self._connections = 0
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    def deliver(self, user_id: str, message: str) -> int:
+        """Put ``message`` on every local queue of ``user_id``; returns how many got it."""
+        delivered = 0
+        for queue in self._queues.get(user_id, ()):
+            try:
+                queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                logger.warning("Dropping notification for slow stream of user %s", user_id)
+        return delivered
+
+    async def publish(self, user_id, message: str) -> None:
+        self.deliver(str(user_id), message)
+
+    async def _on_first_subscriber(self, user_id: str) -> None:
+        pass
+
+    async def _on_last_unsubscribe(self, user_id: str) -> None:
+        pass
+
+    @asynccontextmanager
+    async def subscribe(self, user_id) -> AsyncIterator[asyncio.Queue]:
+        """Register a queue for ``user_id`` for the duration of a stream."""
+        if self._connections >= self.max_connections:
+            raise StreamLimitReached()
+        user_id = str(user_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._connections += 1
+        queues = self._queues.setdefault(user_id, set())
+        queues.add(queue)
+        try:
+            if len(queues) == 1:
+                await self._on_first_subscriber(user_id)
+            yield queue
+        finally:
+            self._connections -= 1
+            queues.discard(queue)
+            if not queues:
+                self._queues.pop(user_id, None)
+                await self._on_last_unsubscribe(user_id)
+
+
+class RedisBroker(MemoryBroker):
+    """Cross-worker delivery over Redis pub/sub."""
+
+    PREFIX = "notifications:"
+
+    def __init__(self, max_connections: Optional[int] = None):
+        super().__init__(max_connections)
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    def _channel(self, user_id: str) -> str:
+        return self.PREFIX + user_id
+
+    async def publish(self, user_id, message: str) -> None:
+        await get_redis().publish(self._channel(str(user_id)), message)
+
+    async def _on_first_subscriber(self, user_id: str) -> None:
+        if self._pubsub is None:
+            self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._channel(user_id))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _on_last_unsubscribe(self, user_id: str) -> None:
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self._channel(user_id))
+
+    async def _read(self) -> None:
+        """Dispatch pub/sub messages to local queues until nobody is subscribed."""
+        while self._queues:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") == "message":
+                        self.deliver(message["channel"][len(self.PREFIX):], message["data"])
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification pub/sub reader failed; reconnecting")
+                await asyncio.sleep(1)
+                self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                if self._queues:
+                    await self._pubsub.subscribe(*(self._channel(user_id) for user_id in self._queues))
+
+
+_broker: Optional[MemoryBroker] = None
+
+
+def get_broker() -> MemoryBroker:
+    """Process-wide broker selected by ``settings.NOTIFICATION_BROKER``."""
+    global _broker
+    if _broker is None:
+        _broker = RedisBroker() if settings.NOTIFICATION_BROKER == "redis" else MemoryBroker()
+    return _broker
@@ -0,0 +1,149 @@
+"""Course-wide notification fan-out.
+
+``update_course`` queues a ``NotificationFanout`` run and a Celery job; the
+request itself never touches recipients. The job (``fan_out``):
+
+1. streams the course's learners (users with progress on any of its
+   lessons) in ``user_id`` order through a server-side cursor,
+2. drops users whose ``Profile.preferences`` opt out of the type,
+3. writes each batch of notifications with PostgreSQL ``COPY`` (asyncpg
+   ``copy_records_to_table``) and bumps the unread counters, committing the
+   batch together with the run's ``last_user_id`` checkpoint,
+4. pushes the new rows to any open notification streams.
+
+Because a batch and its checkpoint commit atomically, a retried job resumes
+after the last committed recipient and never notifies anyone twice.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..db.session import WorkerSessionLocal
+from . import notification_service
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+COPY_COLUMNS = ("id", "user_id", "type", "payload", "is_read", "created_at")
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def course_update_payload(course: models.Course) -> dict:
+    return {
+        "title": f"{course.title} was updated",
+        "description": "New content is available in a course you are taking.",
+        "course_id": str(course.id),
+    }
+
+
+async def create_run(db: AsyncSession, course: models.Course, type: str = "course_updates",
+                     payload: Optional[dict] = None) -> models.NotificationFanout:
+    """Queue a fan-out for ``course``; the caller commits and then enqueues the job."""
+    run = models.NotificationFanout(
+        course_id=course.id, type=type, payload=payload or course_update_payload(course), status="pending"
+    )
+    db.add(run)
+    await db.flush()
+    return run
+
+
+def recipients_query(course_id, after=None):
+    """Distinct learners of a course with their preferences, in ``user_id`` order."""
+    learners = select(models.Progress.user_id).join(
+        models.Lesson, models.Lesson.id == models.Progress.lesson_id
+    ).where(models.Lesson.course_id == course_id)
+    if after is not None:
+        learners = learners.where(models.Progress.user_id > after)
+    learners = learners.distinct().subquery()
+    return select(learners.c.user_id, models.Profile.preferences).outerjoin(
+        models.Profile, models.Profile.user_id == learners.c.user_id
+    ).order_by(learners.c.user_id)
+
+
+async def _copy_notifications(db: AsyncSession, records: list) -> None:
+    """Bulk-insert notification tuples with COPY on the session's connection."""
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        models.Notification.__tablename__, records=records, columns=list(COPY_COLUMNS)
+    )
+
+
+async def _set_run(db: AsyncSession, run_id, **fields) -> None:
+    await db.execute(
+        update(models.NotificationFanout).where(models.NotificationFanout.id == run_id).values(**fields)
+    )
+
+
+async def fan_out(run_id, batch_size: int = BATCH_SIZE, on_progress: Optional[ProgressCallback] = None) -> dict:
+    """Deliver a queued fan-out run, resuming from its checkpoint."""
+    async with WorkerSessionLocal() as db:
+        run = await db.get(models.NotificationFanout, run_id)
+        if run is None:
+            return {"run_id": str(run_id), "status": "missing"}
+        if run.status == "completed":
+            return {"run_id": str(run.id), "status": run.status, "sent": run.sent}
+        course_id, type, payload = run.course_id, run.type, dict(run.payload or {})
+        sent, skipped, checkpoint = run.sent, run.skipped, run.last_user_id
+        await _set_run(
+            db, run.id, status="running", error=None,
+            started_at=func.coalesce(models.NotificationFanout.started_at, func.now()),
+        )
+        await db.commit()
+
+    payload_json = json.dumps(payload)
+    started = time.monotonic()
+    resumed_sent = sent
+    try:
+        # The reader keeps the server-side cursor open; the writer commits per batch
+        async with WorkerSessionLocal() as reader, WorkerSessionLocal() as writer:
+            stream = await reader.stream(recipients_query(course_id, checkpoint).execution_options(yield_per=batch_size))
+            async for chunk in stream.partitions(batch_size):
+                now = datetime.now(timezone.utc)
+                records = [
+                    (uuid.uuid4(), row.user_id, type, payload_json, False, now)
+                    for row in chunk if notification_service.allows(row.preferences, type)
+                ]
+                if records:
+                    await _copy_notifications(writer, records)
+                    await notification_service.increment_unread_many(writer, [r[1] for r in records])
+                sent += len(records)
+                skipped += len(chunk) - len(records)
+                await _set_run(writer, run_id, sent=sent, skipped=skipped, last_user_id=chunk[-1].user_id)
+                await writer.commit()
+
+                await notification_service.publish(
+                    models.Notification(id=r[0], user_id=r[1], type=type, payload=payload, is_read=False, created_at=now)
+                    for r in records
+                )
+                if on_progress:
+                    on_progress(sent, skipped)
+    except Exception as exc:
+        async with WorkerSessionLocal() as db:
+            await _set_run(db, run_id, status="failed", error=str(exc)[:2000])
+            await db.commit()
+        raise
+
+    elapsed = time.monotonic() - started
+    rate = (sent - resumed_sent) / elapsed if elapsed > 0 else 0.0
+    async with WorkerSessionLocal() as db:
+        await _set_run(db, run_id, status="completed", rate=round(rate, 1), finished_at=func.now())
+        await db.commit()
+
+    logger.info("Fan-out %s for course %s: %d sent, %d skipped (%.0f/s)", run_id, course_id, sent, skipped, rate)
+    return {
+        "run_id": str(run_id),
+        "status": "completed",
+        "sent": sent,
+        "skipped": skipped,
+        "notifications_per_second": round(rate, 1),
+    }
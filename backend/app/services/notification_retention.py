@@ -0,0 +1,240 @@
+"""Notification partition maintenance, retention and digest compaction.
+
+``notifications`` is range-partitioned by ``created_at`` month
+(``notifications_pYYYYMM``, see migration 013). Two periodic jobs keep the
+hot working set small:
+
+- ``maintain_partitions`` creates upcoming months ahead of time and drops
+  months older than the retention period. Unread notifications in a month
+  about to be dropped are first compacted into one digest per (user, type)
+  in the current month, so nothing unread silently disappears. The month is
+  then detached with ``DETACH PARTITION ... CONCURRENTLY`` (PostgreSQL 14+),
+  which does not block reads and writes of ``notifications``, and dropped.
+- ``compact_digests`` collapses recent bursts of unread same-type
+  notifications (e.g. many achievement unlocks) into a single digest row.
+
+Digest rows are ordinary notifications whose payload carries
+``{"digest": true, "count": n, "items": [...]}``. Unread counters are
+adjusted in the same statement (n rows become 1).
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.session import WorkerSessionLocal, worker_engine
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_AHEAD = 3
+RETENTION_MONTHS = 6
+
+# Burst compaction: at least DIGEST_MIN_COUNT unread notifications of one type
+# within DIGEST_WINDOW, ignoring the newest DIGEST_SETTLE so live bursts finish.
+DIGEST_MIN_COUNT = 5
+DIGEST_WINDOW = timedelta(hours=24)
+DIGEST_SETTLE = timedelta(minutes=10)
+# Payloads kept inside a digest for display
+DIGEST_ITEMS = 5
+
+_PARTITION_NAME = re.compile(r"^notifications_p(\d{4})(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"notifications_p{month:%Y%m}"
+
+
+# Collapses the (user_id, type, payload, created_at) rows of ``removed`` into
+# digests and lowers each user's unread counter by n - 1.
+_DIGEST_CTES = """
+digests AS (
+    INSERT INTO notifications (id, user_id, type, payload, is_read, created_at)
+    SELECT gen_random_uuid(), user_id, type,
+           jsonb_build_object(
+               'digest', true,
+               'count', count(*),
+               'title', count(*) || ' new ' || replace(type, '_', ' '),
+               'items', to_jsonb((array_agg(payload ORDER BY created_at DESC))[1:{items}]),
+               'first_at', min(created_at),
+               'last_at', max(created_at)
+           ),
+           false, {created_at}
+    FROM removed
+    GROUP BY user_id, type
+    RETURNING user_id, (payload->>'count')::int AS n
+),
+counted AS (
+    SELECT user_id, sum(n - 1) AS collapsed FROM digests GROUP BY user_id
+)
+UPDATE notification_counters c
+SET unread = greatest(c.unread - counted.collapsed, 0), updated_at = now()
+FROM counted
+WHERE c.user_id = counted.user_id
+RETURNING counted.collapsed
+"""
+
+
+async def list_detached(db: AsyncSession) -> List[str]:
+    """Month tables no longer attached to ``notifications`` (a drop that was interrupted)."""
+    res = await db.execute(text(
+        """
+        SELECT relname
+        FROM pg_class
+        WHERE relkind = 'r' AND relname ~ '^notifications_p[0-9]{6}$'
+          AND NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = pg_class.oid)
+        """
+    ))
+    return sorted(name for (name,) in res.all())
+
+
+async def list_partitions(db: AsyncSession) -> List[str]:
+    res = await db.execute(text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'notifications'
+        """
+    ))
+    return sorted(name for (name,) in res.all())
+
+
+async def ensure_partitions(db: AsyncSession, today: date, ahead: int = PARTITIONS_AHEAD) -> List[str]:
+    """Create partitions for the current month and ``ahead`` months after it."""
+    created = []
+    existing = set(await list_partitions(db))
+    for i in range(ahead + 1):
+        month = add_months(month_start(today), i)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF notifications "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+async def compact_partition(db: AsyncSession, name: str) -> int:
+    """Fold a partition's unread rows into current digests; the caller commits.
+
+    The rows are marked read in the same statement, so running it again
+    (after a failed detach) does not digest them twice. Returns the number
+    of notifications folded into digests.
+    """
+    res = await db.execute(text(
+        f"""
+        WITH removed AS (
+            UPDATE {name} SET is_read = true WHERE is_read = false
+            RETURNING user_id, type, payload, created_at
+        ),
+        {_DIGEST_CTES.format(items=DIGEST_ITEMS, created_at="now()")}
+        """
+    ))
+    return sum(int(collapsed) for (collapsed,) in res.all())
+
+
+async def drop_partition(name: str) -> None:
+    """Detach a partition without blocking ``notifications``, then drop it.
+
+    ``DETACH PARTITION ... CONCURRENTLY`` cannot run in a transaction block,
+    so this uses its own autocommit connection. A detach interrupted halfway
+    leaves the partition "detach pending"; it is completed with ``FINALIZE``.
+    """
+    async with worker_engine.execution_options(isolation_level="AUTOCOMMIT").connect() as conn:
+        pending = (await conn.execute(
+            text(
+                """
+                SELECT inhdetachpending
+                FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE child.relname = :name
+                """
+            ),
+            {"name": name},
+        )).scalar()
+        if pending is not None:
+            mode = "FINALIZE" if pending else "CONCURRENTLY"
+            await conn.execute(text(f"ALTER TABLE notifications DETACH PARTITION {name} {mode}"))
+        await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
+def _expired(name: str, oldest_kept: date) -> bool:
+    match = _PARTITION_NAME.match(name)
+    return bool(match) and date(int(match[1]), int(match[2]), 1) < oldest_kept
+
+
+async def maintain_partitions(
+    today: Optional[date] = None,
+    retention_months: int = RETENTION_MONTHS,
+) -> dict:
+    """Create upcoming partitions and drop those older than the retention period."""
+    today = today or datetime.now(timezone.utc).date()
+    oldest_kept = add_months(month_start(today), -retention_months)
+    expired = []
+    async with WorkerSessionLocal() as db:
+        created = await ensure_partitions(db, today)
+        await db.commit()
+        for name in await list_partitions(db):
+            if not _expired(name, oldest_kept):
+                continue
+            await compact_partition(db, name)
+            await db.commit()
+            expired.append(name)
+        # Already detached (and compacted) by an earlier run that stopped before the drop
+        stale = [name for name in await list_detached(db) if _expired(name, oldest_kept)]
+    dropped = []
+    for name in stale + expired:
+        await drop_partition(name)
+        dropped.append(name)
+    logger.info("Notification partitions: created %s, dropped %s", created, dropped)
+    return {"created": created, "dropped": dropped}
+
+
+async def compact_digests(now: Optional[datetime] = None) -> dict:
+    """Collapse recent bursts of unread same-type notifications into digests."""
+    now = now or datetime.now(timezone.utc)
+    until = now - DIGEST_SETTLE
+    since = until - DIGEST_WINDOW
+    async with WorkerSessionLocal() as db:
+        res = await db.execute(
+            text(
+                f"""
+                WITH bursts AS (
+                    SELECT user_id, type
+                    FROM notifications
+                    WHERE is_read = false AND created_at >= :since AND created_at < :until
+                      AND NOT payload ? 'digest'
+                    GROUP BY user_id, type
+                    HAVING count(*) >= :min_count
+                ),
+                removed AS (
+                    DELETE FROM notifications n
+                    USING bursts b
+                    WHERE n.user_id = b.user_id AND n.type = b.type
+                      AND n.is_read = false AND n.created_at >= :since AND n.created_at < :until
+                      AND NOT n.payload ? 'digest'
+                    RETURNING n.user_id, n.type, n.payload, n.created_at
+                ),
+                {_DIGEST_CTES.format(items=DIGEST_ITEMS, created_at="max(created_at)")}
+                """
+            ),
+            {"since": since, "until": until, "min_count": DIGEST_MIN_COUNT},
+        )
+        collapsed = sum(int(n) for (n,) in res.all())
+        await db.commit()
+    logger.info("Notification digests: %d notifications collapsed", collapsed)
+    return {"collapsed": collapsed}
@@ -0,0 +1,160 @@
+"""Creating notifications, pushing them to connected clients, and unread counts.
+
+Rows are added in the caller's transaction; ``publish`` must run after the
+commit so a client never receives a notification that is later rolled back.
+
+``notification_counters`` holds each user's unread count. It is incremented
+in the same transaction as every insert and decremented by the same
+statement that marks notifications read, so badge counts are a primary-key
+lookup.
+"""
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas
+from .notification_bus import get_broker
+
+logger = logging.getLogger(__name__)
+
+# Profile.preferences["notification_level"], lowest to highest
+NOTIFICATION_LEVELS = ("none", "low", "medium", "high")
+# Minimum level at which each (bulk) notification type is sent
+TYPE_LEVELS = {"course_updates": "medium", "reminders": "medium", "ai_insights": "low", "achievements": "low"}
+
+
+def allows(preferences: Optional[dict], type: str) -> bool:
+    """Whether a user's ``Profile.preferences`` accept notifications of ``type``.
+
+    Honors ``notification_level`` (unset means everything) and per-type
+    opt-outs such as ``{"notifications": {"course_updates": false}}``.
+    """
+    preferences = preferences or {}
+    per_type = preferences.get("notifications")
+    if per_type is False or (isinstance(per_type, dict) and per_type.get(type) is False):
+        return False
+    level = preferences.get("notification_level")
+    if level not in NOTIFICATION_LEVELS:
+        return True
+    required = TYPE_LEVELS.get(type, "low")
+    return NOTIFICATION_LEVELS.index(level) >= NOTIFICATION_LEVELS.index(required)
+
+
+def sse_frame(notification: models.Notification) -> str:
+    """Server-sent event for a notification, formatted once and shared by all streams.
+
+    ``data`` has the same shape as ``NotificationRead``; ``id`` lets a
+    reconnecting client resume with ``Last-Event-ID``.
+    """
+    data = schemas.NotificationRead.model_validate(notification, from_attributes=True).model_dump_json()
+    return f"id: {notification.id}\nevent: notification\ndata: {data}\n\n"
+
+
+async def create_notification(
+    db: AsyncSession,
+    user_id,
+    type: str,
+    payload: Optional[dict] = None,
+) -> models.Notification:
+    """Add a notification row; the caller commits and then calls ``publish``."""
+    notification = models.Notification(user_id=user_id, type=type, payload=payload or {}, is_read=False)
+    db.add(notification)
+    await db.flush()
+    await increment_unread(db, user_id)
+    return notification
+
+
+async def increment_unread(db: AsyncSession, user_id, by: int = 1) -> None:
+    """Add ``by`` to the user's unread counter (creating it); the caller commits."""
+    await increment_unread_many(db, [user_id], by)
+
+
+async def increment_unread_many(db: AsyncSession, user_ids: Sequence, by: int = 1) -> None:
+    """Add ``by`` to the unread counters of many users in one statement."""
+    if not user_ids:
+        return
+    stmt = insert(models.NotificationCounter).values([{"user_id": uid, "unread": by} for uid in user_ids])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.NotificationCounter.user_id],
+        set_={"unread": models.NotificationCounter.unread + by, "updated_at": func.now()},
+    )
+    await db.execute(stmt)
+
+
+async def unread_count(db: AsyncSession, user_id) -> int:
+    """The user's unread count; initialized from notifications on first use."""
+    counter = await db.get(models.NotificationCounter, user_id)
+    if counter is not None:
+        return counter.unread
+    q = select(func.count(models.Notification.id)).where(
+        models.Notification.user_id == user_id,
+        models.Notification.is_read.isnot(True),
+    )
+    unread = (await db.execute(q)).scalar() or 0
+    stmt = insert(models.NotificationCounter).values(user_id=user_id, unread=unread)
+    await db.execute(stmt.on_conflict_do_nothing(index_elements=[models.NotificationCounter.user_id]))
+    await db.commit()
+    return unread
+
+
+async def mark_read(
+    db: AsyncSession,
+    user_id,
+    ids: Optional[Sequence] = None,
+    before: Optional[datetime] = None,
+) -> Tuple[List, Optional[int]]:
+    """Mark notifications read and adjust the counter in one statement; the caller commits.
+
+    Selects the user's unread notifications in ``ids`` and/or created at or
+    before ``before``. Returns ``(marked_ids, unread)``; ``unread`` is None
+    if the user has no counter row yet.
+    """
+    notification = models.Notification
+    counter = models.NotificationCounter
+    conditions = [notification.user_id == user_id, notification.is_read.isnot(True)]
+    if ids is not None:
+        conditions.append(notification.id.in_(list(ids)))
+    if before is not None:
+        conditions.append(notification.created_at <= before)
+
+    # WITH marked AS (UPDATE ... RETURNING id), adjusted AS (UPDATE counters ...)
+    marked = update(notification).where(*conditions).values(is_read=True).returning(notification.id).cte("marked")
+    adjusted = (
+        update(counter)
+        .where(counter.user_id == user_id)
+        .values(
+            unread=func.greatest(counter.unread - select(func.count()).select_from(marked).scalar_subquery(), 0),
+            updated_at=func.now(),
+        )
+        .returning(counter.unread)
+        .cte("adjusted")
+    )
+    q = select(
+        select(func.array_agg(marked.c.id)).scalar_subquery(),
+        select(adjusted.c.unread).scalar_subquery(),
+    )
+    marked_ids, unread = (await db.execute(q)).one()
+    return list(marked_ids or []), unread
+
+
+async def publish(notifications: Iterable[models.Notification]) -> None:
+    """Push committed notifications to their users' open streams (best effort)."""
+    broker = get_broker()
+    for notification in notifications:
+        try:
+            await broker.publish(notification.user_id, sse_frame(notification))
+        except Exception:
+            logger.exception("Could not publish notification %s", notification.id)
+
+
+async def notify(db: AsyncSession, user_id, type: str, payload: Optional[dict] = None) -> models.Notification:
+    """Create, commit and publish a single notification."""
+    notification = await create_notification(db, user_id, type, payload)
+    await db.commit()
+    await db.refresh(notification)
+    await publish([notification])
+    return notification
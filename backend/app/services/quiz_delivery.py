@@ -0,0 +1,61 @@
+"""Quiz question delivery.
+
+A classroom opens the same quiz at the same moment, so the student-facing
+question payload is built once per quiz version, with answers stripped, and
+kept as pre-serialized JSON bytes. Requests then cost one primary-key lookup
+of ``Quiz.version`` plus a cache hit; concurrent misses build only once.
+"""
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from .. import models
+from ..core.cache import VersionedLRUCache
+from .grading import strip_answers
+
+
+@dataclass(frozen=True)
+class QuestionPayload:
+    body: bytes
+    etag: str
+
+
+_payloads = VersionedLRUCache(maxsize=1024)
+
+
+def build_payload(quiz: models.Quiz) -> QuestionPayload:
+    """Serialize a quiz (with loaded questions) into the student-facing payload."""
+    questions = sorted(quiz.questions, key=lambda question: str(question.id))
+    doc = {
+        "quiz_id": str(quiz.id),
+        "version": quiz.version,
+        "title": quiz.title,
+        "passing_score": quiz.passing_score,
+        "questions": [
+            {"id": str(question.id), **strip_answers(question.question_json)}
+            for question in questions
+        ],
+    }
+    body = json.dumps(doc, separators=(",", ":"), default=str).encode("utf-8")
+    return QuestionPayload(body=body, etag=f'"{quiz.id}-v{quiz.version}"')
+
+
+async def _load_payload(db: AsyncSession, quiz_id) -> Optional[QuestionPayload]:
+    # Quiz and all its questions in one joined query
+    q = select(models.Quiz).options(joinedload(models.Quiz.questions)).where(models.Quiz.id == quiz_id)
+    res = await db.execute(q)
+    quiz = res.unique().scalar_one_or_none()
+    return build_payload(quiz) if quiz else None
+
+
+async def get_question_payload(db: AsyncSession, quiz_id) -> Optional[QuestionPayload]:
+    """Return the cached payload for the quiz's current version, or None if missing."""
+    res = await db.execute(select(models.Quiz.version).where(models.Quiz.id == quiz_id))
+    version = res.scalar_one_or_none()
+    if version is None:
+        return None
+    return await _payloads.get_or_build(str(quiz_id), version, lambda: _load_payload(db, quiz_id))
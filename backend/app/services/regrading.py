@@ -0,0 +1,221 @@
+"""Bulk re-grading of historical quiz attempts.
+
+After an author edits ``quiz_questions`` the quiz version is bumped and a
+``QuizRegradeRun`` is queued. The Celery task in ``backend/celery_app.py`` calls
+``regrade_quiz`` which:
+
+1. compiles the current answer key once,
+2. streams completed attempts in id order through a server-side cursor,
+3. scores each chunk with ``grading.score_batch``,
+4. writes the chunk back with one ``UPDATE ... FROM (VALUES ...)`` statement and
+   commits it together with the run's checkpoint.
+
+Because the checkpoint (``last_attempt_id``) is committed with each chunk, a
+crashed or retried task resumes where it stopped instead of starting over.
+
+The bulk ``UPDATE`` only matches while ``quizzes.version`` still equals the
+run's version, and the version is re-read before each chunk commits, so a
+run overtaken by a newer edit stops as ``superseded`` without overwriting
+scores written by the newer run.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import Boolean, Integer, column, func, select, update, values
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..db.session import WorkerSessionLocal
+from . import adaptive, grading, leaderboard, score_distribution
+
+logger = logging.getLogger(__name__)
+
+# 3 bind parameters per row; asyncpg caps a statement at 32767 parameters.
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CHUNK_SIZE = 10000
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether a retry can fix ``exc``: lost connections and timeouts, not bad data."""
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc, (OperationalError, InterfaceError))
+    return isinstance(exc, (ConnectionError, asyncio.TimeoutError))
+
+
+def bulk_score_update(rows: Sequence[tuple], quiz_id, quiz_version: int):
+    """Build ``UPDATE quiz_attempts ... FROM (VALUES ...)`` for ``(id, score, passed)`` rows.
+
+    Rows are only written while the quiz is still at ``quiz_version``.
+    """
+    v = values(
+        column("id", UUID(as_uuid=True)),
+        column("score", Integer),
+        column("passed", Boolean),
+        name="v",
+    ).data(list(rows))
+    return (
+        update(models.QuizAttempt)
+        .where(
+            models.QuizAttempt.id == v.c.id,
+            models.Quiz.id == quiz_id,
+            models.Quiz.version == quiz_version,
+        )
+        .values(score=v.c.score, passed=v.c.passed)
+    )
+
+
+def score_chunk(
+    key: grading.AnswerKey,
+    passing_score: Optional[int],
+    ids: Sequence,
+    answers: Sequence,
+    bank: Optional[adaptive.ItemBank] = None,
+    served: Optional[Sequence] = None,
+) -> list:
+    """Score one chunk and return ``(id, score, passed)`` rows for ``bulk_score_update``.
+
+    Adaptive quizzes pass their item ``bank`` and the questions each attempt
+    was ``served``, and are scored by ability.
+    """
+    if bank is not None:
+        scores, _ = adaptive.score_batch(bank, answers, served)
+    else:
+        scores, _ = grading.score_batch(key, answers)
+    if passing_score is None:
+        passed = [None] * len(ids)
+    else:
+        passed = (scores >= passing_score).tolist()
+    return list(zip(ids, scores.tolist(), passed))
+
+
+async def create_run(db: AsyncSession, quiz: models.Quiz) -> models.QuizRegradeRun:
+    """Queue a re-grade for the quiz's current version; the caller commits."""
+    run = models.QuizRegradeRun(quiz_id=quiz.id, quiz_version=quiz.version, status="pending")
+    db.add(run)
+    await db.flush()
+    return run
+
+
+async def _set_run(db: AsyncSession, run_id, **fields) -> None:
+    await db.execute(
+        update(models.QuizRegradeRun).where(models.QuizRegradeRun.id == run_id).values(**fields)
+    )
+
+
+async def regrade_quiz(
+    quiz_id,
+    run_id,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+) -> dict:
+    """Re-score every completed attempt of ``quiz_id`` for ``run_id``, resuming if possible."""
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+
+    async with WorkerSessionLocal() as db:
+        run = await db.get(models.QuizRegradeRun, run_id)
+        quiz = await db.get(models.Quiz, quiz_id)
+        if run is None or quiz is None:
+            return {"run_id": str(run_id), "status": "missing"}
+        if run.status == "completed":
+            return {"run_id": str(run.id), "status": run.status, "processed": run.processed}
+        if run.quiz_version != quiz.version:
+            # A newer edit queued its own run; this one would write stale scores
+            await _set_run(db, run.id, status="superseded", finished_at=func.now())
+            await db.commit()
+            return {"run_id": str(run.id), "status": "superseded"}
+
+        run_version = run.quiz_version
+        key = await grading.load_answer_key(db, quiz.id)
+        bank = await adaptive.load_item_bank(db, quiz) if quiz.adaptive else None
+        passing_score = quiz.passing_score
+        checkpoint = run.last_attempt_id
+        processed = run.processed or 0
+        total = run.total
+        if total is None:
+            count_q = select(func.count(models.QuizAttempt.id)).where(
+                models.QuizAttempt.quiz_id == quiz.id,
+                models.QuizAttempt.completed_at.isnot(None),
+            )
+            total = (await db.execute(count_q)).scalar() or 0
+        await _set_run(
+            db, run.id, status="running", total=total, error=None,
+            started_at=func.coalesce(models.QuizRegradeRun.started_at, func.now()),
+        )
+        await db.commit()
+
+    if on_progress:
+        on_progress(processed, total)
+
+    q = select(models.QuizAttempt.id, models.QuizAttempt.answers, models.QuizAttempt.served).where(
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.completed_at.isnot(None),
+    ).order_by(models.QuizAttempt.id.asc())
+    if checkpoint is not None:
+        q = q.where(models.QuizAttempt.id > checkpoint)
+
+    started = time.monotonic()
+    resumed_from = processed
+    superseded = False
+    try:
+        # Separate sessions: the reader holds the server-side cursor open for
+        # the whole run while the writer commits each chunk independently.
+        async with WorkerSessionLocal() as reader, WorkerSessionLocal() as writer:
+            stream = await reader.stream(q.execution_options(yield_per=chunk_size))
+            async for chunk in stream.partitions(chunk_size):
+                ids = [row.id for row in chunk]
+                rows = score_chunk(
+                    key, passing_score, ids, [row.answers for row in chunk], bank, [row.served for row in chunk]
+                )
+                await writer.execute(bulk_score_update(rows, quiz_id, run_version))
+                version = (await writer.execute(
+                    select(models.Quiz.version).where(models.Quiz.id == quiz_id)
+                )).scalar()
+                if version != run_version:
+                    # Edited mid-run: the newer run re-grades everything
+                    await writer.rollback()
+                    superseded = True
+                    break
+                processed += len(rows)
+                await _set_run(writer, run_id, processed=processed, last_attempt_id=ids[-1])
+                await writer.commit()
+                if on_progress:
+                    on_progress(processed, total)
+    except Exception as exc:
+        async with WorkerSessionLocal() as db:
+            await _set_run(db, run_id, status="failed", error=str(exc)[:2000])
+            await db.commit()
+        raise
+
+    if superseded:
+        async with WorkerSessionLocal() as db:
+            await _set_run(db, run_id, status="superseded", finished_at=func.now())
+            await db.commit()
+        logger.info("Regrade run %s of quiz %s superseded after %d attempts", run_id, quiz_id, processed)
+        return {"run_id": str(run_id), "status": "superseded", "processed": processed}
+
+    async with WorkerSessionLocal() as db:
+        # Scores moved, so the percentile sketch is rebuilt from the new values
+        await score_distribution.rebuild(db, quiz_id)
+        await _set_run(db, run_id, status="completed", finished_at=func.now())
+        await db.commit()
+        try:
+            await leaderboard.invalidate_quiz(db, quiz_id)
+        except Exception:
+            logger.exception("Could not reset leaderboards for quiz %s", quiz_id)
+
+    elapsed = time.monotonic() - started
+    rate = (processed - resumed_from) / elapsed if elapsed > 0 else 0.0
+    logger.info("Regraded quiz %s: %d attempts (%.0f/s)", quiz_id, processed, rate)
+    return {
+        "run_id": str(run_id),
+        "status": "completed",
+        "processed": processed,
+        "total": total,
+        "attempts_per_second": round(rate, 1),
+    }
@@ -0,0 +1,82 @@
+"""Support for the "continue learning" pointer.
+
+Keeps two pieces of derived state so that resuming a lesson is a single lookup:
+
+- a per-course next-lesson map built from ``Lesson.order`` and cached in process
+- a per-user ``LearningResume`` row that is upserted on every progress write
+"""
+import time
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from .. import models
+
+# Course maps are tiny (one entry per lesson) and lessons are rarely reordered,
+# so a short TTL keeps workers eventually consistent without explicit fan-out.
+NEXT_LESSON_TTL_SECONDS = 300
+
+_next_lesson_maps: Dict[UUID, tuple] = {}
+
+
+def invalidate_course(course_id) -> None:
+    """Drop the cached next-lesson map for a course (call after lesson changes)."""
+    _next_lesson_maps.pop(UUID(str(course_id)), None)
+
+
+async def next_lesson_map(db: AsyncSession, course_id: UUID) -> Dict[UUID, Optional[UUID]]:
+    """Return ``{lesson_id: next_lesson_id}`` for a course, ordered by ``Lesson.order``.
+
+    Lessons without an explicit order sort last; ties are broken by id so the
+    sequence is stable across workers.
+    """
+    cached = _next_lesson_maps.get(course_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    q = select(models.Lesson.id).where(
+        models.Lesson.course_id == course_id
+    ).order_by(models.Lesson.order.asc().nullslast(), models.Lesson.id.asc())
+    res = await db.execute(q)
+    ordered = res.scalars().all()
+
+    mapping = {
+        lesson_id: (ordered[i + 1] if i + 1 < len(ordered) else None)
+        for i, lesson_id in enumerate(ordered)
+    }
+    _next_lesson_maps[course_id] = (time.monotonic() + NEXT_LESSON_TTL_SECONDS, mapping)
+    return mapping
+
+
+async def record_progress(db: AsyncSession, progress: models.Progress, course_id: UUID) -> None:
+    """Upsert the user's resume pointer from a progress write.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    mapping = await next_lesson_map(db, course_id)
+    values = {
+        "user_id": progress.user_id,
+        "course_id": course_id,
+        "lesson_id": progress.lesson_id,
+        "next_lesson_id": mapping.get(progress.lesson_id),
+        "status": progress.status or models.ProgressStatus.in_progress,
+        "progress_pct": progress.progress_pct or 0,
+    }
+    stmt = insert(models.LearningResume).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.LearningResume.user_id],
+        set_={**{k: stmt.excluded[k] for k in values if k != "user_id"}, "updated_at": func.now()},
+    )
+    await db.execute(stmt)
+
+
+def resume_target(resume: models.LearningResume) -> UUID:
+    """Lesson the client should open: the next one once the current is completed."""
+    completed = resume.status in (models.ProgressStatus.completed, models.ProgressStatus.completed.value)
+    if completed and resume.next_lesson_id is not None:
+        return resume.next_lesson_id
+    return resume.lesson_id
@@ -0,0 +1,144 @@
+"""Per-quiz score distributions and percentile ranks.
+
+Quiz scores are integer percentages (0-100), so each quiz keeps a fixed
+101-bucket histogram in ``quiz_score_sketches``. That is the degenerate, exact
+case of a mergeable quantile sketch: memory is bounded regardless of attempt
+count, two sketches merge by adding counts, and recording a score is one
+in-place ``counts[score] + 1`` update.
+
+Each quiz's sketch is split over ``STRIPES`` rows keyed ``(quiz_id, stripe)``.
+A submit increments a random stripe, so concurrent submits of a popular quiz
+rarely wait on the same row lock; reads merge the stripes.
+"""
+import random
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+BUCKETS = 101
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Rows per quiz sketch; more stripes means less lock contention, larger reads
+STRIPES = 8
+
+
+def empty_counts() -> List[int]:
+    return [0] * BUCKETS
+
+
+def _bucket(score: int) -> int:
+    return min(max(int(score), 0), BUCKETS - 1)
+
+
+async def record_score(db: AsyncSession, quiz_id, score: Optional[int]) -> None:
+    """Add one graded score to the quiz's sketch; the caller commits."""
+    if score is None:
+        return
+    stripe = random.randrange(STRIPES)
+    await db.execute(
+        insert(models.QuizScoreSketch)
+        .values(quiz_id=quiz_id, stripe=stripe, counts=empty_counts(), total=0)
+        .on_conflict_do_nothing(index_elements=[models.QuizScoreSketch.quiz_id, models.QuizScoreSketch.stripe])
+    )
+    # PostgreSQL arrays are 1-based
+    slot = _bucket(score) + 1
+    sketch = models.QuizScoreSketch
+    await db.execute(
+        update(sketch)
+        .where(sketch.quiz_id == quiz_id, sketch.stripe == stripe)
+        .values({sketch.counts[slot]: sketch.counts[slot] + 1, sketch.total: sketch.total + 1})
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rebuild(db: AsyncSession, quiz_id) -> None:
+    """Recompute a quiz's sketch from stored scores (after a re-grade); the caller commits.
+
+    The whole histogram goes to stripe 0 and the other stripes are zeroed.
+    """
+    await db.execute(
+        insert(models.QuizScoreSketch)
+        .values([
+            {"quiz_id": quiz_id, "stripe": stripe, "counts": empty_counts(), "total": 0}
+            for stripe in range(STRIPES)
+        ])
+        .on_conflict_do_nothing(index_elements=[models.QuizScoreSketch.quiz_id, models.QuizScoreSketch.stripe])
+    )
+    # Hold every stripe so concurrent record_score calls queue behind the rebuild
+    await db.execute(
+        select(models.QuizScoreSketch.stripe)
+        .where(models.QuizScoreSketch.quiz_id == quiz_id)
+        .order_by(models.QuizScoreSketch.stripe)
+        .with_for_update()
+    )
+    q = select(models.QuizAttempt.score, func.count()).where(
+        models.QuizAttempt.quiz_id == quiz_id,
+        models.QuizAttempt.score.isnot(None),
+    ).group_by(models.QuizAttempt.score)
+    counts = empty_counts()
+    for score, count in (await db.execute(q)).all():
+        counts[_bucket(score)] += count
+    await db.execute(
+        update(models.QuizScoreSketch)
+        .where(models.QuizScoreSketch.quiz_id == quiz_id, models.QuizScoreSketch.stripe == 0)
+        .values(counts=counts, total=sum(counts))
+    )
+    await db.execute(
+        update(models.QuizScoreSketch)
+        .where(models.QuizScoreSketch.quiz_id == quiz_id, models.QuizScoreSketch.stripe != 0)
+        .values(counts=empty_counts(), total=0)
+    )
+
+
+async def get_counts(db: AsyncSession, quiz_id) -> Optional[List[int]]:
+    """The quiz's histogram with its stripes merged, or None before the first score."""
+    res = await db.execute(select(models.QuizScoreSketch.counts).where(models.QuizScoreSketch.quiz_id == quiz_id))
+    stripes = res.scalars().all()
+    return merge(stripes) if stripes else None
+
+
+def merge(sketches: Iterable[Sequence[int]]) -> List[int]:
+    """Combine several sketches (e.g. all quizzes of a course) into one."""
+    total = np.zeros(BUCKETS, dtype=np.int64)
+    for counts in sketches:
+        total += np.asarray(counts, dtype=np.int64)
+    return total.tolist()
+
+
+def percentile_rank(counts: Sequence[int], score: Optional[int]) -> Optional[float]:
+    """Mid-rank percentile of ``score``: % of scores below it plus half of ties."""
+    if score is None or not counts:
+        return None
+    arr = np.asarray(counts, dtype=np.int64)
+    total = int(arr.sum())
+    if total == 0:
+        return None
+    b = _bucket(score)
+    below = int(arr[:b].sum())
+    return round(100.0 * (below + 0.5 * int(arr[b])) / total, 1)
+
+
+def quantiles(counts: Sequence[int], qs: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Optional[int]]:
+    """Score at each requested quantile (nearest-rank)."""
+    arr = np.asarray(counts, dtype=np.int64)
+    total = int(arr.sum())
+    if total == 0:
+        return {f"p{int(q * 100)}": None for q in qs}
+    cumulative = np.cumsum(arr)
+    out = {}
+    for q in qs:
+        rank = max(1, int(np.ceil(q * total)))
+        out[f"p{int(q * 100)}"] = int(np.searchsorted(cumulative, rank))
+    return out
+
+
+def mean(counts: Sequence[int]) -> Optional[float]:
+    arr = np.asarray(counts, dtype=np.int64)
+    total = int(arr.sum())
+    if total == 0:
+        return None
+    return round(float((arr * np.arange(BUCKETS)).sum()) / total, 2)
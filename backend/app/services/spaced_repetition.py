@@ -0,0 +1,220 @@
+"""Spaced-repetition review queue (SM-2).
+
+Every quiz question a student misses becomes a ``ReviewItem`` with an SM-2
+schedule (ease factor, interval, repetitions) and a ``due_at`` timestamp.
+``ix_review_items_user_due`` makes "what is due for this user" a range scan.
+
+- On quiz submission all of the attempt's questions are scheduled in batch:
+  missed questions are upserted as lapses in one statement, and due items
+  answered correctly are advanced as successful reviews in a second one.
+- ``POST /api/reviews/{id}`` applies a self-graded review (quality 0-5).
+- A nightly task snapshots each user's number of items due before the next
+  midnight (UTC) into ``review_due_counts``; reviews, and lapses of items
+  that were due, decrement it.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Interval, case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..db.session import WorkerSessionLocal
+from . import grading
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Quality recorded for a question missed in a quiz / answered correctly in a quiz
+MISSED_QUALITY = 2
+CORRECT_QUALITY = 4
+
+ONE_DAY = timedelta(days=1)
+
+
+def ease_delta(quality: int) -> float:
+    """SM-2 ease-factor adjustment for a review of ``quality`` (0-5)."""
+    q = 5 - quality
+    return 0.1 - q * (0.08 + q * 0.02)
+
+
+def sm2(ease: float, interval_days: float, repetitions: int, quality: int) -> Tuple[float, float, int, bool]:
+    """Apply one review; returns ``(ease, interval_days, repetitions, lapsed)``."""
+    ease = max(MIN_EASE, ease + ease_delta(quality))
+    if quality < 3:
+        return ease, 1.0, 0, True
+    repetitions += 1
+    if repetitions == 1:
+        interval_days = 1.0
+    elif repetitions == 2:
+        interval_days = 6.0
+    else:
+        interval_days = float(round(interval_days * ease))
+    return ease, interval_days, repetitions, False
+
+
+def next_midnight(now: datetime) -> datetime:
+    return datetime.combine(now.date() + ONE_DAY, datetime.min.time(), tzinfo=timezone.utc)
+
+
+async def _decrement_due_count(db: AsyncSession, user_id, by: int = 1) -> None:
+    if by <= 0:
+        return
+    await db.execute(
+        update(models.ReviewDueCount)
+        .where(models.ReviewDueCount.user_id == user_id)
+        .values(due_count=func.greatest(models.ReviewDueCount.due_count - by, 0))
+    )
+
+
+async def schedule_attempt(
+    db: AsyncSession,
+    attempt: models.QuizAttempt,
+    key: grading.AnswerKey,
+    only_answered: bool = False,
+) -> None:
+    """Update review schedules from a graded attempt; the caller commits.
+
+    With ``only_answered`` (adaptive quizzes) questions the student was never
+    shown are left alone instead of counting as missed.
+    """
+    if not len(key):
+        return
+    sel, num = grading.encode_batch(key, [attempt.answers])
+    correct = grading.correctness(key, sel, num)[0]
+    considered = grading.answered(key, sel, num)[0] if only_answered else np.ones(len(key), dtype=bool)
+    now = datetime.now(timezone.utc)
+    item = models.ReviewItem
+
+    missed = [key.question_ids[i] for i in range(len(key)) if considered[i] and not correct[i]]
+    if missed:
+        rows = [
+            {
+                "user_id": attempt.user_id,
+                "question_id": question_id,
+                "quiz_id": attempt.quiz_id,
+                "ease": DEFAULT_EASE,
+                "interval_days": 1.0,
+                "repetitions": 0,
+                "lapses": 0,
+                "due_at": now + ONE_DAY,
+                "last_reviewed_at": now,
+            }
+            for question_id in missed
+        ]
+        stmt = insert(item).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_review_items_user_question",
+            set_={
+                "ease": func.greatest(item.ease + ease_delta(MISSED_QUALITY), MIN_EASE),
+                "interval_days": 1.0,
+                "repetitions": 0,
+                "lapses": item.lapses + 1,
+                "due_at": stmt.excluded.due_at,
+                "last_reviewed_at": stmt.excluded.last_reviewed_at,
+            },
+        )
+        # Items that were due leave today's count, as in review(). The
+        # subquery reads the statement's snapshot, i.e. due_at before the upsert.
+        was_due = (
+            select(func.count(item.id))
+            .where(item.user_id == attempt.user_id, item.question_id.in_(missed), item.due_at <= now)
+            .scalar_subquery()
+        )
+        await db.execute(
+            update(models.ReviewDueCount)
+            .where(models.ReviewDueCount.user_id == attempt.user_id)
+            .values(due_count=func.greatest(models.ReviewDueCount.due_count - was_due, 0))
+            .add_cte(stmt.returning(item.id).cte("lapsed"))
+        )
+
+    passed = [key.question_ids[i] for i in range(len(key)) if considered[i] and correct[i]]
+    if passed:
+        # Correct answers to items already due count as successful reviews;
+        # like sm2(), the interval grows by the updated ease
+        ease = func.greatest(item.ease + ease_delta(CORRECT_QUALITY), MIN_EASE)
+        interval = case(
+            (item.repetitions == 0, 1.0),
+            (item.repetitions == 1, 6.0),
+            else_=func.round(item.interval_days * ease),
+        )
+        stmt = (
+            update(item)
+            .where(item.user_id == attempt.user_id, item.question_id.in_(passed), item.due_at <= now)
+            .values(
+                ease=ease,
+                interval_days=interval,
+                repetitions=item.repetitions + 1,
+                due_at=literal(now) + interval * literal(ONE_DAY, Interval),
+                last_reviewed_at=now,
+            )
+            .returning(item.id)
+        )
+        advanced = len((await db.execute(stmt)).all())
+        await _decrement_due_count(db, attempt.user_id, advanced)
+
+
+async def review(db: AsyncSession, review_item: models.ReviewItem, quality: int) -> models.ReviewItem:
+    """Apply a self-graded review to ``review_item``; the caller commits."""
+    now = datetime.now(timezone.utc)
+    was_due = review_item.due_at <= now
+    ease, interval, repetitions, lapsed = sm2(
+        review_item.ease, review_item.interval_days, review_item.repetitions, quality
+    )
+    review_item.ease = ease
+    review_item.interval_days = interval
+    review_item.repetitions = repetitions
+    review_item.lapses += int(lapsed)
+    review_item.due_at = now + interval * ONE_DAY
+    review_item.last_reviewed_at = now
+    if was_due:
+        await _decrement_due_count(db, review_item.user_id)
+    return review_item
+
+
+async def due_count(db: AsyncSession, user_id) -> int:
+    """Items due before the next midnight: the nightly snapshot, or a live count if stale."""
+    now = datetime.now(timezone.utc)
+    snapshot = await db.get(models.ReviewDueCount, user_id)
+    if snapshot is not None and snapshot.due_before == next_midnight(now):
+        return snapshot.due_count
+    q = select(func.count(models.ReviewItem.id)).where(
+        models.ReviewItem.user_id == user_id,
+        models.ReviewItem.due_at < next_midnight(now),
+    )
+    return (await db.execute(q)).scalar() or 0
+
+
+async def materialize_due_counts(now: Optional[datetime] = None) -> dict:
+    """Snapshot every user's count of items due before the next midnight (UTC)."""
+    due_before = next_midnight(now or datetime.now(timezone.utc))
+    counts = select(
+        models.ReviewItem.user_id,
+        func.count(models.ReviewItem.id).label("due_count"),
+        literal(due_before).label("due_before"),
+    ).where(models.ReviewItem.due_at < due_before).group_by(models.ReviewItem.user_id)
+
+    async with WorkerSessionLocal() as db:
+        stmt = insert(models.ReviewDueCount).from_select(["user_id", "due_count", "due_before"], counts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.ReviewDueCount.user_id],
+            set_={"due_count": stmt.excluded.due_count, "due_before": stmt.excluded.due_before, "computed_at": func.now()},
+        )
+        res = await db.execute(stmt.returning(models.ReviewDueCount.user_id))
+        users = len(res.all())
+        # Users with nothing due no longer appear in the aggregate
+        await db.execute(
+            update(models.ReviewDueCount)
+            .where(models.ReviewDueCount.due_before != due_before)
+            .values(due_count=0, due_before=due_before, computed_at=func.now())
+        )
+        await db.commit()
+    return {"users": users, "due_before": due_before.isoformat()}
+
+
+def question_payload(question: Optional[Any]) -> Optional[dict]:
+    """Student-facing question (answers removed) for a review item."""
+    if question is None:
+        return None
+    return {"id": str(question.id), **grading.strip_answers(question.question_json)}
@@ -0,0 +1,74 @@
+"""AI tutor replies: streaming and persisting the answer.
+
+The prompt context comes from ``ai_context.build_context``.
+
+``stream_reply`` turns the provider's token stream into server-sent events::
+
+    event: message   data: {MessageRead of the user's message}
+    event: token     data: {"delta": "..."}            (one per token)
+    event: done      data: {MessageRead of the assistant message}
+    event: error     data: {"detail": "...", "reason": "..."}  (generation failed)
+
+Replies come from the response cache when the same question was already
+answered in the same context (see ``ai_cache``), otherwise from the provider
+gateway. The assistant ``Message`` (with ``token_count``) is written when generation
+finishes, in its own session: the request's session is already closed while a
+streaming response is being sent.
+"""
+import json
+import logging
+from typing import AsyncIterator, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas
+from ..db.session import AsyncSessionLocal
+from . import ai_client, ai_messages
+from .ai_cache import get_cache
+from .ai_gateway import GatewayError, get_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def _frame(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def add_assistant_message(db: AsyncSession, conv_id, text: str, token_count: int) -> models.Message:
+    """Add a finished reply and bump its conversation (caller commits)."""
+    return await ai_messages.add_message(db, conv_id, models.MessageRole.assistant, text, token_count)
+
+
+async def save_assistant_message(conv_id, text: str, token_count: int) -> models.Message:
+    """Persist a finished reply in its own session."""
+    async with AsyncSessionLocal() as db:
+        msg = await add_assistant_message(db, conv_id, text, token_count)
+        await db.commit()
+        await db.refresh(msg)
+        return msg
+
+
+async def stream_reply(
+    user_id,
+    user_message: models.Message,
+    context: List[ai_client.ChatMessage],
+    cache_key: str,
+) -> AsyncIterator[str]:
+    """SSE frames for the assistant's reply to ``user_message``, cached or via the provider gateway."""
+    yield _frame("message", schemas.MessageRead.model_validate(user_message, from_attributes=True).model_dump_json())
+    tokens: List[str] = []
+    try:
+        async for token in get_cache().stream(cache_key, lambda: get_gateway().stream(user_id, context)):
+            tokens.append(token)
+            yield _frame("token", json.dumps({"delta": token}))
+    except GatewayError as exc:
+        yield _frame("error", json.dumps({"detail": str(exc), "reason": exc.reason}))
+        return
+    except Exception:
+        logger.exception("AI generation failed for conversation %s", user_message.conversation_id)
+        yield _frame("error", json.dumps({"detail": "AI response generation failed", "reason": "provider_error"}))
+        return
+
+    # Not reached when the client disconnects mid-stream: partial replies are not stored
+    msg = await save_assistant_message(user_message.conversation_id, "".join(tokens), len(tokens))
+    yield _frame("done", schemas.MessageRead.model_validate(msg, from_attributes=True).model_dump_json())
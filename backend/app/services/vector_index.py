@@ -0,0 +1,397 @@
+"""Approximate nearest-neighbour search over a memory-mapped float32 matrix.
+
+``VectorIndex`` keeps unit-length vectors in a file-backed ``np.memmap``
+(``capacity x dim`` float32; grown by doubling into a new file) together with
+per-row arrays: alive flag, inverted-list id, caller-defined ``group`` (used
+for filtering, e.g. a course) and the row's text, which lives in an
+append-only UTF-8 file.
+
+Search is an IVF (inverted file) index: spherical k-means splits the rows
+into ``nlist`` clusters; a query is compared with the centroids, the rows of
+the ``nprobe`` closest clusters are scored exactly, and the best ``k`` are
+returned. Below ``MIN_TRAIN_ROWS`` rows the index is searched exhaustively.
+New rows are assigned to their nearest existing centroid; the clusters are
+retrained once the index has grown well past the size they were trained on.
+
+Training also fits per-dimension IDF weights (``log((1 + n) / (1 + df)) + 1``
+over the rows where a dimension is non-zero). Stored rows, new rows and
+queries are all scaled by them and re-normalized, which keeps dimensions
+shared by most rows (hashed common words) from dominating similarity.
+
+On-disk layout (one directory, one writer, any number of readers)::
+
+    manifest.json           current files, counts and the caller's ``extra``
+    vectors-<gen>.f32       the matrix (rows beyond ``count`` are unused)
+    texts-<gen>.bin         row texts, appended
+    rows-<version>.npz      per-row arrays
+    ivf-<version>.npz       IVF centroids and dimension weights
+
+``save`` writes new ``rows``/``ivf`` files and then atomically replaces
+the manifest, so a reader always sees a consistent snapshot; vectors and
+texts are append-only within a generation. Anything that rewrites stored
+rows (growing, reweighting, compaction) writes a new generation instead. ``reload_if_changed`` lets a
+long-lived reader pick up new versions.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+MIN_TRAIN_ROWS = 1024
+# Retrain when live rows exceed this multiple of the rows the clusters were trained on
+RETRAIN_GROWTH = 2.0
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE = 50000
+INITIAL_CAPACITY = 1024
+# Filtered searches scan a group exhaustively up to this many rows
+GROUP_EXACT_ROWS = 20000
+
+
+def default_nlist(rows: int) -> int:
+    return int(max(1, min(4096, round(np.sqrt(rows)))))
+
+
+class VectorIndex:
+    def __init__(self, path, dim: int, writable: bool = False):
+        self.path = Path(path)
+        self.dim = dim
+        self.writable = writable
+        self.version = 0
+        self.generation = 0
+        self.count = 0
+        self.capacity = 0
+        self.trained_count = 0
+        self.extra: dict = {}
+        self.vectors: Optional[np.memmap] = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.groups = np.zeros(0, dtype=np.int32)
+        self.text_start = np.zeros(0, dtype=np.int64)
+        self.text_len = np.zeros(0, dtype=np.int32)
+        self.centroids: Optional[np.ndarray] = None
+        self.weights: Optional[np.ndarray] = None
+        self._inverted: List[np.ndarray] = []
+        self._files: Dict[str, str] = {}
+        # Files of the last saved manifest; kept for readers until the next save
+        self._saved_files: Dict[str, str] = {}
+        self._manifest_mtime = None
+
+    # -- persistence -------------------------------------------------------
+
+    @classmethod
+    def open(cls, path, dim: int, writable: bool = False) -> "VectorIndex":
+        index = cls(path, dim, writable)
+        if (index.path / "manifest.json").exists():
+            index._load()
+        elif writable:
+            index.path.mkdir(parents=True, exist_ok=True)
+            index._files = {"vectors": "vectors-0.f32", "texts": "texts-0.bin"}
+            index._grow(INITIAL_CAPACITY)
+            (index.path / index._files["texts"]).touch()
+        return index
+
+    def _file(self, name: str) -> Path:
+        return self.path / self._files[name]
+
+    def _load(self) -> None:
+        manifest_path = self.path / "manifest.json"
+        self._manifest_mtime = manifest_path.stat().st_mtime_ns
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["format"] != FORMAT or manifest["dim"] != self.dim:
+            raise ValueError(f"Incompatible vector index at {self.path}")
+        self.version = manifest["version"]
+        self.generation = manifest["generation"]
+        self.count = manifest["count"]
+        self.capacity = manifest["capacity"]
+        self.trained_count = manifest["trained_count"]
+        self.extra = manifest.get("extra", {})
+        self._files = manifest["files"]
+        self._saved_files = dict(self._files)
+        with np.load(self._file("rows")) as rows:
+            size = max(self.capacity, self.count) if self.writable else self.count
+            self.alive = self._padded(rows["alive"], size)
+            self.lists = self._padded(rows["lists"], size)
+            self.groups = self._padded(rows["groups"], size)
+            self.text_start = self._padded(rows["text_start"], size)
+            self.text_len = self._padded(rows["text_len"], size)
+        self.centroids = self.weights = None
+        if "ivf" in self._files:
+            with np.load(self._file("ivf")) as ivf:
+                self.centroids, self.weights = ivf["centroids"], ivf["weights"]
+        self.vectors = np.memmap(
+            self._file("vectors"), dtype=np.float32, mode="r+" if self.writable else "r",
+            shape=(self.capacity, self.dim),
+        )
+        self._rebuild_inverted()
+
+    @staticmethod
+    def _padded(array: np.ndarray, size: int) -> np.ndarray:
+        out = np.zeros(size, dtype=array.dtype)
+        out[:len(array)] = array
+        return out
+
+    def reload_if_changed(self) -> bool:
+        """Reload when another process saved a newer version; returns whether it did."""
+        manifest_path = self.path / "manifest.json"
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._manifest_mtime:
+            return False
+        try:
+            self._load()
+        except FileNotFoundError:
+            # The writer cleaned up a file between our manifest read and load; next call retries
+            self._manifest_mtime = None
+            return False
+        return True
+
+    def save(self, extra: Optional[dict] = None) -> None:
+        """Persist a new version (writer only)."""
+        assert self.writable, "read-only index"
+        if extra is not None:
+            self.extra = extra
+        self.version += 1
+        self.vectors.flush()
+        n = self.count
+        files = dict(self._files)
+        files["rows"] = f"rows-{self.version}.npz"
+        with open(self.path / files["rows"], "wb") as fh:
+            np.savez(
+                fh, alive=self.alive[:n], lists=self.lists[:n], groups=self.groups[:n],
+                text_start=self.text_start[:n], text_len=self.text_len[:n],
+            )
+        if self.centroids is not None:
+            files["ivf"] = f"ivf-{self.version}.npz"
+            with open(self.path / files["ivf"], "wb") as fh:
+                np.savez(fh, centroids=self.centroids, weights=self.weights)
+        manifest = {
+            "format": FORMAT, "dim": self.dim, "version": self.version, "generation": self.generation,
+            "count": n, "capacity": self.capacity, "trained_count": self.trained_count,
+            "files": files, "extra": self.extra,
+        }
+        tmp = self.path / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self.path / "manifest.json")
+        self._cleanup(keep=set(files.values()) | set(self._saved_files.values()))
+        self._files, self._saved_files = files, dict(files)
+
+    def _cleanup(self, keep: set) -> None:
+        for entry in self.path.iterdir():
+            if entry.name.startswith(("vectors-", "texts-", "rows-", "ivf-")) and entry.name not in keep:
+                entry.unlink(missing_ok=True)
+
+    def _grow(self, capacity: int) -> None:
+        """Move the matrix to a new file with room for ``capacity`` rows."""
+        self.generation += 1
+        name = f"vectors-{self.generation}.f32"
+        grown = np.memmap(self.path / name, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        if self.count:
+            grown[:self.count] = self.vectors[:self.count]
+        self.vectors = grown
+        self._files["vectors"] = name
+        self.capacity = capacity
+        for attr in ("alive", "lists", "groups", "text_start", "text_len"):
+            setattr(self, attr, self._padded(getattr(self, attr), capacity))
+
+    # -- writes --------------------------------------------------------------
+
+    def weighted(self, vectors: np.ndarray) -> np.ndarray:
+        """Apply the dimension weights to raw unit vectors (rows) and re-normalize."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.weights is None:
+            return vectors
+        out = vectors * self.weights
+        norms = np.linalg.norm(out, axis=-1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    def add(self, vectors: np.ndarray, texts: Sequence[str], group: int) -> np.ndarray:
+        """Append rows (raw unit vectors) with their texts; returns the new row ids."""
+        vectors = self.weighted(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        n = len(vectors)
+        if not n:
+            return np.zeros(0, dtype=np.int64)
+        if self.count + n > self.capacity:
+            capacity = max(self.capacity, INITIAL_CAPACITY)
+            while capacity < self.count + n:
+                capacity *= 2
+            self._grow(capacity)
+        rows = np.arange(self.count, self.count + n)
+        self.vectors[rows] = vectors
+        self._write_texts(rows, texts)
+        self.alive[rows] = True
+        self.groups[rows] = group
+        self.count += n
+        if self.centroids is not None:
+            assigned = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+            self.lists[rows] = assigned
+            for list_id in np.unique(assigned):
+                self._inverted[list_id] = np.concatenate([self._inverted[list_id], rows[assigned == list_id]])
+        return rows
+
+    def _write_texts(self, rows: np.ndarray, texts: Sequence[str]) -> None:
+        with open(self._file("texts"), "ab") as fh:
+            offset = fh.tell()
+            for row, text in zip(rows, texts):
+                data = text.encode()
+                fh.write(data)
+                self.text_start[row] = offset
+                self.text_len[row] = len(data)
+                offset += len(data)
+
+    def remove(self, rows) -> None:
+        self.alive[np.asarray(rows, dtype=np.int64)] = False
+
+    @property
+    def live_count(self) -> int:
+        return int(np.count_nonzero(self.alive[:self.count]))
+
+    def needs_training(self) -> bool:
+        live = self.live_count
+        if live < MIN_TRAIN_ROWS:
+            return False
+        return self.centroids is None or live > RETRAIN_GROWTH * self.trained_count
+
+    def _reweight(self) -> None:
+        """Refit the dimension weights and rescale the stored rows to them.
+
+        The rescaled matrix goes to a new generation file: readers still map
+        the current one and must keep seeing the rows their weights match.
+        """
+        live = np.flatnonzero(self.alive[:self.count])
+        df = np.zeros(self.dim, dtype=np.int64)
+        for start in range(0, self.count, 65536):
+            block = slice(start, min(self.count, start + 65536))
+            df += np.count_nonzero(np.asarray(self.vectors[block])[self.alive[block]], axis=0)
+        weights = (np.log((1 + len(live)) / (1 + df)) + 1).astype(np.float32)
+        scale = weights if self.weights is None else weights / self.weights
+        self.generation += 1
+        name = f"vectors-{self.generation}.f32"
+        rescaled = np.memmap(self.path / name, dtype=np.float32, mode="w+", shape=(self.capacity, self.dim))
+        for start in range(0, self.count, 65536):
+            block = slice(start, min(self.count, start + 65536))
+            rows = np.asarray(self.vectors[block]) * scale
+            rescaled[block] = rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+        self.vectors = rescaled
+        self._files["vectors"] = name
+        self.weights = weights
+
+    def train(self, nlist: Optional[int] = None, seed: int = 0) -> None:
+        """Fit dimension weights and spherical k-means centroids on the live rows,
+        and reassign every row."""
+        live = np.flatnonzero(self.alive[:self.count])
+        if not len(live):
+            return
+        self._reweight()
+        nlist = min(nlist or default_nlist(len(live)), len(live))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(live, size=min(len(live), KMEANS_SAMPLE), replace=False))
+        data = np.asarray(self.vectors[sample])
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assigned = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assigned, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+        self.centroids = centroids
+        for start in range(0, self.count, 65536):
+            block = slice(start, min(self.count, start + 65536))
+            self.lists[block] = np.argmax(np.asarray(self.vectors[block]) @ centroids.T, axis=1)
+        self.trained_count = len(live)
+        self._rebuild_inverted()
+
+    def _rebuild_inverted(self) -> None:
+        if self.centroids is None:
+            self._inverted = []
+            return
+        lists = self.lists[:self.count]
+        order = np.argsort(lists, kind="stable")
+        bounds = np.searchsorted(lists[order], np.arange(len(self.centroids) + 1))
+        self._inverted = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def compact(self) -> np.ndarray:
+        """Rewrite live rows densely into a new generation.
+
+        Returns ``remap`` with ``remap[old_row] = new_row`` (-1 for dropped rows).
+        """
+        assert self.writable, "read-only index"
+        live = np.flatnonzero(self.alive[:self.count])
+        remap = np.full(self.count, -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+        texts = [self.text(int(row)) for row in live]
+        vectors = np.asarray(self.vectors[live])
+        groups = self.groups[live]
+        lists = self.lists[live]
+
+        self.generation += 1
+        self._files["texts"] = f"texts-{self.generation}.bin"
+        (self.path / self._files["texts"]).touch()
+        self.count = 0
+        for attr in ("alive", "lists", "groups", "text_start", "text_len"):
+            setattr(self, attr, getattr(self, attr)[:0])
+        self._grow(max(INITIAL_CAPACITY, 1 << int(np.ceil(np.log2(max(1, len(live)))))))
+
+        rows = np.arange(len(live))
+        self.vectors[rows] = vectors
+        self._write_texts(rows, texts)
+        self.alive[rows] = True
+        self.groups[rows] = groups
+        self.lists[rows] = lists
+        self.count = len(live)
+        self._rebuild_inverted()
+        return remap
+
+    # -- reads ---------------------------------------------------------------
+
+    def text(self, row: int) -> str:
+        with open(self._file("texts"), "rb") as fh:
+            return os.pread(fh.fileno(), int(self.text_len[row]), int(self.text_start[row])).decode()
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        if self.centroids is None:
+            return np.arange(self.count)
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+        return np.concatenate([self._inverted[i] for i in probe])
+
+    def search(
+        self, query: np.ndarray, k: int = 5, nprobe: int = 8, group: Optional[int] = None,
+        exact: bool = False,
+    ) -> List[Tuple[int, float]]:
+        """Best ``k`` live rows by (weighted) cosine similarity to a raw unit
+        ``query`` as ``(row, score)``, best first."""
+        if not self.count:
+            return []
+        query = self.weighted(query)
+        if exact and group is None:
+            # Contiguous scan of the whole matrix
+            rows = np.flatnonzero(self.alive[:self.count])
+            scores = (np.asarray(self.vectors[:self.count]) @ query)[rows]
+        else:
+            members = np.flatnonzero(self.groups[:self.count] == group) if group is not None else None
+            if members is not None and (exact or len(members) <= GROUP_EXACT_ROWS):
+                # A group (one course) is small: score all its rows instead of
+                # probing clusters that may hold none of them
+                rows = members
+            else:
+                rows = self.candidates(query, nprobe)
+                if group is not None:
+                    rows = rows[self.groups[rows] == group]
+            # Sorted row ids make the memmap gather sequential
+            rows = np.sort(rows[self.alive[rows]])
+            scores = np.asarray(self.vectors[rows]) @ query
+        if not len(rows):
+            return []
+        k = min(k, len(rows))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Benchmark for the AI provider gateway (services/ai_gateway.py).
+
+Simulates a classroom burst: --users students each send --requests tutor
+messages at once against the local FakeProvider, which injects first-token
+latency (with jitter) and transient errors. Runs the burst once calling the
+provider directly (no limits) and once through the gateway, and reports peak
+provider concurrency, throughput, failures, rejections and latency.
+
+Usage:
+    python benchmarks/bench_ai_gateway.py --users 300 --requests 2 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir.parent))
+
+from backend.app.services import ai_client, ai_gateway  # noqa: E402
+
+
+class CountingProvider(ai_client.FakeProvider):
+    """FakeProvider that records the peak number of concurrent calls."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.peak = 0
+
+    async def stream(self, messages, max_tokens=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            async for token in super().stream(messages, max_tokens):
+                yield token
+        finally:
+            self.active -= 1
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def burst(args, call) -> dict:
+    latencies, outcomes = [], {}
+
+    async def one(user: int, i: int):
+        messages = [ai_client.ChatMessage("user", f"student {user} question {i}: explain photosynthesis")]
+        started = time.perf_counter()
+        try:
+            await call(f"user-{user}", messages)
+            outcome = "ok"
+            latencies.append(time.perf_counter() - started)
+        except ai_gateway.GatewayError as exc:
+            outcome = exc.reason
+        except ai_client.ProviderError:
+            outcome = "provider_error"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(u, i) for u in range(args.users) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "latencies": latencies, "outcomes": outcomes}
+
+
+def report(name: str, result: dict, provider: CountingProvider) -> None:
+    ok = result["outcomes"].get("ok", 0)
+    lat = result["latencies"]
+    print(f"{name}")
+    print(f"  provider calls={provider.calls} peak concurrency={provider.peak}")
+    print(f"  outcomes={result['outcomes']}")
+    print(f"  {ok / result['elapsed']:.1f} replies/s over {result['elapsed']:.2f}s")
+    print(f"  latency p50={percentile(lat, 0.5):.3f}s p95={percentile(lat, 0.95):.3f}s max={max(lat, default=0):.3f}s")
+
+
+async def main(args) -> None:
+    def provider():
+        return CountingProvider(
+            first_token_delay=args.latency, token_delay=args.token_delay,
+            error_rate=args.error_rate, jitter=0.5, seed=7,
+        )
+
+    direct = provider()
+
+    async def call_direct(user_id, messages):
+        return "".join([t async for t in ai_client.stream_response(messages, provider=direct)])
+
+    report("direct (no limits)", await burst(args, call_direct), direct)
+
+    gated = provider()
+    gateway = ai_gateway.AIGateway(
+        provider=gated,
+        max_concurrency=args.concurrency,
+        max_per_user=1,
+        queue_size=args.queue_size,
+        queue_timeout=args.queue_timeout,
+        rate=args.rate,
+        burst=args.concurrency,
+        retry_base=0.05,
+    )
+    report("gateway", await burst(args, gateway.generate), gated)
+    metrics = gateway.metrics()
+    print(f"  max queue depth={metrics['max_queue_depth']} retries={metrics['retries']} "
+          f"rejected={metrics['rejected']} circuit={metrics['circuit']}")
+    print(f"  wait={metrics['wait_seconds']}")
+    print(f"  first token={metrics['first_token_seconds']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake first-token latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=100.0)
+    parser.add_argument("--queue-size", type=int, default=500)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
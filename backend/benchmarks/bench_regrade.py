@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Benchmark for bulk quiz re-grading (services/regrading.py).
+
+By default runs fully in memory: synthesizes attempts chunk by chunk (so memory
+stays flat at 1M attempts), scores each chunk with grading.score_batch and
+builds the UPDATE ... FROM (VALUES ...) statement the worker would send.
+
+With --quiz-id it instead runs a real re-grade against DATABASE_URL for an
+existing quiz (seed its attempts first), exercising the server-side cursor
+and chunked commits end to end.
+
+Usage:
+    python benchmarks/bench_regrade.py --attempts 1000000
+    python benchmarks/bench_regrade.py --quiz-id <uuid>
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir.parent))
+
+from backend.app.services import grading, regrading  # noqa: E402
+
+
+def build_key(n_questions: int, rng: random.Random):
+    questions = []
+    for i in range(n_questions):
+        kind = i % 4
+        if kind == 0:
+            spec = {"type": "multiple_choice", "options": ["a", "b", "c", "d"], "answer": rng.randrange(4)}
+        elif kind == 1:
+            spec = {"type": "multi_select", "options": ["a", "b", "c", "d"], "answer": [0, 2]}
+        elif kind == 2:
+            spec = {"type": "numeric", "answer": 3.5, "tolerance": 0.05}
+        else:
+            spec = {"type": "short_text", "answer": ["mitosis"]}
+        questions.append((uuid.uuid4(), spec))
+    return grading.compile_answer_key(questions)
+
+
+def synth_chunk(key, size: int, rng: random.Random):
+    choices = {
+        grading.MULTIPLE_CHOICE: lambda: rng.randrange(4),
+        grading.MULTI_SELECT: lambda: rng.choice([[0, 2], [0], [1, 2]]),
+        grading.NUMERIC: lambda: rng.choice([3.5, 3.52, 4.0]),
+        grading.SHORT_TEXT: lambda: rng.choice(["Mitosis", "meiosis"]),
+    }
+    gens = [(qid, choices[int(kind)]) for qid, kind in zip(key.question_ids, key.kinds)]
+    ids = [uuid.uuid4() for _ in range(size)]
+    answers = [{qid: gen() for qid, gen in gens} for _ in range(size)]
+    return ids, answers
+
+
+def bench_memory(attempts: int, questions: int, chunk_size: int) -> None:
+    rng = random.Random(42)
+    key = build_key(questions, rng)
+    # The statement is only built, so any quiz id and version will do
+    quiz_id = uuid.uuid4()
+    synth_time = score_time = sql_time = 0.0
+    done = 0
+    while done < attempts:
+        size = min(chunk_size, attempts - done)
+        t0 = time.perf_counter()
+        ids, answers = synth_chunk(key, size, rng)
+        t1 = time.perf_counter()
+        rows = regrading.score_chunk(key, 60, ids, answers)
+        t2 = time.perf_counter()
+        regrading.bulk_score_update(rows, quiz_id, 1)
+        t3 = time.perf_counter()
+        synth_time += t1 - t0
+        score_time += t2 - t1
+        sql_time += t3 - t2
+        done += size
+
+    work = score_time + sql_time
+    print(f"attempts={attempts:,} questions={questions} chunk={chunk_size}")
+    print(f"  synthesize (not part of job): {synth_time:8.2f}s")
+    print(f"  score (encode + vectorized):  {score_time:8.2f}s  {attempts / score_time:12,.0f} attempts/s")
+    print(f"  build bulk UPDATE:            {sql_time:8.2f}s")
+    print(f"  job CPU total:                {work:8.2f}s  {attempts / work:12,.0f} attempts/s")
+
+
+async def bench_database(quiz_id: str, chunk_size: int) -> None:
+    from backend.app import models
+    from backend.app.db.session import WorkerSessionLocal
+
+    async with WorkerSessionLocal() as db:
+        quiz = await db.get(models.Quiz, quiz_id)
+        if quiz is None:
+            raise SystemExit(f"Quiz {quiz_id} not found")
+        run = await regrading.create_run(db, quiz)
+        await db.commit()
+        run_id = run.id
+
+    def report(processed, total):
+        print(f"\r  {processed:,}/{total:,}", end="", flush=True)
+
+    t0 = time.perf_counter()
+    result = await regrading.regrade_quiz(quiz_id, run_id, chunk_size=chunk_size, on_progress=report)
+    print()
+    print(f"  {result} in {time.perf_counter() - t0:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=1_000_000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=regrading.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--quiz-id", help="run a real re-grade against DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.quiz_id:
+        asyncio.run(bench_database(args.quiz_id, args.chunk_size))
+    else:
+        bench_memory(args.attempts, args.questions, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Benchmark for lesson retrieval (services/embeddings.py, services/vector_index.py).
+
+Synthesizes --lessons lesson texts drawn from --topics topic vocabularies,
+chunks and embeds them with the hashing vectorizer into a memory-mapped IVF
+index in a temporary directory, then issues --queries questions built from
+words of random passages. For each nprobe it reports recall@k against exact
+(brute-force) search over the same vectors and query latency percentiles.
+It finally measures an incremental update (re-embedding 1% of the lessons)
+and a reopen as a read-only process would.
+
+Usage:
+    python benchmarks/bench_retrieval.py --lessons 20000 --k 5
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir.parent))
+
+from backend.app.services.embeddings import HashingVectorizer, chunk_text  # noqa: E402
+from backend.app.services.vector_index import VectorIndex  # noqa: E402
+
+COMMON = "the process of learning explains how students apply concepts in examples and practice problems".split()
+
+
+def make_vocab(topics: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(60)] for _ in range(topics)]
+
+
+def make_lesson(vocab, rng: random.Random) -> str:
+    """A lesson on one subtopic: a dozen words of a topic plus filler words."""
+    focus = rng.sample(rng.choice(vocab), 12)
+    sentences = []
+    for _ in range(rng.randint(8, 30)):
+        words = [rng.choice(focus) if rng.random() < 0.5 else rng.choice(COMMON) for _ in range(rng.randint(8, 18))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main(args) -> None:
+    rng = random.Random(7)
+    vectorizer = HashingVectorizer(args.dim)
+    vocab = make_vocab(args.topics, rng)
+    lessons = [make_lesson(vocab, rng) for _ in range(args.lessons)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex.open(tmp, args.dim, writable=True)
+        t0 = time.perf_counter()
+        passages_by_lesson = []
+        for i, text in enumerate(lessons):
+            passages = chunk_text(text)
+            index.add(vectorizer.embed_batch(passages), passages, group=i % 50)
+            passages_by_lesson.append(passages)
+        t1 = time.perf_counter()
+        index.train()
+        t2 = time.perf_counter()
+        index.save()
+        print(f"lessons={args.lessons:,} chunks={index.count:,} dim={args.dim} nlist={len(index.centroids)}")
+        print(f"embed+append {t1 - t0:.1f}s  train {t2 - t1:.1f}s  "
+              f"matrix {index.count * args.dim * 4 / 2**20:.0f} MiB (float32 memmap)")
+
+        reader = VectorIndex.open(tmp, args.dim)
+        queries = []
+        for _ in range(args.queries):
+            passage = rng.choice(rng.choice(passages_by_lesson))
+            words = passage.rstrip(".").split()
+            queries.append(vectorizer.embed(" ".join(rng.sample(words, min(12, len(words))))))
+
+        truth, exact_times = [], []
+        for q in queries:
+            t = time.perf_counter()
+            truth.append({row for row, _ in reader.search(q, args.k, exact=True)})
+            exact_times.append(time.perf_counter() - t)
+        print(f"exact      p50={percentile(exact_times, 0.5) * 1e3:.2f}ms p95={percentile(exact_times, 0.95) * 1e3:.2f}ms")
+
+        for nprobe in (1, 4, 8, 16, 32):
+            times, recall = [], []
+            for q, expected in zip(queries, truth):
+                t = time.perf_counter()
+                found = {row for row, _ in reader.search(q, args.k, nprobe=nprobe)}
+                times.append(time.perf_counter() - t)
+                recall.append(len(found & expected) / max(1, len(expected)))
+            print(f"nprobe={nprobe:<3} recall@{args.k}={np.mean(recall):.3f} "
+                  f"p50={percentile(times, 0.5) * 1e3:.2f}ms p95={percentile(times, 0.95) * 1e3:.2f}ms")
+
+        # Incremental update: re-embed 1% of lessons, tombstoning their old rows
+        edited = rng.sample(range(args.lessons), max(1, args.lessons // 100))
+        t = time.perf_counter()
+        for i in edited:
+            passages = chunk_text(make_lesson(vocab, rng))
+            index.add(vectorizer.embed_batch(passages), passages, group=i % 50)
+        index.remove(np.arange(len(edited)))
+        index.save()
+        t_update = time.perf_counter() - t
+        t = time.perf_counter()
+        reader.reload_if_changed()
+        print(f"update of {len(edited)} lessons {t_update * 1e3:.0f}ms, reader reload {(time.perf_counter() - t) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lessons", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=300)
+    main(parser.parse_args())
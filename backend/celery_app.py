@@ -1,9 +1,170 @@
+import asyncio
+import concurrent.futures
 from celery import Celery
-import os
 
-broker = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-celery_app = Celery('smartlearn', broker=broker)
+from celery.schedules import crontab
+
+from backend.app.core.tasks import ALWAYS_EAGER, BROKER_URL, RESULT_BACKEND
+from backend.app.services import (
+    adaptive, ai_archive, ai_jobs, item_analytics, lesson_retrieval, notification_fanout, notification_retention,
+    regrading, spaced_repetition,
+)
+
+# CELERY_BROKER_URL may point at a local broker (e.g. "memory://" with
+# CELERY_RESULT_BACKEND="cache+memory://") to run a worker without Redis.
+celery_app = Celery('smartlearn', broker=BROKER_URL, backend=RESULT_BACKEND)
+celery_app.conf.update(
+    # CELERY_TASK_ALWAYS_EAGER=1 runs tasks inline in the calling process (tests, local development)
+    task_always_eager=ALWAYS_EAGER,
+    task_eager_propagates=False,
+    task_track_started=True,
+    # Long jobs checkpoint their own progress; only ack once they finish so a
+    # killed worker hands the job to another one, which then resumes.
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
+celery_app.conf.beat_schedule = {
+    "refresh-quiz-analytics": {
+        "task": "smartlearn.refresh_all_quiz_analytics",
+        "schedule": crontab(minute=15),
+    },
+    "fit-item-params": {
+        "task": "smartlearn.fit_adaptive_quizzes",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "materialize-review-due-counts": {
+        "task": "smartlearn.materialize_review_due_counts",
+        "schedule": crontab(hour=0, minute=5),
+    },
+    "maintain-notification-partitions": {
+        "task": "smartlearn.maintain_notification_partitions",
+        "schedule": crontab(hour=1, minute=0),
+    },
+    "sync-lesson-index": {
+        "task": "smartlearn.sync_lesson_index",
+        "schedule": crontab(minute="*/10"),
+    },
+    "archive-idle-ai-conversations": {
+        "task": "smartlearn.archive_idle_ai_conversations",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    "compact-notification-digests": {
+        "task": "smartlearn.compact_notification_digests",
+        "schedule": crontab(minute=45),
+    },
+}
+
+
+def run_async(coro):
+    """Run a service coroutine to completion from a (synchronous) Celery task.
+
+    An eager task called from async code (an API request) already has a
+    running loop in this thread, so the coroutine gets its own loop in a
+    helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
 
 @celery_app.task
 def dummy_task(x):
     return x * 2
+
+
+@celery_app.task(bind=True, name="smartlearn.regrade_quiz", max_retries=5)
+def regrade_quiz(self, quiz_id, run_id, chunk_size=regrading.DEFAULT_CHUNK_SIZE):
+    """Re-score all completed attempts of a quiz; resumes from the run's checkpoint."""
+    def report(processed, total):
+        self.update_state(state="PROGRESS", meta={"run_id": run_id, "processed": processed, "total": total})
+
+    try:
+        return run_async(regrading.regrade_quiz(quiz_id, run_id, chunk_size=chunk_size, on_progress=report))
+    except Exception as exc:
+        # Bad question data fails the run for good; only connection trouble is retried
+        if not regrading.is_transient(exc):
+            raise
+        # Retrying is safe: the run picks up after its last committed chunk
+        raise self.retry(exc=exc, countdown=min(300, 2 ** self.request.retries * 10))
+
+
+@celery_app.task(name="smartlearn.refresh_quiz_analytics")
+def refresh_quiz_analytics(quiz_id):
+    """Fold newly completed attempts into a quiz's item statistics."""
+    return run_async(item_analytics.refresh_quiz_analytics(quiz_id))
+
+
+@celery_app.task(name="smartlearn.refresh_all_quiz_analytics")
+def refresh_all_quiz_analytics():
+    """Hourly incremental item-analytics pass over all quizzes."""
+    return run_async(item_analytics.refresh_all_quiz_analytics())
+
+
+@celery_app.task(name="smartlearn.fit_item_params")
+def fit_item_params(quiz_id):
+    """Refit the 2PL item parameters of one quiz."""
+    return run_async(adaptive.fit_quiz_item_params(quiz_id))
+
+
+@celery_app.task(name="smartlearn.fit_adaptive_quizzes")
+def fit_adaptive_quizzes():
+    """Nightly refit of item parameters for all adaptive quizzes."""
+    return run_async(adaptive.fit_adaptive_quizzes())
+
+
+@celery_app.task(name="smartlearn.materialize_review_due_counts")
+def materialize_review_due_counts():
+    """Nightly snapshot of each user's number of due review items."""
+    return run_async(spaced_repetition.materialize_due_counts())
+
+
+@celery_app.task(bind=True, name="smartlearn.fan_out_notifications", max_retries=5)
+def fan_out_notifications(self, run_id):
+    """Send a course-wide notification to every learner; resumes from the run's checkpoint."""
+    def report(sent, skipped):
+        self.update_state(state="PROGRESS", meta={"run_id": run_id, "sent": sent, "skipped": skipped})
+
+    try:
+        return run_async(notification_fanout.fan_out(run_id, on_progress=report))
+    except Exception as exc:
+        # Each committed batch carries its checkpoint, so a retry sends no duplicates
+        raise self.retry(exc=exc, countdown=min(300, 2 ** self.request.retries * 10))
+
+
+@celery_app.task(name="smartlearn.maintain_notification_partitions")
+def maintain_notification_partitions():
+    """Daily: create upcoming notification partitions and drop expired months."""
+    return run_async(notification_retention.maintain_partitions())
+
+
+@celery_app.task(name="smartlearn.compact_notification_digests")
+def compact_notification_digests():
+    """Hourly: collapse bursts of unread same-type notifications into digests."""
+    return run_async(notification_retention.compact_digests())
+
+
+@celery_app.task(name="smartlearn.sync_lesson_index")
+def sync_lesson_index():
+    """Re-embed new or edited lessons into the tutor's retrieval index."""
+    return run_async(lesson_retrieval.sync_lessons())
+
+
+@celery_app.task(name="smartlearn.archive_idle_ai_conversations")
+def archive_idle_ai_conversations():
+    """Nightly move of idle tutor conversations' messages into zstd archives."""
+    return run_async(ai_archive.archive_idle())
+
+
+@celery_app.task(bind=True, name="smartlearn.generate_ai_reply", max_retries=3)
+def generate_ai_reply(self, job_id):
+    """Generate the AI tutor reply for an ``AIGenerationJob`` and notify its user."""
+    final = self.request.retries >= self.max_retries
+    try:
+        return run_async(ai_jobs.run_job(job_id, final=final))
+    except ai_jobs.RETRYABLE as exc:
+        # The job is back to "pending"; honor the gateway's Retry-After when it has one
+        countdown = getattr(exc, "retry_after", None) or min(60, 2 ** self.request.retries * 5)
+        raise self.retry(exc=exc, countdown=countdown)
@@ -0,0 +1,78 @@
+"""Scoring and stopping rules of adaptive quizzes (``services/adaptive.py``)."""
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.app.services import adaptive, grading
+
+
+def _bank(n_items=10):
+    rows = [
+        (uuid.uuid4(), {"type": "multiple_choice", "question": f"Q{i}", "options": ["a", "b", "c"], "answer": 0})
+        for i in range(n_items)
+    ]
+    key = grading.compile_answer_key(rows)
+    questions = [grading.strip_answers(spec) for _, spec in rows]
+    return adaptive.build_item_bank(key, questions, np.ones(n_items), np.linspace(-1.5, 1.5, n_items))
+
+
+def _quiz(length=5):
+    return SimpleNamespace(quiz_metadata={"adaptive_length": length, "adaptive_se": 0.01})
+
+
+def test_blank_submission_of_served_questions_scores_low():
+    bank = _bank()
+    served = list(bank.key.question_ids[:5])
+    all_right = {qid: 0 for qid in served}
+
+    blank, _ = adaptive.score_batch(bank, [{}], [served])
+    unserved, _ = adaptive.score_batch(bank, [{}])
+    right, _ = adaptive.score_batch(bank, [all_right], [served])
+
+    # Without served questions a blank attempt would sit at the prior mean
+    assert blank[0] < 25 < unserved[0]
+    assert right[0] > unserved[0]
+
+
+def test_served_question_is_pending_until_answered():
+    bank = _bank()
+    quiz = _quiz()
+    first = adaptive.select_next(quiz, bank, {}, [])["question"]["id"]
+
+    again = adaptive.select_next(quiz, bank, {}, [first])
+    assert again["question"]["id"] == first
+    assert not again["done"]
+
+    after = adaptive.select_next(quiz, bank, {first: 0}, [first])
+    assert after["question"]["id"] != first
+
+
+def test_done_only_after_stopping_rule():
+    bank = _bank()
+    quiz = _quiz(length=3)
+    answers, served = {}, []
+    for _ in range(3):
+        state = adaptive.select_next(quiz, bank, answers, served)
+        assert not state["done"]
+        qid = state["question"]["id"]
+        served.append(qid)
+        answers[qid] = 1
+
+    assert adaptive.select_next(quiz, bank, answers, served)["done"]
+
+
+def test_unserved_answers_do_not_count():
+    bank = _bank()
+    quiz = _quiz(length=3)
+    served = [adaptive.select_next(quiz, bank, {}, [])["question"]["id"]]
+    # Correct answers to every question, but only one was ever served
+    answers = {qid: 0 for qid in bank.key.question_ids}
+
+    state = adaptive.select_next(quiz, bank, answers, served)
+    assert state["answered"] == 1
+    assert not state["done"]
+
+    gamed, _ = adaptive.score_batch(bank, [answers], [served])
+    honest, _ = adaptive.score_batch(bank, [{served[0]: 0}], [served])
+    assert gamed[0] == honest[0]
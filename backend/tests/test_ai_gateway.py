@@ -0,0 +1,156 @@
+"""Limits, breaker and retries of ``services/ai_gateway.py`` against the fake provider."""
+import asyncio
+import time
+
+import pytest
+
+from backend.app.services.ai_client import ChatMessage, FakeProvider, ProviderError
+from backend.app.services.ai_gateway import AIGateway, CircuitBreaker, CircuitOpen, QueueFull, QueueTimeout, TokenBucket
+
+MESSAGES = [ChatMessage("user", "What is a prime number?")]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _gateway(provider, **limits):
+    options = dict(max_concurrency=4, max_per_user=4, queue_size=10, queue_timeout=1.0, rate=1000, burst=1000,
+                   retries=2, retry_base=0, breaker_failures=5, breaker_reset=30)
+    options.update(limits)
+    return AIGateway(provider, **options)
+
+
+def _fast(**options):
+    return FakeProvider(first_token_delay=0, token_delay=0, **options)
+
+
+class FailsAfterFirstToken(FakeProvider):
+    async def stream(self, messages, max_tokens=None):
+        async for token in super().stream(messages, max_tokens):
+            yield token
+            raise ProviderError("connection reset mid-stream")
+
+
+def test_token_bucket_refills_at_rate():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.try_acquire() == 0
+    # Idle time never banks more than the burst capacity
+    clock.now = 100
+    assert [bucket.try_acquire() for _ in range(3)][-1] > 0
+
+
+def test_token_bucket_times_out_before_deadline():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.try_acquire()
+
+    with pytest.raises(QueueTimeout):
+        asyncio.run(bucket.acquire(time.monotonic() + 0.05))
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    clock = Clock()
+    breaker = CircuitBreaker(failures=2, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+
+    # A failed probe opens the circuit again for a full reset period
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_queue_full_and_queue_timeout():
+    async def run():
+        gateway = _gateway(FakeProvider(first_token_delay=0.3, token_delay=0), max_concurrency=1,
+                           queue_size=1, queue_timeout=0.1)
+        first = asyncio.create_task(gateway.generate("a", MESSAGES))
+        await asyncio.sleep(0.01)
+        # One request holds the only slot and the next one fills the queue
+        second = asyncio.create_task(gateway.generate("b", MESSAGES))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFull):
+            await gateway.generate("c", MESSAGES)
+        with pytest.raises(QueueTimeout):
+            await second
+        await first
+        return gateway.metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["rejected"] == {"queue_full": 1, "queue_timeout": 1, "circuit_open": 0}
+    assert metrics["completed"] == 1
+    assert metrics["queue_depth"] == metrics["in_flight"] == 0
+
+
+def test_retries_failures_before_the_first_token():
+    # With seed 9 the first call fails and the second succeeds
+    provider = _fast(error_rate=0.5, seed=9)
+    gateway = _gateway(provider)
+    text = asyncio.run(gateway.generate("u", MESSAGES))
+
+    assert text == provider.reply_text(MESSAGES)
+    assert provider.calls == 2
+    assert gateway.counters["retries"] == 1
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gives_up_after_retries_and_opens_breaker():
+    provider = _fast(error_rate=1.0, seed=1)
+    gateway = _gateway(provider, retries=2, breaker_failures=3)
+    with pytest.raises(ProviderError):
+        asyncio.run(gateway.generate("u", MESSAGES))
+
+    assert provider.calls == 3
+    assert gateway.counters["failed"] == 1
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+
+def test_no_retry_after_tokens_were_sent():
+    provider = FailsAfterFirstToken(first_token_delay=0, token_delay=0, error_rate=0, seed=1)
+    gateway = _gateway(provider)
+    received = []
+
+    async def run():
+        async for token in gateway.stream("u", MESSAGES):
+            received.append(token)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(run())
+    # A retry would repeat tokens the client already has
+    assert provider.calls == 1
+    assert len(received) == 1
+    assert gateway.counters["retries"] == 0
+
+
+def test_limits_are_shared_across_event_loops():
+    gateway = _gateway(_fast(error_rate=0, seed=1), breaker_failures=1)
+    gateway.breaker.record_failure()
+    # A job on a fresh loop (as in a Celery worker) sees the open circuit
+    with pytest.raises(CircuitOpen):
+        asyncio.run(gateway.generate("u", MESSAGES))
+
+    gateway.breaker.record_success()
+    assert asyncio.run(gateway.generate("u", MESSAGES))
+    assert asyncio.run(gateway.generate("u", MESSAGES))
+    assert gateway.counters["completed"] == 2
@@ -0,0 +1,127 @@
+"""Celery-run AI replies (``services/ai_jobs.py``) with CELERY_TASK_ALWAYS_EAGER."""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app import models
+from backend.app.core import tasks
+from backend.app.services import ai_context, ai_gateway, ai_jobs, notification_service, tutor
+from backend.app.services.ai_cache import AIResponseCache
+from backend.app.services.ai_client import ChatMessage, FakeProvider
+from backend.app.services.ai_gateway import AIGateway
+
+CONTEXT = [ChatMessage("user", "How do fractions add?")]
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+    def one(self):
+        return self.row
+
+    def scalar_one(self):
+        return self.row
+
+
+class FakeSession:
+    """Answers run_job's statements in order: claim, conversation, question."""
+
+    def __init__(self, job):
+        self.job = job
+        self.results = [(job.id,), SimpleNamespace(conversation_metadata={}),
+                        (datetime.now(timezone.utc), job.message_id)]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, ident):
+        return self.job if ident == self.job.id else None
+
+    async def execute(self, statement):
+        return FakeResult(self.results.pop(0))
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+@pytest.fixture
+def eager(monkeypatch):
+    from backend.celery_app import celery_app
+
+    job = models.AIGenerationJob(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), conversation_id=uuid.uuid4(), message_id=uuid.uuid4(),
+        status=ai_jobs.PENDING, attempts=0,
+    )
+    session = FakeSession(job)
+    stored, published = [], []
+
+    async def build_context(db, conv, until=None):
+        return CONTEXT
+
+    async def add_assistant_message(db, conv_id, text, token_count):
+        msg = SimpleNamespace(id=uuid.uuid4(), content=text, token_count=token_count)
+        stored.append(msg)
+        return msg
+
+    async def create_notification(db, user_id, type, payload):
+        return SimpleNamespace(user_id=user_id, type=type, payload=payload)
+
+    async def publish(notifications):
+        published.extend(notifications)
+
+    gateway = AIGateway(FakeProvider(first_token_delay=0, token_delay=0, error_rate=0, seed=1), rate=1000, burst=1000)
+    monkeypatch.setattr(tasks, "ALWAYS_EAGER", True)
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(ai_jobs, "WorkerSessionLocal", lambda: session)
+    monkeypatch.setattr(ai_jobs, "get_cache", lambda: AIResponseCache(backend="memory"))
+    monkeypatch.setattr(ai_gateway, "_gateway", gateway)
+    monkeypatch.setattr(ai_context, "build_context", build_context)
+    monkeypatch.setattr(tutor, "add_assistant_message", add_assistant_message)
+    monkeypatch.setattr(notification_service, "create_notification", create_notification)
+    monkeypatch.setattr(notification_service, "publish", publish)
+    return SimpleNamespace(job=job, session=session, gateway=gateway, stored=stored, published=published)
+
+
+def test_eager_job_from_a_request_uses_the_shared_gateway(eager):
+    async def request():
+        # As the API does: the task runs inline, on a helper thread with its own loop
+        gateway = ai_gateway.get_gateway()
+        result = tasks.enqueue("smartlearn.generate_ai_reply", eager.job.id)
+        return gateway, result.get()
+
+    gateway, payload = asyncio.run(request())
+
+    assert payload["status"] == ai_jobs.COMPLETED
+    assert payload["message_id"] == str(eager.stored[0].id)
+    assert eager.stored[0].content == eager.gateway.provider.reply_text(CONTEXT)
+    assert [n.type for n in eager.published] == [ai_jobs.NOTIFICATION_TYPE]
+    # The job went through the API's gateway rather than a fresh one
+    assert ai_gateway.get_gateway() is gateway is eager.gateway
+    assert gateway.counters["completed"] == 1
+    assert gateway.metrics()["in_flight"] == 0
+
+
+def test_claimed_job_is_not_generated_again(eager):
+    eager.session.results[0] = None
+    eager.job.status = ai_jobs.RUNNING
+
+    payload = asyncio.run(ai_jobs.run_job(eager.job.id))
+
+    assert payload["status"] == ai_jobs.RUNNING
+    assert eager.stored == [] and eager.gateway.counters["admitted"] == 0
@@ -0,0 +1,28 @@
+"""Course board updates of ``services/leaderboard.py`` (memory store)."""
+import asyncio
+
+from backend.app.services.leaderboard import MemoryLeaderboardStore
+
+
+def test_course_total_counts_each_quiz_best_once():
+    async def run():
+        store = MemoryLeaderboardStore()
+        await store.load("course:c", [("u", 50.0)], [("u:q1", 50.0)])
+        # Two attempts at q2 recorded in either order
+        await store.add_best("course:c", "u", "u:q2", 80)
+        await store.add_best("course:c", "u", "u:q2", 70)
+        # An attempt already in the loaded snapshot changes nothing
+        await store.add_best("course:c", "u", "u:q1", 50)
+        return await store.rank("course:c", "u")
+
+    assert asyncio.run(run()) == (0, 130.0)
+
+
+def test_load_is_set_if_absent():
+    async def run():
+        store = MemoryLeaderboardStore()
+        first = await store.load("quiz:q", [("u", 90.0)])
+        second = await store.load("quiz:q", [("u", 10.0)])
+        return first, second, await store.rank("quiz:q", "u")
+
+    assert asyncio.run(run()) == (True, False, (0, 90.0))
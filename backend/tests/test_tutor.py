@@ -0,0 +1,105 @@
+"""SSE frames and reply persistence of ``services/tutor.py``."""
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+
+from backend.app import models
+from backend.app.services import ai_messages, tutor
+from backend.app.services.ai_cache import AIResponseCache
+from backend.app.services.ai_client import ChatMessage, FakeProvider
+from backend.app.services.ai_gateway import AIGateway
+
+CONTEXT = [ChatMessage("user", "Why is the sky blue?")]
+
+
+class FakeSession:
+    commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        FakeSession.commits += 1
+
+    async def refresh(self, obj):
+        pass
+
+
+def _message(conv_id, sender, content, token_count=None):
+    return models.Message(
+        id=uuid.uuid4(), conversation_id=conv_id, sender=sender, content=content, token_count=token_count,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def _setup(monkeypatch, error_rate=0.0):
+    saved = []
+
+    async def add_message(db, conv_id, sender, content, token_count=None):
+        msg = _message(conv_id, sender.value, content, token_count)
+        saved.append(msg)
+        return msg
+
+    gateway = AIGateway(
+        FakeProvider(first_token_delay=0, token_delay=0, error_rate=error_rate, seed=1),
+        retries=0, breaker_failures=5, rate=1000, burst=1000,
+    )
+    FakeSession.commits = 0
+    monkeypatch.setattr(tutor, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(ai_messages, "add_message", add_message)
+    monkeypatch.setattr(tutor, "get_gateway", lambda: gateway)
+    monkeypatch.setattr(tutor, "get_cache", lambda: AIResponseCache(backend="memory"))
+    return gateway, saved
+
+
+def _frames(body):
+    frames = []
+    for chunk in body.split("\n\n")[:-1]:
+        event, data = chunk.split("\n")
+        assert event.startswith("event: ") and data.startswith("data: ")
+        frames.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return frames
+
+
+def _stream(user_message):
+    async def run():
+        return "".join([frame async for frame in tutor.stream_reply("u", user_message, CONTEXT, "key")])
+
+    return asyncio.run(run())
+
+
+def test_stream_reply_frames_and_stores_the_reply(monkeypatch):
+    gateway, saved = _setup(monkeypatch)
+    user_message = _message(uuid.uuid4(), "user", CONTEXT[0].content)
+
+    body = _stream(user_message)
+    assert body.endswith("\n\n")
+    frames = _frames(body)
+    events = [event for event, _ in frames]
+    assert events[0] == "message" and events[-1] == "done"
+    assert set(events[1:-1]) == {"token"}
+    assert frames[0][1]["id"] == str(user_message.id)
+
+    deltas = [data["delta"] for event, data in frames if event == "token"]
+    reply = gateway.provider.reply_text(CONTEXT)
+    assert "".join(deltas) == reply
+    # Stored once, complete, with the streamed token count
+    assert len(saved) == 1 and FakeSession.commits == 1
+    assert saved[0].content == reply and saved[0].token_count == len(deltas)
+    assert saved[0].conversation_id == user_message.conversation_id
+    done = frames[-1][1]
+    assert done["id"] == str(saved[0].id) and done["sender"] == "assistant"
+
+
+def test_stream_reply_reports_failure_without_storing(monkeypatch):
+    _, saved = _setup(monkeypatch, error_rate=1.0)
+    body = _stream(_message(uuid.uuid4(), "user", CONTEXT[0].content))
+
+    frames = _frames(body)
+    assert [event for event, _ in frames] == ["message", "error"]
+    assert frames[-1][1]["reason"] == "provider_error"
+    assert saved == [] and FakeSession.commits == 0